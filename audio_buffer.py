@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Audio buffers for the Voice Transcriber app
+Holds captured PCM audio between the PortAudio callback and the transcription pipeline
+"""
+
+import bisect
+import io
+import itertools
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from typing import List, Optional, Sequence, Union
+
+
+class RingBuffer:
+    """Fixed-size byte ring buffer that always holds the most recent audio"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._data = bytearray(capacity)
+        self._write_pos = 0
+        self._filled = 0
+        self._lock = threading.Lock()
+
+    def write(self, data: bytes) -> None:
+        """Append audio, overwriting the oldest bytes once the buffer is full"""
+        if self.capacity == 0:
+            return
+
+        with self._lock:
+            size = len(data)
+            if size >= self.capacity:
+                # Only the newest `capacity` bytes can survive
+                self._data[:] = data[size - self.capacity:]
+                self._write_pos = 0
+                self._filled = self.capacity
+                return
+
+            end = self._write_pos + size
+            if end <= self.capacity:
+                self._data[self._write_pos:end] = data
+            else:
+                first = self.capacity - self._write_pos
+                self._data[self._write_pos:] = data[:first]
+                self._data[:size - first] = data[first:]
+            self._write_pos = end % self.capacity
+            self._filled = min(self.capacity, self._filled + size)
+
+    def snapshot(self) -> bytes:
+        """Return the buffered audio in chronological order"""
+        with self._lock:
+            if self._filled < self.capacity:
+                return bytes(self._data[self._write_pos - self._filled:self._write_pos])
+            return bytes(self._data[self._write_pos:] + self._data[:self._write_pos])
+
+    def clear(self) -> None:
+        """Drop all buffered audio"""
+        with self._lock:
+            self._write_pos = 0
+            self._filled = 0
+
+
+def build_wav_header(data_size: int, channels: int, sample_width: int, sample_rate: int) -> bytes:
+    """Build the canonical 44-byte header of a PCM WAV file"""
+    block_align = channels * sample_width
+    return struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + data_size, b'WAVE',
+        b'fmt ', 16, 1, channels, sample_rate, sample_rate * block_align, block_align, sample_width * 8,
+        b'data', data_size
+    )
+
+
+class MmapPCMStore:
+    """PCM store backed by a memory-mapped file of raw PCM that grows in fixed increments
+
+    The file has no header; an upload puts a WAV header in front of the ranges it reads.
+    """
+
+    def __init__(self, grow_bytes: int = 8 << 20, directory: Optional[str] = None):
+        self.grow_bytes = grow_bytes
+        fd, self.path = tempfile.mkstemp(prefix='voice-transcriber-', suffix='.pcm', dir=directory)
+        self._file = os.fdopen(fd, 'r+b')
+        self._mmap: Optional[mmap.mmap] = None
+        self._size = 0
+        self._remap(grow_bytes)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _remap(self, file_size: int) -> None:
+        self._file.truncate(file_size)
+        old_mmap = self._mmap
+        self._mmap = mmap.mmap(self._file.fileno(), file_size)
+        if old_mmap is not None:
+            # Dropping the old mapping is what keeps RSS flat: only the pages
+            # written since the last growth step stay resident
+            try:
+                old_mmap.close()
+            except BufferError:
+                pass  # Still viewed by a reader, it goes away with the last view
+
+    def append(self, data: bytes) -> None:
+        """Append PCM bytes, growing the file by whole increments"""
+        start = self._size
+        end = start + len(data)
+        if end > len(self._mmap):
+            increments = -(-end // self.grow_bytes)
+            self._remap(increments * self.grow_bytes)
+        self._mmap[start:end] = data
+        self._size += len(data)
+
+    def view(self) -> memoryview:
+        """Zero-copy view of the stored PCM bytes"""
+        return memoryview(self._mmap)[:self._size]
+
+    def close(self) -> None:
+        """Unmap and delete the backing file"""
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+        self._file.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class MemoryViewReader(io.RawIOBase):
+    """Read-only file object over one or more memoryviews, so uploads read audio without copying it first
+
+    Several views are read back to back, e.g. a WAV header followed by the
+    speech ranges of a recording that lives in a memory-mapped file.
+    """
+
+    def __init__(self, data: Union[memoryview, bytes, Sequence[Union[memoryview, bytes]]], name: str):
+        super().__init__()
+        parts = data if isinstance(data, (list, tuple)) else [data]
+        # Our own views, so closing the reader leaves the caller's views usable for another reader
+        self._parts = [memoryview(part).cast('B') for part in parts]
+        self._ends = list(itertools.accumulate(len(part) for part in self._parts))
+        self._size = self._ends[-1] if self._ends else 0
+        self._pos = 0
+        self.name = name
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        copied = 0
+        while copied < len(b) and self._pos < self._size:
+            index = bisect.bisect_right(self._ends, self._pos)
+            part = self._parts[index]
+            offset = self._pos - (self._ends[index] - len(part))
+            chunk = part[offset:offset + len(b) - copied]
+            b[copied:copied + len(chunk)] = chunk
+            copied += len(chunk)
+            self._pos += len(chunk)
+        return copied
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._pos = max(0, offset)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def close(self) -> None:
+        if not self.closed:
+            for part in self._parts:
+                part.release()
+        super().close()
+
+
+class PCMBuffer:
+    """Contiguous, growable PCM buffer backed by a single bytearray
+
+    Once a recording grows past spill_threshold bytes it moves to a memory-mapped
+    file on disk, so very long sessions don't keep growing the process memory.
+    """
+
+    def __init__(self, initial_capacity: int = 1 << 20, spill_threshold: Optional[int] = None,
+                 spill_grow_bytes: int = 8 << 20, spill_dir: Optional[str] = None):
+        self._data = bytearray(initial_capacity)
+        self._size = 0
+        self.spill_threshold = spill_threshold
+        self.spill_grow_bytes = spill_grow_bytes
+        self.spill_dir = spill_dir
+        self._store: Optional[MmapPCMStore] = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        return len(self._data)
+
+    @property
+    def is_spilled(self) -> bool:
+        return self._store is not None
+
+    def append(self, data: bytes) -> None:
+        """Append PCM bytes, doubling the capacity when it runs out"""
+        end = self._size + len(data)
+        if self._store is None and self.spill_threshold is not None and end > self.spill_threshold:
+            self._spill()
+        if self._store is not None:
+            self._store.append(data)
+            self._size = end
+            return
+        if end > len(self._data):
+            self._grow(end)
+        self._data[self._size:end] = data
+        self._size = end
+
+    def _spill(self) -> None:
+        self._store = MmapPCMStore(self.spill_grow_bytes, self.spill_dir)
+        self._store.append(memoryview(self._data)[:self._size])
+
+    def _grow(self, min_capacity: int) -> None:
+        capacity = max(len(self._data), 1)
+        while capacity < min_capacity:
+            capacity *= 2
+        if self.spill_threshold is not None:
+            # Everything past the threshold goes to disk anyway
+            capacity = max(min_capacity, min(capacity, self.spill_threshold))
+        # Copy into a fresh array instead of resizing in place, so memoryviews
+        # handed out earlier stay valid and never block the growth
+        data = bytearray(capacity)
+        data[:self._size] = memoryview(self._data)[:self._size]
+        self._data = data
+
+    def view(self) -> memoryview:
+        """Zero-copy view of the recorded PCM bytes"""
+        if self._store is not None:
+            return self._store.view()
+        return memoryview(self._data)[:self._size]
+
+    @property
+    def spill_path(self) -> Optional[str]:
+        return self._store.path if self._store is not None else None
+
+    def reset(self) -> None:
+        """Forget the recorded audio but keep the in-memory allocation"""
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+        self._size = 0
+
+
+class BufferPool:
+    """Small pool of PCM buffers reused across recording sessions"""
+
+    def __init__(self, max_buffers: int = 2, initial_capacity: int = 1 << 20,
+                 max_retained_capacity: int = 32 << 20, spill_threshold: Optional[int] = None,
+                 spill_grow_bytes: int = 8 << 20, spill_dir: Optional[str] = None):
+        self.max_buffers = max_buffers
+        self.initial_capacity = initial_capacity
+        self.max_retained_capacity = max_retained_capacity
+        self.spill_threshold = spill_threshold
+        self.spill_grow_bytes = spill_grow_bytes
+        self.spill_dir = spill_dir
+        self._free: List[PCMBuffer] = []
+        self._lock = threading.Lock()
+
+    def acquire(self) -> PCMBuffer:
+        """Get an empty buffer, reusing a pooled allocation when possible"""
+        with self._lock:
+            if self._free:
+                return self._free.pop()
+        return PCMBuffer(self.initial_capacity, self.spill_threshold, self.spill_grow_bytes, self.spill_dir)
+
+    def release(self, buffer: Optional[PCMBuffer]) -> None:
+        """Return a buffer to the pool once nothing reads from it anymore"""
+        if buffer is None:
+            return
+        buffer.reset()
+        # Don't keep the memory of an unusually long dictation around forever
+        if buffer.capacity > self.max_retained_capacity:
+            return
+        with self._lock:
+            if len(self._free) < self.max_buffers:
+                self._free.append(buffer)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Transcription cache for the Voice Transcriber app
+Remembers transcriptions by a hash of the audio, so the same speech sent again (a replay,
+a retry after a lost response, a duplicate press) is answered without an API call
+"""
+
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from fileutils import make_private_dirs
+
+
+def cache_key(pcm_segments: Iterable[memoryview], audio_format: Dict[str, Any], model: str,
+              options: Optional[Dict[str, Any]] = None) -> str:
+    """SHA-256 of the PCM speech together with its format, the model and the request options"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps({'format': audio_format, 'model': model, 'options': options or {}},
+                             sort_keys=True).encode('utf-8'))
+    for segment in pcm_segments:
+        digest.update(segment)
+    return digest.hexdigest()
+
+
+class TranscriptionCache:
+    """Two-tier cache: an in-memory LRU in front of a SQLite table
+
+    Both tiers hold at most their number of entries, evicting the least
+    recently used one, and entries older than ttl seconds are treated as
+    missing. A disk hit is promoted to the memory tier. Each entry keeps
+    the size of the upload it stood for, which is counted as saved on a hit.
+    Lookups only read SQLite; every write (storing a result, refreshing the
+    last use of a disk hit, dropping an expired entry) happens on a
+    background thread, so neither a lookup nor storing a result waits for
+    a commit.
+    """
+
+    def __init__(self, path: Optional[str], memory_entries: int = 128, disk_entries: int = 5000,
+                 ttl: Optional[float] = 30 * 24 * 3600):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.ttl = ttl
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self._memory: 'OrderedDict[str, Tuple[str, int, float]]' = OrderedDict()  # Key -> (text, upload bytes, created at)
+        self._lock = threading.Lock()  # Memory tier and counters
+        self._db_lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._writes: 'queue.Queue[Optional[Tuple[str, Tuple]]]' = queue.Queue()  # (statement, parameters)
+        self._writer: Optional[threading.Thread] = None
+        if path:
+            # Transcripts are private: directories 0o700, database (and SQLite's journals) 0o600
+            make_private_dirs(os.path.dirname(path))
+            os.close(os.open(path, os.O_RDWR | os.O_CREAT, 0o600))
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("""CREATE TABLE IF NOT EXISTS transcriptions (
+                key TEXT PRIMARY KEY, text TEXT NOT NULL, upload_bytes INTEGER NOT NULL,
+                created_at REAL NOT NULL, last_used REAL NOT NULL)""")
+            self._db.execute("CREATE INDEX IF NOT EXISTS transcriptions_last_used ON transcriptions (last_used)")
+            self._purge_expired()
+            self._db.commit()
+            self._writer = threading.Thread(target=self._write_loop, name='cache-writer', daemon=True)
+            self._writer.start()
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl is not None and time.time() - created_at > self.ttl
+
+    def _remember(self, key: str, entry: Tuple[str, int, float]) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached transcription for key, or None"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and self._expired(entry[2]):
+                del self._memory[key]
+                entry = None
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                self.bytes_saved += entry[1]
+                return entry[0]
+        
+        row = None
+        with self._db_lock:
+            if self._db is not None:
+                row = self._db.execute("SELECT text, upload_bytes, created_at FROM transcriptions WHERE key = ?",
+                                       (key,)).fetchone()
+            if row is not None and self._expired(row[2]):
+                self._writes.put(("DELETE FROM transcriptions WHERE key = ?", (key,)))
+                row = None
+            elif row is not None:
+                self._writes.put(("UPDATE transcriptions SET last_used = ? WHERE key = ?", (time.time(), key)))
+        with self._lock:
+            if row is not None:
+                entry = tuple(row)
+                self._remember(key, entry)
+                self.disk_hits += 1
+            if entry is None:
+                self.misses += 1
+                return None
+            self.bytes_saved += entry[1]
+            return entry[0]
+
+    def put(self, key: str, text: str, upload_bytes: int) -> None:
+        """Store the transcription of an upload of upload_bytes"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, (text, upload_bytes, now))
+        if self._writer is not None:
+            self._writes.put(("INSERT OR REPLACE INTO transcriptions VALUES (?, ?, ?, ?, ?)",
+                              (key, text, upload_bytes, now, now)))
+            self._writes.put(("""DELETE FROM transcriptions WHERE key IN (
+                SELECT key FROM transcriptions ORDER BY last_used DESC LIMIT -1 OFFSET ?)""", (self.disk_entries,)))
+
+    def _write_loop(self) -> None:
+        while True:
+            write = self._writes.get()
+            if write is None:
+                return
+            try:
+                with self._db_lock:
+                    self._db.execute(*write)
+                    # Commit once the queue is drained, so a burst of writes shares one commit
+                    while not self._writes.empty():
+                        write = self._writes.get()
+                        if write is None:
+                            self._db.commit()
+                            return
+                        self._db.execute(*write)
+                    self._db.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️  Could not write to the transcription cache: {e}")
+
+    def _purge_expired(self) -> None:
+        if self.ttl is not None:
+            self._db.execute("DELETE FROM transcriptions WHERE created_at < ?", (time.time() - self.ttl,))
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+                'bytes_saved': self.bytes_saved,
+            }
+
+    def close(self) -> None:
+        """Finish pending writes and close the database"""
+        if self._writer is not None:
+            self._writes.put(None)
+            self._writer.join(timeout=5)
+            self._writer = None
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
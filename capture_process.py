@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Out-of-process audio capture for the Voice Transcriber app
+Runs the PortAudio stream in a child process that writes into a shared-memory ring buffer,
+so a busy main process (GIL contention) can no longer make the callback drop input frames
+"""
+
+import multiprocessing
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from resample import StreamingResampler
+from stats import CaptureHealth
+
+HEADER_SIZE = 64
+_HEAD = 0  # Total bytes ever written, published only after the data itself
+_CAPACITY = 1
+_TAIL = 2  # Total bytes the consumer is done with, published for the producer and for monitoring
+
+
+class SharedRingBuffer:
+    """Single-producer, single-consumer byte ring buffer in shared memory
+
+    The producer copies data in and then publishes the new head with one
+    aligned 64-bit store. The consumer reads the head, gets zero-copy views
+    of everything between its tail and the head, and publishes the new tail
+    the same way.
+    """
+
+    def __init__(self, capacity: Optional[int] = None, name: Optional[str] = None):
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=HEADER_SIZE + capacity)
+            self.owner = True
+        else:
+            self.shm = _attach_shared_memory(name)
+            self.owner = False
+
+        self._header = np.ndarray((HEADER_SIZE // 8,), dtype=np.int64, buffer=self.shm.buf)
+        if self.owner:
+            self._header[:] = 0
+            self._header[_CAPACITY] = capacity
+        self.capacity = int(self._header[_CAPACITY])
+        self._data = self.shm.buf[HEADER_SIZE:HEADER_SIZE + self.capacity]
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def head(self) -> int:
+        return int(self._header[_HEAD])
+
+    @property
+    def tail(self) -> int:
+        return int(self._header[_TAIL])
+
+    @property
+    def lag(self) -> int:
+        """Bytes written but not yet consumed"""
+        return self.head - self.tail
+
+    def write(self, data: bytes) -> None:
+        """Producer side: append data, overwriting the oldest bytes when full"""
+        head = self.head
+        size = len(data)
+        kept = memoryview(data)[-self.capacity:]
+        start = (head + size - len(kept)) % self.capacity
+        first = min(len(kept), self.capacity - start)
+        self._data[start:start + first] = kept[:first]
+        self._data[:len(kept) - first] = kept[first:]
+        self._header[_HEAD] = head + size
+
+    def read(self, tail: int, consume: Callable[[memoryview], None]) -> Tuple[int, int]:
+        """Consumer side: pass everything after tail to consume as zero-copy views
+
+        Returns the new tail and the number of bytes lost because the producer
+        lapped the consumer. That includes bytes overwritten while consume was
+        still reading them: those were passed on corrupted.
+        """
+        head = self.head
+        dropped = 0
+        while True:
+            lapped = max(0, head - tail - self.capacity)  # Overwritten before we got to them
+            dropped += lapped
+            tail += lapped
+            if tail >= head:
+                break
+            start = tail % self.capacity
+            end = min(self.capacity, start + head - tail)
+            consume(self._data[start:end])
+            head = self.head
+            dropped += min(end - start, max(0, head - self.capacity - tail))
+            tail += end - start
+        self._header[_TAIL] = tail
+        return tail, dropped
+
+    def close(self) -> None:
+        self._header = None
+        self._data.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13 attaching registers the segment with the resource tracker.
+        # A spawned child shares its parent's tracker, where the segment is already
+        # registered, so this is a no-op; unregistering would drop the parent's entry.
+        return shared_memory.SharedMemory(name=name)
+
+
+def _capture_main(ring_name: str, capture_rate: int, capture_channels: int, output_rate: int,
+                  output_channels: int, frames_per_buffer: int, conn) -> None:
+    """Entry point of the capture process"""
+    import pyaudio
+
+    ring = SharedRingBuffer(name=ring_name)
+    converter = StreamingResampler(capture_rate, output_rate, capture_channels, output_channels)
+    health = CaptureHealth()
+
+    def audio_callback(in_data, frame_count, time_info, status):
+        health.observe(status, time_info, frame_count, capture_rate)
+        ring.write(converter.process(in_data))
+        return (None, pyaudio.paContinue)
+
+    pyaudio_instance = pyaudio.PyAudio()
+    try:
+        stream = pyaudio_instance.open(
+            format=pyaudio.paInt16,
+            channels=capture_channels,
+            rate=capture_rate,
+            input=True,
+            frames_per_buffer=frames_per_buffer,
+            stream_callback=audio_callback
+        )
+        stream.start_stream()
+    except Exception as e:
+        conn.send(('error', str(e)))
+        pyaudio_instance.terminate()
+        return
+
+    conn.send(('ready', None))
+    try:
+        # Serve health requests until the parent asks us to stop or goes away
+        while True:
+            command = conn.recv()
+            if command == 'stop':
+                break
+            elif command == 'health_reset':
+                health.reset()
+            elif isinstance(command, tuple) and command[0] == 'health':
+                conn.send((command[1], health.snapshot()))  # Tagged with the request's number
+    except EOFError:
+        pass
+    finally:
+        stream.stop_stream()
+        stream.close()
+        pyaudio_instance.terminate()
+        ring.close()
+
+
+class CaptureProcess:
+    """Parent side of the capture process: starts it and drains its ring buffer
+
+    If the child dies, on_exit is called from the reader thread so the app
+    can switch to another way of capturing; no more audio arrives otherwise.
+    """
+
+    def __init__(self, capture_rate: int, capture_channels: int, output_rate: int, output_channels: int,
+                 frames_per_buffer: int, buffer_bytes: int, on_audio: Callable[[memoryview], None],
+                 on_exit: Optional[Callable[[], None]] = None, poll_interval: float = 0.01):
+        self.capture_rate = capture_rate
+        self.capture_channels = capture_channels
+        self.output_rate = output_rate
+        self.output_channels = output_channels
+        self.frames_per_buffer = frames_per_buffer
+        self.buffer_bytes = buffer_bytes
+        self.on_audio = on_audio
+        self.on_exit = on_exit
+        self.poll_interval = poll_interval
+        self.dropped_bytes = 0
+        self.ring: Optional[SharedRingBuffer] = None
+        self._process = None
+        self._conn = None
+        self._conn_lock = threading.Lock()
+        self._session_dropped_start = 0
+        self._health_requests = 0
+        self._reader: Optional[threading.Thread] = None
+        self._running = False
+
+    def start(self, timeout: float = 10.0) -> None:
+        """Start capturing; raises RuntimeError if the child cannot open the stream"""
+        self.ring = SharedRingBuffer(capacity=self.buffer_bytes)
+        # Spawn rather than fork: the parent has PortAudio and listener threads running
+        context = multiprocessing.get_context('spawn')
+        self._conn, child_conn = context.Pipe()
+        self._process = context.Process(
+            target=_capture_main,
+            args=(self.ring.name, self.capture_rate, self.capture_channels, self.output_rate,
+                  self.output_channels, self.frames_per_buffer, child_conn),
+            name='audio-capture',
+            daemon=True
+        )
+        self._process.start()
+        child_conn.close()
+
+        if not self._conn.poll(timeout):
+            self.stop()
+            raise RuntimeError("capture process did not start in time")
+        status, error = self._conn.recv()
+        if status != 'ready':
+            self.stop()
+            raise RuntimeError(error)
+
+        self._running = True
+        self._reader = threading.Thread(target=self._read_loop, name='capture-reader', daemon=True)
+        self._reader.start()
+
+    def reset_health(self) -> None:
+        """Start a fresh set of capture health counters in the child"""
+        with self._conn_lock:
+            self._session_dropped_start = self.dropped_bytes
+            self._conn.send('health_reset')
+
+    def health_snapshot(self, timeout: float = 1.0) -> Dict[str, float]:
+        """Capture health counters since the last reset, including bytes the reader lost"""
+        with self._conn_lock:
+            self._health_requests += 1
+            request = self._health_requests
+            self._conn.send(('health', request))
+            health = {}
+            deadline = time.monotonic() + timeout
+            # Replies to earlier requests that timed out may still be queued, skip them
+            while self._conn.poll(max(0.0, deadline - time.monotonic())):
+                number, snapshot = self._conn.recv()
+                if number == request:
+                    health = snapshot
+                    break
+            health['ring_dropped_bytes'] = self.dropped_bytes - self._session_dropped_start
+        return health
+
+    def _read_loop(self) -> None:
+        tail = self.ring.head
+        while self._running:
+            tail, dropped = self.ring.read(tail, self.on_audio)
+            if dropped:
+                self.dropped_bytes += dropped
+                print(f"⚠️  Capture reader fell behind, {dropped} bytes of audio lost")
+            if not self._process.is_alive():
+                print(f"❌ Audio capture process exited unexpectedly (exit code {self._process.exitcode})")
+                self._running = False
+                if self.on_exit:
+                    self.on_exit()
+                return
+            time.sleep(self.poll_interval)
+
+    def stop(self) -> None:
+        """Stop the capture process and free the shared memory"""
+        self._running = False
+        if self._reader is not None and self._reader is not threading.current_thread():
+            self._reader.join()
+        if self._conn is not None:
+            try:
+                with self._conn_lock:
+                    self._conn.send('stop')
+            except (BrokenPipeError, OSError):
+                pass
+        if self._process is not None:
+            self._process.join(timeout=2)
+            if self._process.is_alive():
+                self._process.terminate()
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
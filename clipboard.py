@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+In-process X11 clipboard for the Voice Transcriber app
+Owns the CLIPBOARD selection and answers paste requests itself, instead of forking xclip or xsel
+and sleeping for a fixed time in the hope that they are ready
+"""
+
+import os
+import queue
+import select
+import threading
+import time
+from typing import Callable, Optional
+
+try:
+    from Xlib import X, Xatom
+    from Xlib import display as xdisplay
+    from Xlib.protocol import event as xevent
+except ImportError:
+    xdisplay = None
+
+
+class X11ClipboardOwner:
+    """Holds the CLIPBOARD selection from a background event-loop thread
+
+    All X calls happen on that thread; set_text hands it the text and returns
+    once the server confirms the ownership, which is the moment a paste can
+    go out. The previous clipboard text is requested from its owner at the
+    same time and, if restore_after is given, served again after that delay
+    unless someone else has copied in the meantime. Transfers that need the
+    INCR protocol (hundreds of KB) are not supported in either direction.
+    """
+
+    def __init__(self, display_name: Optional[str] = None, read_timeout: float = 1.0):
+        if xdisplay is None:
+            raise RuntimeError("python-xlib is not installed")
+        self.display = xdisplay.Display(display_name)
+        self.display.set_error_handler(lambda *args: None)  # Requestors may vanish mid-transfer
+        self.window = self.display.screen().root.create_window(0, 0, 1, 1, 0, X.CopyFromParent)
+        self.read_timeout = read_timeout
+
+        atom = self.display.intern_atom
+        self.CLIPBOARD = atom('CLIPBOARD')
+        self.TARGETS = atom('TARGETS')
+        self.UTF8_STRING = atom('UTF8_STRING')
+        self.TEXT = atom('TEXT')
+        self.INCR = atom('INCR')
+        self.PROPERTY = atom('VOICE_TRANSCRIBER_SELECTION')
+        # Leave room for the request header in a single ChangeProperty
+        self.max_transfer = self.display.display.info.max_request_length * 4 - 64
+
+        self._text: Optional[bytes] = None  # What we serve while we own the selection
+        self._previous: Optional[bytes] = None
+        self._previous_deadline = 0.0  # Until when a pending read of the old contents may answer
+        self._restore_at: Optional[float] = None
+        self._commands: 'queue.Queue[Callable[[], None]]' = queue.Queue()
+        self._wake_read, self._wake_write = os.pipe()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='clipboard', daemon=True)
+        self._thread.start()
+
+    def set_text(self, text: str, restore_after: Optional[float] = None, timeout: float = 0.5) -> bool:
+        """Take the clipboard with text; True once the X server reports us as owner"""
+        owned = threading.Event()
+        result = []
+
+        def take() -> None:
+            result.append(self._take_ownership(text.encode('utf-8'), restore_after))
+            owned.set()
+
+        self._submit(take)
+        return owned.wait(timeout) and result[0]
+
+    def close(self) -> None:
+        def stop() -> None:
+            self._running = False
+        self._submit(stop)
+        self._thread.join(timeout=1)
+        os.close(self._wake_read)
+        os.close(self._wake_write)
+        self.display.close()
+
+    def _submit(self, command: Callable[[], None]) -> None:
+        self._commands.put(command)
+        os.write(self._wake_write, b'x')
+
+    def _run(self) -> None:
+        while self._running:
+            timeout = None if self._restore_at is None else max(0.0, self._restore_at - time.monotonic())
+            readable, _, _ = select.select([self.display, self._wake_read], [], [], timeout)
+            if self._wake_read in readable:
+                os.read(self._wake_read, 512)
+            while not self._commands.empty():
+                self._commands.get()()
+            if self._restore_at is not None and time.monotonic() >= self._restore_at:
+                self._restore()
+            while self._running and self.display.pending_events():
+                self._handle_event(self.display.next_event())
+
+    def _owns_selection(self) -> bool:
+        return self.display.get_selection_owner(self.CLIPBOARD) == self.window
+
+    def _take_ownership(self, data: bytes, restore_after: Optional[float]) -> bool:
+        if self._restore_at is None:
+            # Otherwise a restore is still pending and _previous already holds what to restore
+            self._previous = None
+            if restore_after is not None:
+                if self._text is not None and self._owns_selection():
+                    self._previous = self._text
+                else:
+                    # Ask the current owner for its text; the reply arrives as a SelectionNotify
+                    self.window.convert_selection(self.CLIPBOARD, self.UTF8_STRING, self.PROPERTY, X.CurrentTime)
+                    self._previous_deadline = time.monotonic() + self.read_timeout
+
+        self._text = data
+        # CurrentTime, like xclip: a real timestamp would need an extra round trip first
+        self.window.set_selection_owner(self.CLIPBOARD, X.CurrentTime)
+        if not self._owns_selection():
+            self._text = None
+            self._restore_at = None
+            return False
+        self._restore_at = None if restore_after is None else time.monotonic() + restore_after
+        return True
+
+    def _restore(self) -> None:
+        self._restore_at = None
+        if self._previous is not None and self._text is not None:
+            self._text = self._previous  # Still the owner, so just serve the old text again
+        self._previous = None
+
+    def _handle_event(self, event) -> None:
+        if event.type == X.SelectionRequest:
+            self._answer_request(event)
+        elif event.type == X.SelectionClear:
+            # Someone copied something else: nothing to serve or restore any more
+            self._text = None
+            self._previous = None
+            self._restore_at = None
+        elif event.type == X.SelectionNotify and event.property == self.PROPERTY:
+            self._read_previous()
+
+    def _read_previous(self) -> None:
+        reply = self.window.get_full_property(self.PROPERTY, X.AnyPropertyType)
+        self.window.delete_property(self.PROPERTY)
+        if reply is None or reply.property_type == self.INCR or time.monotonic() > self._previous_deadline:
+            return
+        value = reply.value
+        self._previous = value.encode('utf-8') if isinstance(value, str) else bytes(value)
+
+    def _answer_request(self, request) -> None:
+        prop = request.property or request.target  # Obsolete clients leave the property out
+        if request.selection != self.CLIPBOARD or self._text is None:
+            prop = X.NONE
+        elif request.target == self.TARGETS:
+            targets = [self.TARGETS, self.UTF8_STRING, self.TEXT, Xatom.STRING]
+            request.requestor.change_property(prop, Xatom.ATOM, 32, targets)
+        elif request.target in (self.UTF8_STRING, self.TEXT) and len(self._text) <= self.max_transfer:
+            request.requestor.change_property(prop, self.UTF8_STRING, 8, self._text)
+        elif request.target == Xatom.STRING and len(self._text) <= self.max_transfer:
+            latin1 = self._text.decode('utf-8').encode('latin-1', errors='replace')
+            request.requestor.change_property(prop, Xatom.STRING, 8, latin1)
+        else:
+            prop = X.NONE  # Unsupported target, or too big without INCR
+
+        notify = xevent.SelectionNotify(
+            time=request.time,
+            requestor=request.requestor,
+            selection=request.selection,
+            target=request.target,
+            property=prop
+        )
+        request.requestor.send_event(notify)
+        self.display.flush()
@@ -1,16 +1,26 @@
 import os
 from dotenv import load_dotenv
-from platform_utils import get_platform_handler
+from platform_utils import get_shortcut_keys
 
 # Load environment variables from .env file
 load_dotenv()
 
 # OpenAI Configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "YOUR_OPENAI_API_KEY")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+TRANSCRIPTION_MODEL = "whisper-1"
 
-# Get platform-specific handler for dynamic configuration
-_platform_handler = get_platform_handler()
-_shortcut_info = _platform_handler.get_shortcut_keys()
+# HTTP connection settings
+PREWARM_CONNECTION = True  # Connect to the API when recording starts instead of after it stops
+PREWARM_INTERVAL = 20  # Seconds between keep-alive pings during long recordings
+HTTP_MAX_CONNECTIONS = 4  # Connection pool size (streaming segments upload in parallel)
+HTTP_KEEPALIVE_SECONDS = 30  # How long an idle pooled connection is kept open
+
+# Resolved tool paths are cached here so repeated launches skip probing (None to disable)
+CAPABILITY_CACHE_FILE = os.path.expanduser("~/.cache/voice-transcriber/capabilities.json")
+
+# Platform-specific shortcut (the platform handler itself is only started by the app)
+_shortcut_info = get_shortcut_keys()
 
 # Keyboard shortcut configuration (platform-specific)
 TOGGLE_SHORTCUT = {_shortcut_info['modifier'], _shortcut_info['secondary'], _shortcut_info['key']}
@@ -20,10 +30,110 @@ SHORTCUT_DISPLAY = _shortcut_info['display']
 SAMPLE_RATE = 16000  # OpenAI Whisper works best with 16kHz
 CHANNELS = 1  # Mono
 CHUNK_SIZE = 1024
+NATIVE_RATE_CAPTURE = True  # Capture at the device's own rate and convert to SAMPLE_RATE in the app
+MAX_CAPTURE_CHANNELS = 2  # Upper bound on channels captured before mixing down
 FORMAT = 'wav'
+BUFFER_POOL_SIZE = 2  # Recording buffers kept allocated between sessions
+
+# Long recordings move to a memory-mapped file on disk instead of growing in RAM
+SPILL_THRESHOLD_SECONDS = 120  # Set to None to always keep recordings in memory
+SPILL_GROW_MB = 8  # The spill file grows in steps of this size
+SPILL_DIR = None  # None uses the system temp directory
+
+# Voice activity detection: trims silence before upload and skips recordings without speech
+VAD_ENABLED = True
+VAD_FRAME_MS = 30
+VAD_ENERGY_MARGIN_DB = 10  # How far above the noise floor speech must be
+VAD_MIN_ENERGY_DBFS = -50  # Anything quieter is always silence
+VAD_ZCR_THRESHOLD = 0.25  # Zero-crossing rate that marks quiet fricatives as speech
+VAD_HANGOVER_MS = 300  # Silence kept around each stretch of speech
+VAD_MAX_PAUSE_MS = 1000  # Longer pauses are cut out
+VAD_MIN_SPEECH_MS = 200  # Less speech than this rejects the recording
+
+# Auto-stop: end the recording by itself once you stop talking
+AUTO_STOP = False
+AUTO_STOP_SILENCE_MS = 1200  # Trailing silence that ends the recording
+AUTO_STOP_MIN_SPEECH_MS = 300  # Speech required before silence can end it
+
+# Streaming: transcribe long dictations segment by segment while still recording
+STREAMING_TRANSCRIPTION = False
+STREAMING_PAUSE_MS = 600  # A pause this long marks the end of a segment
+STREAMING_MIN_SEGMENT_SECONDS = 10  # Shorter segments keep growing until the next pause
+STREAMING_WORKERS = 2  # Segments transcribed in parallel
+
+# Upload encoding: 'auto' picks whichever of AUTO_ENCODINGS is expected to encode and upload fastest
+# FLAC and Opus need the optional soundfile package (pip3 install soundfile)
+AUDIO_ENCODING = 'auto'  # 'auto', 'wav', 'flac' or 'opus'
+AUTO_ENCODINGS = ['wav', 'flac', 'opus']
+ESTIMATED_UPLOAD_KBPS = 4000  # Starting guess for upload speed, refined by every request
+ENCODER_EXPLORE_RATE = 0.05  # Share of recordings sent with another encoding to keep its estimates fresh
+
+# Print timings and counters after every dictation
+SHOW_SESSION_STATS = True
+
+# Warm capture: keep the input stream open and prepend recent audio to each recording
+WARM_CAPTURE = False
+PRE_ROLL_MS = 300  # Audio captured before the shortcut press that is kept
+
+# Capture process: run the input stream in its own process (implies warm capture), so a busy
+# app can't make the audio callback miss frames
+CAPTURE_PROCESS = False
+CAPTURE_BUFFER_SECONDS = 4  # Size of the shared-memory ring between the two processes
+
+# Transcription jobs
+JOB_WORKERS = 1  # Recordings transcribed at the same time
+JOB_QUEUE_SIZE = 2  # Finished recordings that may wait for a worker; new recordings are refused beyond that
+DELIVERY_HOL_TIMEOUT = 20  # Seconds a slow recording may hold back later transcriptions before they go first; it is then only notified and logged to HISTORY_FILE, not pasted (None to always wait)
+CANCEL_SHORTCUT = '<esc>'  # Cancels the recording and any transcription not yet pasted (None to disable)
+
+# Transcription cache: the same speech (by hash of the audio) is answered from here instead of the API.
+# Live dictation never repeats byte for byte, so this mostly pays off when replaying recordings
+# or re-running spooled ones; it keeps transcripts on disk, so it is off by default
+CACHE_ENABLED = False
+CACHE_FILE = os.path.expanduser("~/.local/share/voice-transcriber/cache.sqlite3")  # None for memory only
+CACHE_MEMORY_ENTRIES = 128
+CACHE_DISK_ENTRIES = 5000  # Least recently used entries are dropped beyond this
+CACHE_TTL_DAYS = 30  # None to keep entries until evicted
+
+# Client-side rate limiting: requests wait for the API's rate limit instead of getting 429s,
+# and concurrency backs off on 429/5xx and grows again on success
+RATE_LIMIT_ENABLED = True
+API_INITIAL_CONCURRENCY = 2  # Grows up to HTTP_MAX_CONNECTIONS
+API_MAX_RETRIES = 2  # Retries of a failed request (connection error, timeout, 429, 5xx) before giving up (or spooling)
+
+# Hedged requests: send a duplicate when the API is slower than usual and use whichever answers first
+HEDGE_REQUESTS = False
+HEDGE_PERCENTILE = 90  # Hedge requests slower than this percentile of recent latencies
+HEDGE_INITIAL_DELAY = 3.0  # Seconds, until enough latencies have been seen
+HEDGE_MIN_DELAY = 0.5
+HEDGE_MAX_DELAY = 10.0
+HEDGE_BUDGET = 0.1  # Duplicates allowed as a share of all requests
+
+# Offline spool: recordings that fail for a temporary reason (no network, rate limit, server error)
+# are saved to disk and retried in the background until they go through
+SPOOL_ENABLED = True
+SPOOL_DIR = os.path.expanduser("~/.local/share/voice-transcriber/spool")
+SPOOL_MAX_MB = 200  # Oldest recordings are dropped beyond this
+SPOOL_ENCODINGS = ['opus', 'flac', 'wav']  # First available one is used for spooled audio
+SPOOL_RETRY_BASE_SECONDS = 5  # Retry backoff doubles from here, with random jitter
+SPOOL_RETRY_MAX_SECONDS = 600
+HISTORY_FILE = os.path.expanduser("~/.local/share/voice-transcriber/history.jsonl")  # Transcriptions of spooled recordings (None to disable)
+
+# Output settings
+OUTPUT_SINK = 'auto'  # 'paste', 'type' (keystrokes, clipboard untouched), 'jsonl', or 'auto' to type short transcriptions where typing is fast (macOS, X11 with python-xlib)
+TYPE_MAX_CHARS = 80  # Longest transcription 'auto' types instead of pasting
+OUTPUT_MIRRORS = []  # Sinks that also receive every transcription: 'jsonl' and/or 'socket'
+OUTPUT_JSONL_PATH = os.path.expanduser("~/.local/share/voice-transcriber/transcriptions.jsonl")  # File the jsonl sink appends to (None for stdout, shared with the logs)
+OUTPUT_SOCKET_PATH = os.path.join(os.getenv("XDG_RUNTIME_DIR") or os.path.expanduser("~/.local/share/voice-transcriber"),
+                                  "voice-transcriber.sock")  # Unix socket subscribers connect to, in a directory private to the user
+
+# Clipboard settings
+CLIPBOARD_RESTORE_DELAY = 2.0  # Seconds after pasting to put the previous clipboard text back (None keeps the transcription)
 
 # File settings
 TEMP_AUDIO_FILE = "/tmp/whisper_recording.wav"
+DEBUG_TEMP_AUDIO_FILE = False  # Debug: upload through a temporary file instead of from memory
 
 # Notification settings
-SHOW_NOTIFICATIONS = True
\ No newline at end of file
+SHOW_NOTIFICATIONS = True
+NOTIFICATION_MAX_AGE = 5  # Seconds after which a notification still waiting to be shown is dropped
\ No newline at end of file
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Audio encoders for the Voice Transcriber app
+Turn recorded PCM into the file format uploaded to Whisper and pick the fastest one per session
+"""
+
+import random
+import threading
+import wave
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Dict, Iterable, Optional, Sequence
+
+import numpy as np
+
+try:
+    import soundfile
+except (ImportError, OSError):  # OSError: the libsndfile library itself is missing
+    soundfile = None
+
+
+class AudioEncoder(ABC):
+    """Abstract base class for upload encoders"""
+
+    name = ''
+    extension = ''
+    # Rough encoded size relative to 16-bit PCM, used until real sessions are measured
+    typical_ratio = 1.0
+    # Rough encoding cost in seconds per PCM byte, likewise replaced by measurements
+    typical_seconds_per_byte = 0.0
+
+    def is_available(self) -> bool:
+        """Whether this encoder can be used on this machine"""
+        return True
+
+    @abstractmethod
+    def encode(self, pcm_segments: Iterable[memoryview], out: BinaryIO,
+               channels: int, sample_width: int, sample_rate: int) -> None:
+        """Write the concatenated PCM segments to out"""
+        pass
+
+
+class WavEncoder(AudioEncoder):
+    """Uncompressed 16-bit WAV"""
+
+    name = 'wav'
+    extension = 'wav'
+    typical_ratio = 1.0
+    typical_seconds_per_byte = 1e-10
+
+    def encode(self, pcm_segments: Iterable[memoryview], out: BinaryIO,
+               channels: int, sample_width: int, sample_rate: int) -> None:
+        with wave.open(out, 'wb') as wav_file:
+            wav_file.setnchannels(channels)
+            wav_file.setsampwidth(sample_width)
+            wav_file.setframerate(sample_rate)
+            for pcm in pcm_segments:
+                wav_file.writeframes(pcm)
+
+
+class SoundFileEncoder(AudioEncoder):
+    """Compressed formats written through libsndfile (optional `soundfile` package)"""
+
+    def __init__(self, name: str, extension: str, file_format: str, subtype: str,
+                 typical_ratio: float, typical_seconds_per_byte: float,
+                 compression_level: Optional[float] = None):
+        self.name = name
+        self.extension = extension
+        self.file_format = file_format
+        self.subtype = subtype
+        self.typical_ratio = typical_ratio
+        self.typical_seconds_per_byte = typical_seconds_per_byte
+        self.compression_level = compression_level
+
+    def is_available(self) -> bool:
+        if soundfile is None:
+            return False
+        return (self.file_format in soundfile.available_formats()
+                and self.subtype in soundfile.available_subtypes(self.file_format))
+
+    def encode(self, pcm_segments: Iterable[memoryview], out: BinaryIO,
+               channels: int, sample_width: int, sample_rate: int) -> None:
+        options = {}
+        if self.compression_level is not None:
+            options['compression_level'] = self.compression_level
+        with soundfile.SoundFile(out, 'w', samplerate=sample_rate, channels=channels,
+                                 subtype=self.subtype, format=self.file_format, **options) as sound_file:
+            for pcm in pcm_segments:
+                sound_file.write(np.frombuffer(pcm, dtype='<i2').reshape(-1, channels))
+
+
+ENCODERS: Dict[str, AudioEncoder] = {
+    'wav': WavEncoder(),
+    'flac': SoundFileEncoder('flac', 'flac', 'FLAC', 'PCM_16',
+                             typical_ratio=0.55, typical_seconds_per_byte=1e-7),
+    'opus': SoundFileEncoder('opus', 'ogg', 'OGG', 'OPUS',
+                             typical_ratio=0.08, typical_seconds_per_byte=6e-7),
+}
+
+
+def get_encoder(name: str) -> AudioEncoder:
+    """Look up an encoder by name"""
+    try:
+        return ENCODERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown audio encoding '{name}'. Choose from: {', '.join(ENCODERS)}")
+
+
+class EncoderSelector:
+    """Picks the encoder with the lowest expected encode plus upload time
+
+    Encode speed and compression ratio are learned per encoder from past
+    sessions, upload throughput from past requests (request time minus the
+    server's processing time). A share explore_rate of choices goes to
+    another encoder, so estimates that have gone stale get measured again.
+    """
+
+    def __init__(self, candidates: Sequence[str], initial_upload_bytes_per_second: float,
+                 smoothing: float = 0.3, explore_rate: float = 0.05):
+        self.candidates = [get_encoder(name) for name in candidates]
+        self.upload_bytes_per_second = initial_upload_bytes_per_second
+        self.smoothing = smoothing
+        self.explore_rate = explore_rate
+        self.seconds_per_byte = {encoder.name: encoder.typical_seconds_per_byte for encoder in self.candidates}
+        self.ratio = {encoder.name: encoder.typical_ratio for encoder in self.candidates}
+        self._lock = threading.Lock()
+
+        unavailable = [encoder.name for encoder in self.candidates if not encoder.is_available()]
+        if unavailable:
+            print(f"⚠️  Audio encodings unavailable (install soundfile): {', '.join(unavailable)}")
+        self.candidates = [encoder for encoder in self.candidates if encoder.is_available()] or [ENCODERS['wav']]
+
+    def _smooth(self, old: float, new: float) -> float:
+        return old + self.smoothing * (new - old)
+
+    def estimate_seconds(self, encoder: AudioEncoder, pcm_bytes: int) -> float:
+        """Expected encode plus upload time for pcm_bytes of audio"""
+        with self._lock:
+            encode_time = self.seconds_per_byte.get(encoder.name, encoder.typical_seconds_per_byte) * pcm_bytes
+            upload_time = self.ratio.get(encoder.name, encoder.typical_ratio) * pcm_bytes / self.upload_bytes_per_second
+        return encode_time + upload_time
+
+    def choose(self, pcm_bytes: int) -> AudioEncoder:
+        """Best encoder for a recording of pcm_bytes, or now and then another one to re-measure it"""
+        best = min(self.candidates, key=lambda encoder: self.estimate_seconds(encoder, pcm_bytes))
+        others = [encoder for encoder in self.candidates if encoder is not best]
+        if others and random.random() < self.explore_rate:
+            return random.choice(others)
+        return best
+
+    def observe_encode(self, encoder: AudioEncoder, pcm_bytes: int, encoded_bytes: int, seconds: float) -> None:
+        if pcm_bytes <= 0:
+            return
+        with self._lock:
+            old_speed = self.seconds_per_byte.get(encoder.name, encoder.typical_seconds_per_byte)
+            old_ratio = self.ratio.get(encoder.name, encoder.typical_ratio)
+            self.seconds_per_byte[encoder.name] = self._smooth(old_speed, seconds / pcm_bytes)
+            self.ratio[encoder.name] = self._smooth(old_ratio, encoded_bytes / pcm_bytes)
+
+    def observe_upload(self, uploaded_bytes: int, seconds: float) -> None:
+        """Record that uploaded_bytes took seconds to send, excluding server processing"""
+        if uploaded_bytes <= 0 or seconds <= 0:
+            return
+        with self._lock:
+            self.upload_bytes_per_second = self._smooth(self.upload_bytes_per_second, uploaded_bytes / seconds)
@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+Private file helpers for the Voice Transcriber app
+Creates the directories and files that hold recordings and transcripts readable by the user only
+"""
+
+import os
+from typing import TextIO
+
+
+def make_private_dirs(directory: str) -> None:
+    """Create directory and any missing parents with mode 0o700, not just the leaf"""
+    parent = os.path.dirname(directory)
+    if parent and parent != directory and not os.path.isdir(parent):
+        make_private_dirs(parent)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+
+
+def open_private_append(path: str) -> TextIO:
+    """Open path for appending text, creating it (and its directories) readable by the user only"""
+    make_private_dirs(os.path.dirname(path))
+    return open(os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600), 'a', encoding='utf-8')
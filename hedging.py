@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Hedged transcription requests for the Voice Transcriber app
+Sends a duplicate request when the first one is slower than usual and takes whichever answers first,
+trimming the slow tail of API latency at the cost of a small, capped amount of extra requests
+
+Run `python3 hedging.py --mock-server 8765` for a local stand-in of the transcription endpoint
+with injected latency, then point OPENAI_BASE_URL at http://127.0.0.1:8765/v1 to try it out.
+"""
+
+import json
+import queue
+import random
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Deque, Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from jobs import CancelToken, TranscriptionCancelled
+
+
+class HedgingPolicy:
+    """When to send a duplicate request, and how many of them we can afford
+
+    The delay is the given percentile of recent request latencies, clamped
+    to [min_delay, max_delay], so only requests slower than nearly all
+    recent ones get hedged. Every request earns budget_ratio of a hedge, up
+    to max_burst saved up, which caps duplicates at that share of traffic.
+    """
+
+    def __init__(self, percentile: float = 90, initial_delay: float = 3.0, min_delay: float = 0.5,
+                 max_delay: float = 10.0, budget_ratio: float = 0.1, max_burst: float = 2.0,
+                 window: int = 50, min_samples: int = 5):
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.budget_ratio = budget_ratio
+        self.max_burst = max_burst
+        self.min_samples = min_samples
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._budget = 1.0
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def delay(self) -> float:
+        """Seconds to wait for the first response before hedging"""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return self.initial_delay
+            latency = float(np.percentile(self._latencies, self.percentile))
+        return min(self.max_delay, max(self.min_delay, latency))
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def record_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+            self._budget = min(self.max_burst, self._budget + self.budget_ratio)
+
+    def try_hedge(self) -> bool:
+        """Spend budget on a duplicate request; False if there is none left"""
+        with self._lock:
+            if self._budget < 1.0:
+                return False
+            self._budget -= 1.0
+            self.hedges += 1
+            return True
+
+    def record_hedge_win(self) -> None:
+        with self._lock:
+            self.hedge_wins += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'hedges': self.hedges,
+                'hedge_wins': self.hedge_wins,
+                'hedge_ratio': round(self.hedges / self.requests, 3) if self.requests else 0.0,
+            }
+
+
+class HedgeResult(NamedTuple):
+    value: Any
+    attempts: int  # 2 if a duplicate was sent
+    winner: int  # Index of the attempt whose result was used
+    seconds: float
+
+
+def hedged_call(attempt: Callable[[CancelToken], Any], policy: Optional[HedgingPolicy],
+                cancel_token: Optional[CancelToken] = None, poll_interval: float = 0.1) -> HedgeResult:
+    """Run attempt, plus a duplicate if it is slow, and return the first success
+
+    Each attempt gets its own child of cancel_token and runs on its own
+    thread; the losing attempt's token is cancelled once a winner is known.
+    Without a policy no duplicate is sent. Cancelling cancel_token raises
+    TranscriptionCancelled right away without waiting for the attempts to
+    notice their cancelled tokens. If every attempt fails the last error is raised.
+    """
+    results: 'queue.Queue' = queue.Queue()
+    tokens = []
+    start = time.perf_counter()
+
+    def launch(index: int) -> None:
+        token = CancelToken(cancel_token)
+        tokens.append(token)
+
+        def run() -> None:
+            try:
+                results.put((index, True, attempt(token)))
+            except BaseException as e:
+                results.put((index, False, e))
+
+        threading.Thread(target=run, name=f'transcribe-attempt-{index}', daemon=True).start()
+
+    def next_result(timeout: Optional[float] = None) -> Optional[Tuple[int, bool, Any]]:
+        """Next finished attempt, or None once timeout has passed"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if cancel_token is not None and cancel_token.cancelled:
+                for token in tokens:
+                    token.cancel()
+                raise TranscriptionCancelled()
+            wait = poll_interval if deadline is None else min(poll_interval, deadline - time.monotonic())
+            if wait <= 0:
+                return None
+            try:
+                return results.get(timeout=wait)
+            except queue.Empty:
+                pass
+
+    if policy:
+        policy.record_request()
+    launch(0)
+    result = next_result(policy.delay() if policy else None)
+    if result is None:
+        if policy.try_hedge():
+            launch(1)
+        result = next_result()
+    index, ok, value = result
+
+    pending = len(tokens) - 1
+    while not ok and pending:
+        index, ok, value = next_result()
+        pending -= 1
+    for token in tokens:
+        token.cancel()  # Only the loser is still running
+
+    if not ok:
+        raise value
+    seconds = time.perf_counter() - start
+    if policy:
+        # Time to the first answer: for a hedged request a lower bound of the primary's latency
+        policy.observe(seconds)
+        if index == 1:
+            policy.record_hedge_win()
+    return HedgeResult(value, len(tokens), index, seconds)
+
+
+def run_mock_server(port: int, latency: float, slow_rate: float, slow_latency: float) -> None:
+    """Serve a fake transcription endpoint; slow_rate of requests take slow_latency instead of latency"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_HEAD(self):
+            self.send_response(200)
+            self.end_headers()
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            delay = slow_latency if random.random() < slow_rate else latency
+            time.sleep(delay)
+            body = json.dumps({'text': f'mock transcription after {delay:.1f}s'}).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            print(f"🧪 {self.command} {self.path} {args[1] if len(args) > 1 else ''}")
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    print(f"🧪 Mock transcription server on http://127.0.0.1:{port}/v1 "
+          f"({latency}s, {slow_rate:.0%} of requests {slow_latency}s)")
+    server.serve_forever()
+
+
+def _argument(name: str, default: float) -> float:
+    return float(sys.argv[sys.argv.index(name) + 1]) if name in sys.argv else default
+
+
+if __name__ == "__main__":
+    if '--mock-server' in sys.argv:
+        run_mock_server(
+            int(sys.argv[sys.argv.index('--mock-server') + 1]),
+            latency=_argument('--latency', 0.5),
+            slow_rate=_argument('--slow-rate', 0.2),
+            slow_latency=_argument('--slow-latency', 5.0)
+        )
+    else:
+        print("Usage: python3 hedging.py --mock-server PORT [--latency S] [--slow-rate P] [--slow-latency S]")
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Transcription job pipeline for the Voice Transcriber app
+Hands each finished recording to a fixed pool of workers, so back-to-back dictations queue up
+instead of each starting its own thread
+"""
+
+import io
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from audio_buffer import PCMBuffer
+from stats import SessionStats
+
+
+class TranscriptionCancelled(Exception):
+    """Raised inside work whose CancelToken was cancelled"""
+
+
+class CancelToken:
+    """Thread-safe cancellation flag; a child token is also cancelled by its parent"""
+
+    def __init__(self, parent: Optional['CancelToken'] = None):
+        self.parent = parent
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set() or (self.parent is not None and self.parent.cancelled)
+
+    def check(self) -> None:
+        """Raise TranscriptionCancelled if cancelled"""
+        if self.cancelled:
+            raise TranscriptionCancelled()
+
+
+def cancellable_chunks(segments: Iterable[memoryview], token: CancelToken,
+                       chunk_bytes: int = 1 << 20) -> Iterator[memoryview]:
+    """Yield segments in chunks of at most chunk_bytes, checking token before each
+
+    Lets an encoder loop stop soon after a cancel. chunk_bytes must be a
+    multiple of the frame size.
+    """
+    for segment in segments:
+        for start in range(0, len(segment), chunk_bytes):
+            token.check()
+            yield segment[start:start + chunk_bytes]
+
+
+class CancellableReader(io.RawIOBase):
+    """File wrapper that fails the next read once its token is cancelled
+
+    An upload reads its file in chunks while sending, so cancelling aborts
+    a request that is still uploading. One that is already waiting for the
+    response is aborted by request_abort.AbortableBackend instead.
+    """
+
+    def __init__(self, raw: BinaryIO, token: CancelToken):
+        super().__init__()
+        self.raw = raw
+        self.token = token
+        self.name = getattr(raw, 'name', 'audio')
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        self.token.check()
+        data = self.raw.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def seekable(self) -> bool:
+        return self.raw.seekable()
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self.raw.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self.raw.tell()
+
+    def close(self) -> None:
+        self.raw.close()
+        super().close()
+
+
+class TranscriptionJob(NamedTuple):
+    """Everything one recording needs to be processed, owned by the job once submitted"""
+    session_id: int
+    sequence: int  # Position in the output order
+    audio: PCMBuffer
+    stats: SessionStats
+    segment_futures: Tuple[Future, ...]
+    tail_offset: int
+    cancel_token: CancelToken
+    created_at: float
+
+
+class JobPipeline:
+    """Fixed pool of workers fed through a queue, with admission control as backpressure
+
+    A recording reserves a slot when it starts and the slot is freed once its
+    job has been processed, so at most workers + max_pending recordings are
+    in the pipeline. When all slots are taken a new recording is refused
+    rather than queued without bound.
+    """
+
+    def __init__(self, handler: Callable[[TranscriptionJob], None], workers: int = 1, max_pending: int = 2):
+        self.handler = handler
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._queue: 'queue.Queue[Optional[TranscriptionJob]]' = queue.Queue()
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.started = 0
+        self.max_queue_depth = 0
+        self._wait_total_ms = 0.0
+        self.max_wait_ms = 0.0
+        self._workers = [
+            threading.Thread(target=self._run, name=f'transcription-{i}', daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def reserve(self) -> bool:
+        """Claim a slot for a new recording; False when the pipeline is full"""
+        if self._slots.acquire(blocking=False):
+            return True
+        with self._lock:
+            self.rejected += 1
+        return False
+
+    def cancel_reservation(self) -> None:
+        """Give back a slot for a recording that produced no job"""
+        self._slots.release()
+
+    def submit(self, job: TranscriptionJob) -> None:
+        """Queue a job for a recording that holds a reservation"""
+        self._queue.put(job)
+        with self._lock:
+            self.submitted += 1
+            self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            wait_ms = (time.monotonic() - job.created_at) * 1000
+            job.stats.add_stage_time('queue_wait', wait_ms)
+            with self._lock:
+                self.started += 1
+                self._wait_total_ms += wait_ms
+                self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            try:
+                self.handler(job)
+            except Exception as e:
+                print(f"❌ Transcription job {job.session_id} failed: {e}")
+            finally:
+                with self._lock:
+                    self.completed += 1
+                self._slots.release()
+
+    def snapshot(self) -> Dict[str, float]:
+        """Pipeline counters since startup"""
+        with self._lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'max_queue_depth': self.max_queue_depth,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'avg_wait_ms': round(self._wait_total_ms / self.started, 1) if self.started else 0.0,
+                'max_wait_ms': round(self.max_wait_ms, 1),
+            }
+
+    def close(self) -> None:
+        """Let the workers exit after the jobs already queued"""
+        for _ in self._workers:
+            self._queue.put(None)
+
+
+class OrderedDelivery:
+    """Reorder stage that runs each job's output action in recording order
+
+    Jobs finish in any order; complete() parks the action until every
+    earlier sequence number has been delivered, and a single delivery
+    thread runs the actions one at a time. If the head of the line keeps
+    later results waiting for longer than hol_timeout it is skipped; should
+    it finish after all, its late_action runs instead of its action, since
+    output in order (e.g. pasting at the cursor) no longer makes sense then.
+    """
+
+    def __init__(self, hol_timeout: Optional[float] = 20.0):
+        self.hol_timeout = hol_timeout
+        self.delivered = 0
+        self.skipped = 0
+        self.late = 0
+        self.max_reorder_wait_ms = 0.0
+        self._next_sequence = 0  # Next number handed out
+        self._head = 0  # Next number to deliver
+        self._head_since = time.monotonic()
+        self._ready: Dict[int, Tuple[float, Optional[Callable[[], None]]]] = {}
+        self._late: List[Optional[Callable[[], None]]] = []
+        self._skipped: Set[int] = set()
+        self._condition = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='ordered-delivery', daemon=True)
+        self._thread.start()
+
+    def next_sequence(self) -> int:
+        """Number for a new job, in recording order"""
+        with self._condition:
+            sequence = self._next_sequence
+            self._next_sequence += 1
+            return sequence
+
+    def complete(self, sequence: int, action: Optional[Callable[[], None]],
+                 late_action: Optional[Callable[[], None]] = None) -> None:
+        """Hand in a job's output; None when it has nothing to deliver
+
+        late_action is what to run instead if the job was skipped as too slow.
+        """
+        with self._condition:
+            if sequence in self._skipped:
+                self._skipped.discard(sequence)
+                if late_action is not None:
+                    self._late.append(late_action)
+            else:
+                self._ready[sequence] = (time.monotonic(), action)
+            self._condition.notify()
+
+    def _next_action(self) -> Tuple[bool, Optional[Callable[[], None]]]:
+        """Wait for the next thing to deliver; (False, None) on close"""
+        with self._condition:
+            while self._running:
+                if self._late:
+                    self.late += 1
+                    self.delivered += 1
+                    return True, self._late.pop(0)
+                if self._head in self._ready:
+                    ready_at, action = self._ready.pop(self._head)
+                    self.max_reorder_wait_ms = max(self.max_reorder_wait_ms, (time.monotonic() - ready_at) * 1000)
+                    self._advance()
+                    if action is not None:
+                        self.delivered += 1
+                    return True, action
+                if self._ready and self.hol_timeout is not None:
+                    # Later results are waiting for the head of the line
+                    blocked_since = max(self._head_since, min(ready_at for ready_at, _ in self._ready.values()))
+                    remaining = blocked_since + self.hol_timeout - time.monotonic()
+                    if remaining <= 0:
+                        print(f"⚠️  Transcription {self._head} is taking too long, delivering later ones first")
+                        self._skipped.add(self._head)
+                        self.skipped += 1
+                        self._advance()
+                        continue
+                    self._condition.wait(remaining)
+                else:
+                    self._condition.wait()
+            return False, None
+
+    def _advance(self) -> None:
+        self._head += 1
+        self._head_since = time.monotonic()
+
+    def _run(self) -> None:
+        while True:
+            running, action = self._next_action()
+            if not running:
+                return
+            if action is None:
+                continue
+            try:
+                action()
+            except Exception as e:
+                print(f"❌ Delivering transcription failed: {e}")
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._condition:
+            return {
+                'waiting': len(self._ready),
+                'delivered': self.delivered,
+                'skipped': self.skipped,
+                'late': self.late,
+                'max_reorder_wait_ms': round(self.max_reorder_wait_ms, 1),
+            }
+
+    def close(self) -> None:
+        with self._condition:
+            self._running = False
+            self._condition.notify()
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+In-process key injection for the Voice Transcriber app on Linux
+Sends Ctrl+V (and typed text) through one persistent X11 XTest connection or a uinput device,
+instead of starting xdotool or ydotool for every dictation
+
+Run `python3 key_injection.py --display :99` against an Xvfb server to check that
+the XTest injector presses and releases the paste keys.
+"""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from Xlib import X, XK
+    from Xlib import display as xdisplay
+    from Xlib.ext import xtest
+except ImportError:
+    xdisplay = None
+
+try:
+    from evdev import UInput, ecodes
+except ImportError:
+    UInput = None
+
+
+class KeyInjector(ABC):
+    """Sends synthetic key presses to the focused window"""
+
+    name = 'abstract'
+    # Types in-process, in one batch, with the user's keyboard layout: fast and safe enough
+    # to replace pasting. Forked tools wait per key and uinput assumes a US layout.
+    native_typing = False
+
+    @abstractmethod
+    def paste(self) -> None:
+        """Press and release Ctrl+V"""
+        pass
+
+    @abstractmethod
+    def type_text(self, text: str) -> None:
+        """Type text as individual key presses"""
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def _keysym_for_char(char: str) -> int:
+    """X keysym for a character: Latin-1 maps directly, the rest use the Unicode range"""
+    if char == '\n':
+        return XK.XK_Return
+    if char == '\t':
+        return XK.XK_Tab
+    codepoint = ord(char)
+    if 0x20 <= codepoint <= 0x7e or 0xa0 <= codepoint <= 0xff:
+        return codepoint
+    return 0x01000000 | codepoint
+
+
+class XTestInjector(KeyInjector):
+    """XTest key injection over one long-lived X display connection
+
+    Characters without a key in the current layout are typed by temporarily
+    binding their keysym to a spare keycode, the way xdotool does.
+    """
+
+    name = 'xtest'
+    native_typing = True
+
+    def __init__(self, display_name: Optional[str] = None):
+        if xdisplay is None:
+            raise RuntimeError("python-xlib is not installed")
+        self.display = xdisplay.Display(display_name)
+        if not self.display.has_extension('XTEST'):
+            self.display.close()
+            raise RuntimeError("X server has no XTEST extension")
+        self._lock = threading.Lock()
+        self._control = self.display.keysym_to_keycode(XK.XK_Control_L)
+        self._shift = self.display.keysym_to_keycode(XK.XK_Shift_L)
+        self._v = self.display.keysym_to_keycode(XK.XK_v)
+        self._scratch = self._find_spare_keycode()
+
+    def _find_spare_keycode(self) -> Optional[int]:
+        first = self.display.display.info.min_keycode
+        count = self.display.display.info.max_keycode - first + 1
+        mapping = self.display.get_keyboard_mapping(first, count)
+        for offset in range(count - 1, -1, -1):
+            if not any(mapping[offset]):
+                return first + offset
+        return None
+
+    def _tap(self, keycode: int, modifiers: Tuple[int, ...] = ()) -> None:
+        for modifier in modifiers:
+            xtest.fake_input(self.display, X.KeyPress, modifier)
+        xtest.fake_input(self.display, X.KeyPress, keycode)
+        xtest.fake_input(self.display, X.KeyRelease, keycode)
+        for modifier in reversed(modifiers):
+            xtest.fake_input(self.display, X.KeyRelease, modifier)
+
+    def paste(self) -> None:
+        with self._lock:
+            self._tap(self._v, (self._control,))
+            self.display.sync()
+
+    def type_text(self, text: str) -> None:
+        with self._lock:
+            remapped = False
+            try:
+                for char in text:
+                    keysym = _keysym_for_char(char)
+                    keycode, index = next(iter(self.display.keysym_to_keycodes(keysym)), (0, 0))
+                    if keycode and index in (0, 1):
+                        self._tap(keycode, (self._shift,) if index == 1 else ())
+                        continue
+                    if self._scratch is None:
+                        raise RuntimeError(f"no key for {char!r} and no spare keycode to bind it to")
+                    self.display.change_keyboard_mapping(self._scratch, [(keysym, keysym)])
+                    self.display.sync()
+                    remapped = True
+                    self._tap(self._scratch)
+                    # Let the client see the key before the next remap replaces it
+                    self.display.sync()
+                    time.sleep(0.01)
+                self.display.sync()
+            finally:
+                if remapped:
+                    self.display.change_keyboard_mapping(self._scratch, [(0, 0)])
+                    self.display.sync()
+
+    def close(self) -> None:
+        with self._lock:
+            self.display.close()
+
+
+# US layout: shifted characters and the key they share, and keys not named after their character
+_US_SHIFTED = dict(zip('!@#$%^&*()_+{}|:"~<>?', '1234567890-=[]\\;\'`,./'))
+_US_KEYS = {
+    '-': 'MINUS', '=': 'EQUAL', '[': 'LEFTBRACE', ']': 'RIGHTBRACE', '\\': 'BACKSLASH',
+    ';': 'SEMICOLON', "'": 'APOSTROPHE', '`': 'GRAVE', ',': 'COMMA', '.': 'DOT',
+    '/': 'SLASH', ' ': 'SPACE', '\n': 'ENTER', '\t': 'TAB',
+}
+
+
+def _uinput_key(char: str) -> Optional[Tuple[str, bool]]:
+    """evdev key name and shift state for a character on a US layout"""
+    if char in _US_SHIFTED:
+        return _uinput_key(_US_SHIFTED[char])[0], True
+    if char.isascii() and char.isalnum():
+        return 'KEY_' + char.upper(), char.isupper()
+    if char in _US_KEYS:
+        return 'KEY_' + _US_KEYS[char], False
+    return None
+
+
+class UInputInjector(KeyInjector):
+    """Virtual keyboard through /dev/uinput, for Wayland and other non-X11 sessions
+
+    The device is created once and kept, since compositors need a moment to
+    pick up a new input device. Typing assumes a US layout and is limited
+    to printable ASCII.
+    """
+
+    name = 'uinput'
+
+    def __init__(self):
+        if UInput is None:
+            raise RuntimeError("python-evdev is not installed")
+        keys = {ecodes.KEY_LEFTCTRL, ecodes.KEY_LEFTSHIFT}
+        for code in range(0x20, 0x7f):
+            key = _uinput_key(chr(code))
+            if key:
+                keys.add(ecodes.ecodes[key[0]])
+        keys.update((ecodes.KEY_ENTER, ecodes.KEY_TAB))
+        self.device = UInput({ecodes.EV_KEY: sorted(keys)}, name='voice-transcriber-keyboard')
+        self._lock = threading.Lock()
+
+    def _tap(self, keycode: int, modifiers: Tuple[int, ...] = ()) -> None:
+        for modifier in modifiers:
+            self.device.write(ecodes.EV_KEY, modifier, 1)
+        self.device.write(ecodes.EV_KEY, keycode, 1)
+        self.device.syn()
+        self.device.write(ecodes.EV_KEY, keycode, 0)
+        for modifier in reversed(modifiers):
+            self.device.write(ecodes.EV_KEY, modifier, 0)
+        self.device.syn()
+
+    def paste(self) -> None:
+        with self._lock:
+            self._tap(ecodes.KEY_V, (ecodes.KEY_LEFTCTRL,))
+
+    def type_text(self, text: str) -> None:
+        keys = [_uinput_key(char) for char in text]
+        if None in keys:
+            raise ValueError("uinput typing only supports printable ASCII")
+        with self._lock:
+            for name, shift in keys:
+                self._tap(ecodes.ecodes[name], (ecodes.KEY_LEFTSHIFT,) if shift else ())
+
+    def close(self) -> None:
+        with self._lock:
+            self.device.close()
+
+
+class CommandInjector(KeyInjector):
+    """Fallback that runs xdotool or ydotool for each injection"""
+
+    def __init__(self, tool: str):
+        self.name = tool
+
+    def paste(self) -> None:
+        subprocess.run([self.name, 'key', 'ctrl+v'], check=True)
+
+    def type_text(self, text: str) -> None:
+        if self.name == 'xdotool':
+            subprocess.run(['xdotool', 'type', '--clearmodifiers', '--', text], check=True)
+        else:
+            subprocess.run([self.name, 'type', '--', text], check=True)
+
+
+def injector_order(environ: Optional[Dict[str, str]] = None) -> List[str]:
+    """Injectors to try for this session, best first"""
+    environ = os.environ if environ is None else environ
+    if environ.get('WAYLAND_DISPLAY') or environ.get('XDG_SESSION_TYPE') == 'wayland':
+        # XTest through XWayland only reaches X11 clients
+        return ['uinput', 'ydotool', 'xtest', 'xdotool']
+    if environ.get('DISPLAY'):
+        return ['xtest', 'xdotool', 'uinput', 'ydotool']
+    return ['uinput', 'ydotool']
+
+
+def create_key_injector(available_tools: List[str], display_name: Optional[str] = None,
+                        order: Optional[List[str]] = None) -> Optional[KeyInjector]:
+    """First injector in order that can be set up, or None
+
+    available_tools lists the command-line fallbacks installed on the system.
+    """
+    for name in order or injector_order():
+        try:
+            if name == 'xtest':
+                return XTestInjector(display_name)
+            if name == 'uinput':
+                return UInputInjector()
+        except Exception:
+            continue  # Missing module, no X server or no access to /dev/uinput
+        if name in available_tools:
+            return CommandInjector(name)
+    return None
+
+
+def _check_display(display_name: str) -> None:
+    """Inject keys on the given display and confirm they went down and came back up"""
+    injector = XTestInjector(display_name)
+
+    def is_down(keycode: int) -> bool:
+        keymap = injector.display.query_keymap()
+        return bool(keymap[keycode // 8] & (1 << (keycode % 8)))
+
+    xtest.fake_input(injector.display, X.KeyPress, injector._control)
+    injector.display.sync()
+    pressed = is_down(injector._control)
+    xtest.fake_input(injector.display, X.KeyRelease, injector._control)
+    injector.paste()
+    injector.type_text('Hello, wörld! ✓')
+    released = not is_down(injector._control) and not is_down(injector._v)
+    injector.close()
+    print(f"{'✅' if pressed and released else '❌'} XTest injection on {display_name}: "
+          f"pressed={pressed} released={released}")
+
+
+if __name__ == "__main__":
+    if '--display' in sys.argv:
+        _check_display(sys.argv[sys.argv.index('--display') + 1])
+    else:
+        print("Usage: python3 key_injection.py --display :99")
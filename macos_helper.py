@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Persistent AppleScript helper for the Voice Transcriber app
+Keeps one osascript (JXA) process running and sends it notification, clipboard and keystroke commands over a pipe,
+instead of spawning a shell and a fresh AppleScript interpreter for every call
+
+Protocol: one JSON object per line on the helper's stdin, e.g.
+    {"cmd": "notify", "title": "Voice Transcriber", "message": "Recording started"}
+    {"cmd": "copy", "text": "Hello"}
+    {"cmd": "paste"}
+    {"cmd": "type", "text": "Hello", "id": 7}
+    {"cmd": "restore"}
+A command with an id is answered once it has run, with one JSON line on stdout:
+    {"id": 7, "ok": true}  or  {"id": 7, "ok": false, "error": "..."}
+
+Run `python3 macos_helper.py --stub` for a stand-in helper that speaks the same
+protocol and acknowledges each command on stdout, so the client can be tested on Linux.
+"""
+
+import itertools
+import json
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+JXA_SCRIPT = r"""
+ObjC.import('Foundation');
+
+function run() {
+    var app = Application.currentApplication();
+    app.includeStandardAdditions = true;
+    var systemEvents = Application('System Events');
+    var pasteboard = $.NSPasteboard.generalPasteboard;
+    var saved = null;  // Text to put back on restore
+    var ourChange = -1;  // Pasteboard change count right after our last copy
+    var stdin = $.NSFileHandle.fileHandleWithStandardInput;
+    var stdout = $.NSFileHandle.fileHandleWithStandardOutput;
+    var buffer = $.NSMutableData.alloc.init;
+
+    while (true) {
+        var data = stdin.availableData;
+        if (data.length === 0) {
+            break;  // EOF: the app went away
+        }
+        buffer.appendData(data);
+        var text = $.NSString.alloc.initWithDataEncoding(buffer, $.NSUTF8StringEncoding);
+        if (text.isNil()) {
+            continue;  // Incomplete UTF-8 sequence, wait for the rest
+        }
+        var lines = text.js.split('\n');
+        var rest = lines.pop();
+        buffer = $.NSMutableData.dataWithData($(rest).dataUsingEncoding($.NSUTF8StringEncoding));
+
+        lines.forEach(function (line) {
+            if (!line) {
+                return;
+            }
+            var command = null;
+            var reply = { ok: true };
+            try {
+                command = JSON.parse(line);
+                if (command.cmd === 'notify') {
+                    app.displayNotification(command.message, { withTitle: command.title });
+                } else if (command.cmd === 'copy') {
+                    if (pasteboard.changeCount !== ourChange) {
+                        var previous = pasteboard.stringForType($.NSPasteboardTypeString);
+                        saved = previous.isNil() ? null : previous.js;
+                    }
+                    pasteboard.clearContents;
+                    pasteboard.setStringForType($(command.text), $.NSPasteboardTypeString);
+                    ourChange = pasteboard.changeCount;
+                } else if (command.cmd === 'paste') {
+                    systemEvents.keystroke('v', { using: 'command down' });
+                } else if (command.cmd === 'type') {
+                    systemEvents.keystroke(command.text);
+                } else if (command.cmd === 'restore') {
+                    // Only if nobody copied anything since our text went on the pasteboard
+                    if (saved !== null && pasteboard.changeCount === ourChange) {
+                        pasteboard.clearContents;
+                        pasteboard.setStringForType($(saved), $.NSPasteboardTypeString);
+                    }
+                    saved = null;
+                    ourChange = -1;
+                }
+            } catch (e) {
+                // Report it and keep serving later commands
+                reply = { ok: false, error: String(e) };
+            }
+            if (command !== null && command.id !== undefined) {
+                reply.id = command.id;
+                stdout.writeData($(JSON.stringify(reply) + '\n').dataUsingEncoding($.NSUTF8StringEncoding));
+            }
+        });
+    }
+}
+"""
+
+OSASCRIPT_COMMAND = ['osascript', '-l', 'JavaScript', '-e', JXA_SCRIPT]
+STUB_COMMAND = [sys.executable, __file__, '--stub']
+
+
+class OsaHelper:
+    """Client for the long-lived helper process, restarting it if it dies
+
+    Most commands are fire-and-forget. request() also waits up to
+    reply_timeout seconds for the helper to confirm the command ran, for
+    callers that need to know whether it worked.
+    """
+
+    def __init__(self, command: Optional[List[str]] = None, max_restarts: int = 3, restart_window: float = 60.0,
+                 reply_timeout: float = 10.0):
+        self.command = command or OSASCRIPT_COMMAND
+        self.max_restarts = max_restarts
+        self.restart_window = restart_window
+        self.reply_timeout = reply_timeout
+        self.process: Optional[subprocess.Popen] = None
+        self._restarts: List[float] = []
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._replies: Dict[int, Optional[Dict[str, Any]]] = {}  # Request id -> reply, None until it arrives
+        self._replied = threading.Condition()
+
+    def start(self) -> None:
+        """Start the helper process ahead of the first command"""
+        with self._lock:
+            self._ensure_running()
+
+    def _ensure_running(self) -> subprocess.Popen:
+        if self.process is not None and self.process.poll() is None:
+            return self.process
+
+        if self.process is not None:
+            # Restarting a helper that keeps crashing would just add latency to every call
+            now = time.monotonic()
+            self._restarts = [t for t in self._restarts if now - t < self.restart_window] + [now]
+            if len(self._restarts) > self.max_restarts:
+                raise RuntimeError("macOS helper keeps exiting, giving up on it")
+
+        self.process = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
+        )
+        threading.Thread(target=self._read_replies, args=(self.process,), name='osa-helper-replies',
+                         daemon=True).start()
+        return self.process
+
+    def _read_replies(self, process: subprocess.Popen) -> None:
+        for line in process.stdout:
+            try:
+                reply = json.loads(line)
+            except ValueError:
+                continue
+            with self._replied:
+                if isinstance(reply, dict) and reply.get('id') in self._replies:
+                    self._replies[reply['id']] = reply
+                    self._replied.notify_all()
+
+    def send(self, command: str, **fields: Any) -> None:
+        """Send one command; a single write to the helper's stdin"""
+        line = (json.dumps({'cmd': command, **fields}) + '\n').encode('utf-8')
+        with self._lock:
+            for attempt in range(2):
+                process = self._ensure_running()
+                try:
+                    process.stdin.write(line)
+                    process.stdin.flush()
+                    return
+                except (BrokenPipeError, OSError):
+                    # Died since the last command; the next loop restarts it
+                    process.kill()
+                    process.wait()
+                    if attempt:
+                        raise
+
+    def request(self, command: str, **fields: Any) -> None:
+        """Send one command and wait until the helper has run it
+
+        Raises RuntimeError if the command failed or wasn't confirmed within reply_timeout.
+        """
+        request_id = next(self._ids)
+        with self._replied:
+            self._replies[request_id] = None
+        try:
+            self.send(command, id=request_id, **fields)
+            deadline = time.monotonic() + self.reply_timeout
+            with self._replied:
+                while self._replies[request_id] is None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise RuntimeError(f"macOS helper did not confirm '{command}'")
+                    self._replied.wait(remaining)
+                reply = self._replies[request_id]
+        finally:
+            with self._replied:
+                self._replies.pop(request_id, None)
+        if not reply.get('ok'):
+            raise RuntimeError(f"macOS helper could not {command}: {reply.get('error', 'unknown error')}")
+
+    def notify(self, title: str, message: str) -> None:
+        self.send('notify', title=title, message=message)
+
+    def copy(self, text: str) -> None:
+        self.send('copy', text=text)
+
+    def paste(self) -> None:
+        self.send('paste')
+
+    def type(self, text: str) -> None:
+        """Type text, returning once it has been typed; raises RuntimeError if it wasn't"""
+        self.request('type', text=text)
+
+    def close(self) -> None:
+        """Close the pipe; the helper exits on EOF"""
+        with self._lock:
+            if self.process is None:
+                return
+            try:
+                self.process.stdin.close()
+                self.process.wait(timeout=2)
+            except (OSError, subprocess.TimeoutExpired):
+                self.process.kill()
+            self.process = None
+
+
+def run_stub() -> None:
+    """Stand-in helper: acknowledges every command as a JSON line on stdout"""
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            command: Dict[str, Any] = json.loads(line)
+            reply = {'ok': True, **command}
+        except ValueError as e:
+            reply = {'ok': False, 'error': str(e)}
+        print(json.dumps(reply), flush=True)
+
+
+if __name__ == "__main__":
+    if '--stub' in sys.argv:
+        run_stub()
+    else:
+        print("Usage: python3 macos_helper.py --stub")
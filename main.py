@@ -4,33 +4,185 @@ Cross-Platform Global Voice Transcription App
 Supports macOS and Linux - automatically detects platform and uses appropriate shortcuts
 """
 
+import io
+import itertools
 import os
 import sys
 import threading
 import time
 import tempfile
-import wave
-from typing import Optional
+from contextlib import nullcontext
+from functools import partial
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import BinaryIO, Callable, Dict, Iterable, List, Optional, Tuple
 
+import httpx
 import pyaudio
-import pyperclip
 from openai import OpenAI
 from pynput import keyboard
 
 import config
-from platform_utils import get_platform_handler, get_platform_info, check_linux_dependencies
+from audio_buffer import BufferPool, MemoryViewReader, PCMBuffer, RingBuffer, build_wav_header
+from cache import TranscriptionCache, cache_key
+from capture_process import CaptureProcess
+from encoders import AudioEncoder, EncoderSelector, get_encoder
+from hedging import HedgingPolicy, hedged_call
+from jobs import (CancelToken, CancellableReader, JobPipeline, OrderedDelivery, TranscriptionCancelled,
+                  TranscriptionJob, cancellable_chunks)
+from notifications import NotificationDispatcher
+from prewarm import ConnectionWarmer
+from ratelimit import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, AdaptiveRateLimiter
+from request_abort import AbortableBackend
+from output_sinks import ClipboardPasteSink, JsonlSink, OutputSink, TypingSink, UnixSocketSink, select_sink
+from platform_utils import get_capabilities, get_platform_handler, get_platform_info, check_linux_dependencies
+from resample import StreamingResampler
+from spool import TranscriptionSpool, append_history, is_retriable_error
+from stats import CaptureHealth, SessionStats
+from vad import EndpointDetector, find_speech_segments
 
 
 class VoiceTranscriber:
     def __init__(self):
-        self.client = OpenAI(api_key=config.OPENAI_API_KEY)
+        # One pooled HTTP client, so a connection warmed at record start is reused by the upload
+        transport = httpx.HTTPTransport(
+            limits=httpx.Limits(
+                max_connections=config.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=config.HTTP_MAX_CONNECTIONS,
+                keepalive_expiry=config.HTTP_KEEPALIVE_SECONDS
+            )
+        )
+        # Its connections can be shut down under a cancelled request, which frees the request's slot
+        self.request_aborter: Optional[AbortableBackend] = AbortableBackend()
+        if not self.request_aborter.attach(transport):
+            print("⚠️  This httpx version can't abort requests; cancelled ones run to completion")
+            self.request_aborter = None
+        self.http_client = httpx.Client(
+            transport=transport,
+            timeout=httpx.Timeout(600.0, connect=5.0),
+            follow_redirects=True
+        )
+        # Requests are paced by the API's rate limit headers; failed requests are retried by the
+        # limiter, which also backs off concurrency on 429s and 5xx, instead of by the SDK
+        self.rate_limiter: Optional[AdaptiveRateLimiter] = None
+        if config.RATE_LIMIT_ENABLED:
+            self.rate_limiter = AdaptiveRateLimiter(
+                initial_concurrency=config.API_INITIAL_CONCURRENCY,
+                max_concurrency=config.HTTP_MAX_CONNECTIONS,
+                max_retries=config.API_MAX_RETRIES
+            )
+        self.client = OpenAI(api_key=config.OPENAI_API_KEY, base_url=config.OPENAI_BASE_URL, http_client=self.http_client,
+                             max_retries=0 if self.rate_limiter else config.API_MAX_RETRIES)
+        self.connection_warmer: Optional[ConnectionWarmer] = None
+        if config.PREWARM_CONNECTION:
+            self.connection_warmer = ConnectionWarmer(self.http_client, config.OPENAI_BASE_URL, config.PREWARM_INTERVAL)
+        self.hedging_policy: Optional[HedgingPolicy] = None
+        if config.HEDGE_REQUESTS:
+            self.hedging_policy = HedgingPolicy(
+                percentile=config.HEDGE_PERCENTILE,
+                initial_delay=config.HEDGE_INITIAL_DELAY,
+                min_delay=config.HEDGE_MIN_DELAY,
+                max_delay=config.HEDGE_MAX_DELAY,
+                budget_ratio=config.HEDGE_BUDGET
+            )
+        
+        # Finished recordings are processed by a fixed set of workers
+        self.job_pipeline = JobPipeline(self.process_recording, workers=config.JOB_WORKERS,
+                                        max_pending=config.JOB_QUEUE_SIZE)
+        # Jobs may finish out of order, their output is put back in recording order
+        self.ordered_delivery = OrderedDelivery(hol_timeout=config.DELIVERY_HOL_TIMEOUT)
+        self._session_ids = itertools.count(1)
+        self.session_id = 0
+        self.session_token: Optional[CancelToken] = None
+        self._active_jobs: Dict[int, CancelToken] = {}  # Session id -> token, until delivered
+        self._jobs_lock = threading.Lock()
         self.is_recording = False
         self.audio_stream: Optional[pyaudio.Stream] = None
-        self.audio_data = []
         self.pyaudio_instance = pyaudio.PyAudio()
+        self.sample_width = self.pyaudio_instance.get_sample_size(pyaudio.paInt16)
+        self.capture_rate, self.capture_channels = self._query_input_format()
+        self.converter = StreamingResampler(self.capture_rate, config.SAMPLE_RATE,
+                                            self.capture_channels, config.CHANNELS)
+        bytes_per_second = config.SAMPLE_RATE * config.CHANNELS * self.sample_width
+        self.buffer_pool = BufferPool(
+            max_buffers=config.BUFFER_POOL_SIZE,
+            spill_threshold=int(config.SPILL_THRESHOLD_SECONDS * bytes_per_second) if config.SPILL_THRESHOLD_SECONDS else None,
+            spill_grow_bytes=config.SPILL_GROW_MB << 20,
+            spill_dir=config.SPILL_DIR
+        )
+        self.audio_buffer: Optional[PCMBuffer] = None
+        self.session_stats: Optional[SessionStats] = None
+        self.last_session_stats: Optional[SessionStats] = None
+        self.encoder_selector = EncoderSelector(
+            config.AUTO_ENCODINGS if config.AUDIO_ENCODING == 'auto' else [config.AUDIO_ENCODING],
+            initial_upload_bytes_per_second=config.ESTIMATED_UPLOAD_KBPS * 1000 / 8,
+            explore_rate=config.ENCODER_EXPLORE_RATE
+        )
+        self._capture_lock = threading.Lock()
+        self.pre_roll: Optional[RingBuffer] = None
+        self.capture_process: Optional[CaptureProcess] = None
+        self.capture_health = CaptureHealth()
+        self.endpoint_detector: Optional[EndpointDetector] = None
+        if config.AUTO_STOP:
+            self.endpoint_detector = EndpointDetector(
+                config.SAMPLE_RATE, config.CHANNELS,
+                trailing_silence_ms=config.AUTO_STOP_SILENCE_MS,
+                min_speech_ms=config.AUTO_STOP_MIN_SPEECH_MS,
+                energy_margin_db=config.VAD_ENERGY_MARGIN_DB,
+                min_energy_dbfs=config.VAD_MIN_ENERGY_DBFS
+            )
+        
+        # Streaming mode: transcribe finished segments while still recording
+        self.segmenter: Optional[EndpointDetector] = None
+        self.segment_executor: Optional[ThreadPoolExecutor] = None
+        self._segment_futures: List[Future] = []
+        self._segment_start = 0
+        if config.STREAMING_TRANSCRIPTION:
+            self.segmenter = EndpointDetector(
+                config.SAMPLE_RATE, config.CHANNELS,
+                trailing_silence_ms=config.STREAMING_PAUSE_MS,
+                min_speech_ms=config.VAD_MIN_SPEECH_MS,
+                energy_margin_db=config.VAD_ENERGY_MARGIN_DB,
+                min_energy_dbfs=config.VAD_MIN_ENERGY_DBFS
+            )
+            self.segment_executor = ThreadPoolExecutor(
+                max_workers=config.STREAMING_WORKERS, thread_name_prefix='segment'
+            )
         
-        # Get platform handler
+        # Get platform handler; the first capability probe decides the cache file
+        get_capabilities(config.CAPABILITY_CACHE_FILE)
         self.platform_handler = get_platform_handler()
+        self.notifier = NotificationDispatcher(
+            self.platform_handler.show_notification,
+            enabled=config.SHOW_NOTIFICATIONS,
+            max_age=config.NOTIFICATION_MAX_AGE
+        )
+        self.output_sinks = self._create_output_sinks()
+        self.mirror_sinks = [self.output_sinks[name] for name in config.OUTPUT_MIRRORS]
+        
+        # Transcriptions by hash of the speech, so the same audio isn't sent twice
+        self.transcription_cache: Optional[TranscriptionCache] = None
+        if config.CACHE_ENABLED:
+            self.transcription_cache = TranscriptionCache(
+                config.CACHE_FILE,
+                memory_entries=config.CACHE_MEMORY_ENTRIES,
+                disk_entries=config.CACHE_DISK_ENTRIES,
+                ttl=config.CACHE_TTL_DAYS * 24 * 3600 if config.CACHE_TTL_DAYS else None
+            )
+        
+        # Recordings that failed to transcribe are kept on disk and retried in the background
+        self.spool: Optional[TranscriptionSpool] = None
+        if config.SPOOL_ENABLED:
+            self.spool = TranscriptionSpool(
+                config.SPOOL_DIR,
+                transcribe=self._transcribe_spooled,
+                on_result=self._deliver_spooled,
+                max_bytes=config.SPOOL_MAX_MB << 20,
+                base_delay=config.SPOOL_RETRY_BASE_SECONDS,
+                max_delay=config.SPOOL_RETRY_MAX_SECONDS,
+                history_file=config.HISTORY_FILE
+            )
+            if self.spool.pending:
+                print(f"📥 {self.spool.pending} recording(s) from earlier waiting to be transcribed")
         
         # Display platform info
         platform_info = get_platform_info()
@@ -40,6 +192,10 @@ class VoiceTranscriber:
         if platform_info['system'].lower() == 'linux':
             self._check_linux_setup()
         
+        # Keep the input stream open in warm capture mode (always on with a capture process)
+        if config.WARM_CAPTURE or config.CAPTURE_PROCESS:
+            self._start_warm_capture()
+        
         # Setup keyboard listener
         self.setup_keyboard_listener()
         
@@ -47,6 +203,20 @@ class VoiceTranscriber:
         print(f"📋 Shortcut: {config.SHORTCUT_DISPLAY}")
         print("🔄 Press the shortcut to start recording...")
 
+    def _create_output_sinks(self) -> Dict[str, OutputSink]:
+        """Sinks a session can pick from, plus any configured as mirrors"""
+        sinks: Dict[str, OutputSink] = {
+            'paste': ClipboardPasteSink(self.platform_handler, restore_after=config.CLIPBOARD_RESTORE_DELAY),
+            'type': TypingSink(self.platform_handler),
+        }
+        wanted = {config.OUTPUT_SINK, *config.OUTPUT_MIRRORS}
+        if 'jsonl' in wanted:
+            sinks['jsonl'] = JsonlSink(config.OUTPUT_JSONL_PATH)
+        if 'socket' in wanted:
+            sinks['socket'] = UnixSocketSink(config.OUTPUT_SOCKET_PATH)
+            print(f"📡 Transcriptions broadcast on {config.OUTPUT_SOCKET_PATH}")
+        return sinks
+    
     def _check_linux_setup(self):
         """Check Linux dependencies and provide setup guidance"""
         deps = check_linux_dependencies()
@@ -60,6 +230,93 @@ class VoiceTranscriber:
             available = [tool for tool, avail in deps.items() if avail]
             print(f"✅ Linux tools available: {', '.join(available)}")
     
+    def _query_input_format(self) -> Tuple[int, int]:
+        """Sample rate and channel count to capture at, the device's native ones if possible"""
+        if not config.NATIVE_RATE_CAPTURE:
+            return config.SAMPLE_RATE, config.CHANNELS
+        
+        try:
+            info = self.pyaudio_instance.get_default_input_device_info()
+            rate = int(info['defaultSampleRate'])
+            channels = max(1, min(int(info['maxInputChannels']), config.MAX_CAPTURE_CHANNELS))
+            self.pyaudio_instance.is_format_supported(
+                rate, input_device=info['index'], input_channels=channels, input_format=pyaudio.paInt16
+            )
+        except (IOError, OSError, ValueError) as e:
+            print(f"⚠️  Could not use the native input format, capturing at {config.SAMPLE_RATE} Hz: {e}")
+            return config.SAMPLE_RATE, config.CHANNELS
+        
+        if (rate, channels) != (config.SAMPLE_RATE, config.CHANNELS):
+            print(f"🎚️  Capturing at {rate} Hz, {channels} channel(s), converting to {config.SAMPLE_RATE} Hz")
+        return rate, channels
+
+    def _start_warm_capture(self):
+        """Open a persistent input stream that feeds the pre-roll ring buffer"""
+        frame_bytes = config.CHANNELS * self.sample_width
+        pre_roll_frames = int(config.SAMPLE_RATE * config.PRE_ROLL_MS / 1000)
+        self.pre_roll = RingBuffer(pre_roll_frames * frame_bytes)
+        
+        if config.CAPTURE_PROCESS:
+            try:
+                self.capture_process = self._start_capture_process()
+                print(f"🎙️  Capturing in a separate process ({config.PRE_ROLL_MS} ms pre-roll)")
+                return
+            except Exception as e:
+                print(f"⚠️  Capture process unavailable, capturing in-process: {e}")
+                self.capture_process = None
+        
+        try:
+            self.audio_stream = self._open_stream()
+            print(f"🎙️  Warm capture enabled ({config.PRE_ROLL_MS} ms pre-roll)")
+        except Exception as e:
+            print(f"⚠️  Warm capture unavailable, falling back to on-demand recording: {e}")
+            self.pre_roll = None
+
+    def _start_capture_process(self) -> CaptureProcess:
+        """Run the input stream in a child process that shares audio through shared memory"""
+        frame_bytes = config.CHANNELS * self.sample_width
+        capture_process = CaptureProcess(
+            self.capture_rate, self.capture_channels, config.SAMPLE_RATE, config.CHANNELS,
+            frames_per_buffer=config.CHUNK_SIZE * self.capture_rate // config.SAMPLE_RATE,
+            buffer_bytes=int(config.CAPTURE_BUFFER_SECONDS * config.SAMPLE_RATE) * frame_bytes,
+            on_audio=self.ingest_audio,
+            on_exit=self._on_capture_process_exit
+        )
+        capture_process.start()
+        return capture_process
+
+    def _on_capture_process_exit(self):
+        """The capture child died: keep capturing in this process instead of recording silence"""
+        capture_process, self.capture_process = self.capture_process, None
+        if capture_process:
+            threading.Thread(target=capture_process.stop, daemon=True).start()
+        try:
+            self.audio_stream = self._open_stream()
+            print("🎙️  Capturing in-process from now on")
+            message = "⚠️ Audio capture restarted, part of this recording may be missing" if self.is_recording \
+                else "⚠️ Audio capture restarted"
+        except Exception as e:
+            print(f"❌ Could not reopen the input stream, falling back to on-demand recording: {e}")
+            self.pre_roll = None
+            message = "❌ Audio capture failed, this recording is incomplete" if self.is_recording \
+                else "⚠️ Audio capture failed, will retry on the next recording"
+        self.notifier.notify("Voice Transcriber", message, replaceable=False)
+
+    def _open_stream(self) -> pyaudio.Stream:
+        """Open and start an input stream that delivers audio to audio_callback"""
+        self.converter.reset()
+        stream = self.pyaudio_instance.open(
+            format=pyaudio.paInt16,
+            channels=self.capture_channels,
+            rate=self.capture_rate,
+            input=True,
+            # Keep the chunk duration the same whatever the capture rate
+            frames_per_buffer=config.CHUNK_SIZE * self.capture_rate // config.SAMPLE_RATE,
+            stream_callback=self.audio_callback
+        )
+        stream.start_stream()
+        return stream
+
     def setup_keyboard_listener(self):
         """Setup global keyboard shortcut listener with platform-specific keys"""
         shortcut_info = self.platform_handler.get_shortcut_keys()
@@ -69,9 +326,11 @@ class VoiceTranscriber:
         
         shortcut_string = f'<{modifier}>+<{secondary}>+<{key}>'
         
-        self.keyboard_listener = keyboard.GlobalHotKeys({
-            shortcut_string: self.toggle_recording
-        })
+        hotkeys = {shortcut_string: self.toggle_recording}
+        if config.CANCEL_SHORTCUT:
+            # Only acts while something is recording or processing; the key still reaches the focused app
+            hotkeys[config.CANCEL_SHORTCUT] = self.cancel
+        self.keyboard_listener = keyboard.GlobalHotKeys(hotkeys)
         self.keyboard_listener.start()
 
     def toggle_recording(self):
@@ -85,127 +344,558 @@ class VoiceTranscriber:
         """Start recording audio"""
         if self.is_recording:
             return
-            
-        self.is_recording = True
-        self.audio_data = []
+        if not self.job_pipeline.reserve():
+            # Every worker is busy and the queue is full: don't take on more audio
+            print(f"⏳ Still processing {self.job_pipeline.queue_depth} queued recording(s), not recording")
+            self.notifier.notify("Voice Transcriber", "⏳ Still busy with earlier recordings", replaceable=False)
+            return
         
-        self.platform_handler.show_notification("Voice Transcriber", "🔴 Recording started...")
+        audio_buffer = self.buffer_pool.acquire()
+        self.session_id = next(self._session_ids)
+        self.session_token = CancelToken()
+        self.session_stats = SessionStats()
+        if self.connection_warmer:
+            self.connection_warmer.start_session(self.session_stats)
+        self._reset_capture_health()
+        if self.endpoint_detector:
+            self.endpoint_detector.reset()
+        if self.segmenter:
+            self.segmenter.reset()
+        self._segment_futures = []
+        self._segment_start = 0
+        
+        if self.pre_roll:
+            # The stream is already running: seed the session with the pre-roll
+            with self._capture_lock:
+                audio_buffer.append(self.pre_roll.snapshot())
+                self.audio_buffer = audio_buffer
+                self.is_recording = True
+        else:
+            self.audio_buffer = audio_buffer
+            self.is_recording = True
+            
+            try:
+                self.audio_stream = self._open_stream()
+            except Exception as e:
+                print(f"❌ Error starting recording: {e}")
+                self.is_recording = False
+                self.audio_buffer = None
+                self.buffer_pool.release(audio_buffer)
+                self.job_pipeline.cancel_reservation()
+                if self.connection_warmer:
+                    self.connection_warmer.stop_session()
+                self.notifier.notify("Voice Transcriber", "❌ Failed to start recording", replaceable=False)
+                return
         
         print("🔴 Recording started...")
         
-        try:
-            self.audio_stream = self.pyaudio_instance.open(
-                format=pyaudio.paInt16,
-                channels=config.CHANNELS,
-                rate=config.SAMPLE_RATE,
-                input=True,
-                frames_per_buffer=config.CHUNK_SIZE,
-                stream_callback=self.audio_callback
-            )
-            self.audio_stream.start_stream()
-        except Exception as e:
-            print(f"❌ Error starting recording: {e}")
-            self.is_recording = False
-            self.platform_handler.show_notification("Voice Transcriber", "❌ Failed to start recording")
+        self.notifier.notify("Voice Transcriber", "🔴 Recording started...")
 
     def audio_callback(self, in_data, frame_count, time_info, status):
         """Callback function for audio stream"""
-        if self.is_recording:
-            self.audio_data.append(in_data)
+        self.capture_health.observe(status, time_info, frame_count, self.capture_rate)
+        # Convert from the capture format while recording, not all at once at stop time
+        self.ingest_audio(self.converter.process(in_data))
         return (in_data, pyaudio.paContinue)
 
+    def ingest_audio(self, pcm: bytes):
+        """Take in converted audio from the stream callback or the capture process"""
+        with self._capture_lock:
+            recording = self.is_recording
+            if recording:
+                self.audio_buffer.append(pcm)
+            elif self.pre_roll:
+                self.pre_roll.write(pcm)
+        
+        if recording and self.endpoint_detector and not self.endpoint_detector.ended:
+            if self.endpoint_detector.process(pcm):
+                # Stopping joins the stream, which must not happen on its own callback thread
+                print("🤫 End of speech detected")
+                threading.Thread(target=self.stop_recording, daemon=True).start()
+        
+        if recording and self.segmenter and self.segmenter.process(pcm):
+            self._cut_segment(self.segmenter.silence_ms)
+            self.segmenter.reset(keep_noise_floor=True)
+
+    def _cut_segment(self, pause_ms: float):
+        """Hand the audio up to the middle of the current pause to a background transcription"""
+        frame_bytes = config.CHANNELS * self.sample_width
+        min_bytes = int(config.STREAMING_MIN_SEGMENT_SECONDS * config.SAMPLE_RATE) * frame_bytes
+        
+        with self._capture_lock:
+            if not self.is_recording:
+                return
+            end = len(self.audio_buffer) - int(pause_ms / 2000 * config.SAMPLE_RATE) * frame_bytes
+            if end - self._segment_start < min_bytes:
+                return
+            # Recorded bytes never change, so the view stays valid while the buffer keeps growing
+            segment = self.audio_buffer.view()[self._segment_start:end]
+            self._segment_start = end
+            # Under the lock, so a stop or cancel can't take the session's futures without this one
+            self.session_stats.add('streamed_segments')
+            self._segment_futures.append(self.segment_executor.submit(
+                self.transcribe_pcm, segment, self.session_stats, None, self.session_token))
+
     def stop_recording(self):
         """Stop recording and process audio"""
-        if not self.is_recording:
-            return
-            
-        self.is_recording = False
+        with self._capture_lock:
+            # The shortcut and the endpoint detector may both try to stop the session
+            if not self.is_recording:
+                return
+            self.is_recording = False
+            audio_buffer = self.audio_buffer
+            self.audio_buffer = None
+            # The job owns the buffer from here on; the next session gets its own from the pool
+            job = TranscriptionJob(
+                session_id=self.session_id,
+                sequence=self.ordered_delivery.next_sequence(),
+                audio=audio_buffer,
+                stats=self.session_stats,
+                segment_futures=tuple(self._segment_futures),
+                tail_offset=self._segment_start,
+                cancel_token=self.session_token,
+                created_at=time.monotonic()
+            )
+            with self._jobs_lock:
+                self._active_jobs[job.session_id] = job.cancel_token
+            if self.pre_roll:
+                # Don't let the tail of this recording leak into the next pre-roll
+                self.pre_roll.clear()
         print("⏹️ Recording stopped, processing...")
+        if self.connection_warmer:
+            # The upload follows right away, well within the keep-alive expiry
+            self.connection_warmer.stop_session()
         
-        self.platform_handler.show_notification("Voice Transcriber", "⏹️ Processing transcription...")
+        self.notifier.notify("Voice Transcriber", "⏹️ Processing transcription...")
         
-        if self.audio_stream:
+        self._close_session_stream()
+        self._record_capture_health(job.stats)
+        
+        # Process the recording on the job pipeline's workers
+        self.job_pipeline.submit(job)
+        job.stats.set('queue_depth', self.job_pipeline.queue_depth)
+
+    def _close_session_stream(self):
+        """Close the input stream opened for a session (warm capture keeps its stream)"""
+        if self.audio_stream and not self.pre_roll:
             self.audio_stream.stop_stream()
             self.audio_stream.close()
             self.audio_stream = None
+
+    def cancel(self):
+        """Drop the recording in progress and every transcription that hasn't been delivered yet"""
+        discarded = self._discard_recording()
+        with self._jobs_lock:
+            # Results waiting for earlier recordings stay here until delivered; don't count them twice
+            tokens = [token for token in self._active_jobs.values() if not token.cancelled]
+        for token in tokens:
+            token.cancel()
+        
+        if discarded or tokens:
+            print(f"🚫 Cancelled{' recording' if discarded else ''}"
+                  f"{' and' if discarded and tokens else ''}"
+                  f"{f' {len(tokens)} transcription(s)' if tokens else ''}")
+            self.notifier.notify("Voice Transcriber", "🚫 Cancelled")
+
+    def _discard_recording(self) -> bool:
+        """Stop the current recording without transcribing it; False if there is none"""
+        with self._capture_lock:
+            if not self.is_recording:
+                return False
+            self.is_recording = False
+            audio_buffer = self.audio_buffer
+            self.audio_buffer = None
+            segment_futures = tuple(self._segment_futures)
+            token = self.session_token
+            if self.pre_roll:
+                self.pre_roll.clear()
+        
+        token.cancel()
+        if self.connection_warmer:
+            self.connection_warmer.stop_session()
+        self._close_session_stream()
+        
+        def release():
+            # Streamed segments read from the buffer; they stop at their next cancellation check
+            wait(segment_futures)
+            self.buffer_pool.release(audio_buffer)
+            self.job_pipeline.cancel_reservation()
+        
+        if segment_futures:
+            threading.Thread(target=release, daemon=True).start()
+        else:
+            release()
+        return True
+
+    def _reset_capture_health(self):
+        """Start counting input overflows and callback timing for a new session"""
+        try:
+            if self.capture_process:
+                self.capture_process.reset_health()
+            else:
+                self.capture_health.reset()
+        except (BrokenPipeError, OSError) as e:
+            print(f"⚠️  Could not reset capture health counters: {e}")
+
+    def _record_capture_health(self, stats: SessionStats):
+        """Copy the capture health counters of the session into its stats"""
+        try:
+            if self.capture_process:
+                health = self.capture_process.health_snapshot()
+            else:
+                health = self.capture_health.snapshot()
+        except (BrokenPipeError, EOFError, OSError) as e:
+            print(f"⚠️  Could not read capture health counters: {e}")
+            return
         
-        # Process the recording in a separate thread
-        threading.Thread(target=self.process_recording, daemon=True).start()
+        for key, value in health.items():
+            stats.set(key, value)
+        if health.get('input_overflows') or health.get('ring_dropped_bytes'):
+            print(f"⚠️  Audio input dropped frames this session: {health}")
+
+    def process_recording(self, job: TranscriptionJob):
+        """Process the recorded audio and transcribe it
 
-    def process_recording(self):
-        """Process the recorded audio and transcribe it"""
-        if not self.audio_data:
+        In streaming mode the segments before job.tail_offset are already being
+        transcribed by job.segment_futures, so only the tail is left to do here.
+        """
+        audio_buffer, stats, segment_futures = job.audio, job.stats, job.segment_futures
+        if not audio_buffer:
             print("❌ No audio data recorded")
+            self._forget_job(job.session_id)
+            self.buffer_pool.release(audio_buffer)
+            self.ordered_delivery.complete(job.sequence, None)
             return
         
+        delivery = late_delivery = None
         try:
-            # Save audio data to temporary file
-            temp_file_path = self.save_audio_to_file()
+            job.cancel_token.check()  # Cancelled while waiting in the queue
+            stats.set('recorded_seconds', round(len(audio_buffer) / (config.SAMPLE_RATE * config.CHANNELS * self.sample_width), 1))
+            tail = audio_buffer.view()[job.tail_offset:]
+            spilled = audio_buffer if audio_buffer.is_spilled else None
+            parts = [self.transcribe_pcm(tail, stats, spilled, job.cancel_token)]
+            if segment_futures:
+                # Stitch the segments transcribed while recording in front of the tail
+                parts = [future.result() for future in segment_futures] + parts
             
-            # Transcribe with OpenAI
-            transcription = self.transcribe_audio(temp_file_path)
-            
-            if transcription:
-                # Copy to clipboard and paste
-                self.paste_transcription(transcription)
+            texts = [part for part in parts if part]
+            if texts:
+                transcription = ' '.join(texts)
+                # Delivered once every earlier recording has been
+                delivery = partial(self._run_delivery, job.session_id,
+                                   partial(self.deliver_transcription, transcription, stats, job.cancel_token))
+                # Or, if later recordings went first, not at the cursor at all
+                late_delivery = partial(self._run_delivery, job.session_id,
+                                        partial(self._deliver_late, transcription, stats, job.cancel_token))
                 print(f"✅ Transcribed: {transcription}")
             else:
-                print("❌ No transcription received")
+                print("🔇 No speech detected, nothing to transcribe")
+                self.notifier.notify("Voice Transcriber", "🔇 No speech detected")
+            if self.spool:
+                # The API is reachable again: no need to wait for the spool's next backoff
+                self.spool.wake()
                 
+        except TranscriptionCancelled:
+            stats.set('cancelled', True)
+            print(f"🚫 Transcription {job.session_id} cancelled")
         except Exception as e:
-            print(f"❌ Error processing recording: {e}")
-            self.platform_handler.show_notification("Voice Transcriber", f"❌ Error: {str(e)}")
+            if self.spool and is_retriable_error(e):
+                print(f"❌ Transcription error: {e}")
+                self._spool_recording(job, e)
+            else:
+                print(f"❌ Error processing recording: {e}")
+                self.notifier.notify("Voice Transcriber", f"❌ Error: {str(e)}", replaceable=False)
+        finally:
+            if delivery is None:
+                self._forget_job(job.session_id)
+            # Otherwise the token stays cancellable while the result waits for earlier recordings
+            self.ordered_delivery.complete(job.sequence, delivery, late_delivery)
+            # Segment transcriptions read from the buffer, let them finish before reusing it
+            wait(segment_futures)
+            self.buffer_pool.release(audio_buffer)
+            self.last_session_stats = stats
+            if config.SHOW_SESSION_STATS:
+                print(f"📊 Session stats: {stats.summary()}")
+                print(f"📊 Job pipeline: {self.job_pipeline.snapshot()} | delivery: {self.ordered_delivery.snapshot()}")
+                if self.hedging_policy:
+                    print(f"📊 Hedging: {self.hedging_policy.snapshot()}")
+                if self.rate_limiter:
+                    print(f"📊 Rate limiter: {self.rate_limiter.snapshot()}")
+                if self.transcription_cache:
+                    print(f"📊 Cache: {self.transcription_cache.snapshot()}")
+
+    def _forget_job(self, session_id: int):
+        """Stop tracking a job's token, once there is nothing left of it for cancel() to stop"""
+        with self._jobs_lock:
+            self._active_jobs.pop(session_id, None)
+
+    def _run_delivery(self, session_id: int, action: Callable[[], None]):
+        """Run a job's output action once its turn comes, forgetting its token"""
+        self._forget_job(session_id)
+        action()
+
+    def _spool_recording(self, job: TranscriptionJob, error: Exception):
+        """Keep the speech of a failed recording in the spool, compressed if possible"""
+        try:
+            pcm = job.audio.view()
+            speech = self.find_speech(pcm)
+            if not speech:
+                return
+            encoder = next(get_encoder(name) for name in config.SPOOL_ENCODINGS if get_encoder(name).is_available())
+            pcm_segments = [pcm[start:end] for start, end in speech]
+            encoded = self.encode_audio(pcm_segments, encoder)
+            self.spool.add(encoded.getbuffer(), encoder.extension, {
+                'session_id': job.session_id,
+                'recorded_at': job.stats.started_at,
+                'error': f'{type(error).__name__}: {error}',
+                # Lets a retry of audio that was transcribed after all (e.g. before a crash) skip the API
+                'cache_key': self._cache_key(pcm_segments) if self.transcription_cache else None,
+            })
+        except Exception as e:
+            print(f"❌ Could not spool the recording, it is lost: {e}")
+            self.notifier.notify("Voice Transcriber", f"❌ Error: {str(error)}", replaceable=False)
+            return
+        print(f"📥 Recording kept in {config.SPOOL_DIR}, it will be transcribed once the API is reachable")
+        self.notifier.notify("Voice Transcriber", "📥 Offline: recording saved, will transcribe later", replaceable=False)
+
+    def _transcribe_spooled(self, path: str, metadata: dict) -> str:
+        """Transcription request for a spooled file; raises on failure so the spool can retry"""
+        key = metadata.get('cache_key') if self.transcription_cache else None
+        if key:
+            cached = self.transcription_cache.get(key)
+            if cached is not None:
+                return cached
+        text = self.request_transcription(partial(open, path, 'rb'), priority=PRIORITY_BACKGROUND)
+        if key:
+            self.transcription_cache.put(key, text, os.path.getsize(path))
+        return text
+
+    def _cache_key(self, pcm_segments: List[memoryview]) -> str:
+        audio_format = {'rate': config.SAMPLE_RATE, 'channels': config.CHANNELS, 'sample_width': self.sample_width}
+        return cache_key(pcm_segments, audio_format, config.TRANSCRIPTION_MODEL)
+
+    def _deliver_spooled(self, text: str, metadata: dict):
+        """A spooled recording went through: notify and mirror it, but don't paste it into whatever has focus now"""
+        self._deliver_unattended(text, metadata.get('recorded_at', metadata['created_at']), '📥', {'spooled': True})
+
+    def _deliver_late(self, text: str, stats: SessionStats, cancel_token: CancelToken):
+        """A recording finished after later ones were pasted: pasting it now would put it out of order"""
+        if cancel_token.cancelled:
+            return
+        if config.HISTORY_FILE:
+            append_history(config.HISTORY_FILE, text, stats.started_at, late=True)
+        self._deliver_unattended(text, stats.started_at, '⏱️', {'late': True, 'stats': stats.as_dict()})
+
+    def _deliver_unattended(self, text: str, recorded_at: float, icon: str, metadata: dict):
+        """Notify and mirror a transcription that is not going to the cursor"""
+        recorded = time.strftime('%H:%M', time.localtime(recorded_at))
+        print(f"{icon} Transcribed recording from {recorded}: {text}")
+        preview = text[:50] + '...' if len(text) > 50 else text
+        self.notifier.notify("Voice Transcriber", f"{icon} Recording from {recorded}: {preview}", replaceable=False)
+        for mirror in self.mirror_sinks:
+            try:
+                mirror.deliver(text, {**metadata, 'recorded_at': recorded_at})
+            except Exception as e:
+                print(f"⚠️  Output to {mirror.name} failed: {e}")
+
+    def transcribe_pcm(self, pcm: memoryview, stats: SessionStats, spilled: Optional[PCMBuffer] = None,
+                       cancel_token: Optional[CancelToken] = None) -> str:
+        """Trim silence from PCM audio and transcribe it
+
+        Returns an empty string when there is no speech and raises if the
+        transcription request fails. If pcm lives in a spilled buffer, pass that
+        buffer as spilled: a WAV upload then reads the speech ranges straight
+        from its file mapping. Compressed encodings still build the (smaller)
+        encoded file in memory.
+        Raises TranscriptionCancelled once cancel_token is cancelled.
+        """
+        cancel_token = cancel_token or CancelToken()
+        cancel_token.check()
+        with stats.stage('vad'):
+            speech = self.find_speech(pcm)
+        if not speech:
+            return ''
+        cancel_token.check()
+        
+        pcm_segments = [pcm[start:end] for start, end in speech]
+        speech_bytes = sum(len(segment) for segment in pcm_segments)
+        
+        key = None
+        if self.transcription_cache:
+            with stats.stage('cache_lookup'):
+                key = self._cache_key(pcm_segments)
+                cached = self.transcription_cache.get(key)
+            if cached is not None:
+                stats.add('cache_hits')
+                return cached
+        
+        encoder = self.encoder_selector.choose(speech_bytes)
+        stats.set('encoding', encoder.name)
+        stats.add('speech_bytes', speech_bytes)
+        
+        temp_file_path = None
+        upload_view: Optional[memoryview] = None
+        try:
+            if spilled is not None and encoder.name == 'wav':
+                # Long recordings live in a file mapping, upload a header followed by the speech ranges from it
+                header = build_wav_header(speech_bytes, config.CHANNELS, self.sample_width, config.SAMPLE_RATE)
+                upload_bytes = len(header) + speech_bytes
+                open_audio = partial(MemoryViewReader, [header, *pcm_segments], name='audio.wav')
+            else:
+                start = time.perf_counter()
+                if config.DEBUG_TEMP_AUDIO_FILE:
+                    # Encode the speech to a temporary file
+                    temp_file_path = self.save_audio_to_file(cancellable_chunks(pcm_segments, cancel_token), encoder)
+                    upload_bytes = os.path.getsize(temp_file_path)
+                    open_audio = partial(open, temp_file_path, 'rb')
+                else:
+                    # Encode the speech in memory and upload it from there
+                    upload_view = self.encode_audio(cancellable_chunks(pcm_segments, cancel_token), encoder).getbuffer()
+                    upload_bytes = len(upload_view)
+                    open_audio = partial(MemoryViewReader, upload_view, name=f'audio.{encoder.extension}')
+                encode_seconds = time.perf_counter() - start
+                stats.add_stage_time('encode', encode_seconds * 1000)
+                self.encoder_selector.observe_encode(encoder, speech_bytes, upload_bytes, encode_seconds)
+            stats.add('upload_bytes', upload_bytes)
+            
+            # Transcribe with OpenAI
+            start = time.perf_counter()
+            transcription = self.transcribe_audio(open_audio, stats, cancel_token)
+            transcribe_seconds = time.perf_counter() - start
+            stats.add_stage_time('transcribe', transcribe_seconds * 1000)
+            if key:
+                self.transcription_cache.put(key, transcription, upload_bytes)
+            return transcription
         finally:
             # Cleanup
-            if 'temp_file_path' in locals() and os.path.exists(temp_file_path):
+            if upload_view is not None:
+                try:
+                    upload_view.release()
+                except BufferError:
+                    pass  # A cancelled hedge attempt is still reading it; freed once it is done
+            if temp_file_path and os.path.exists(temp_file_path):
                 os.unlink(temp_file_path)
 
-    def save_audio_to_file(self) -> str:
-        """Save recorded audio data to a temporary WAV file"""
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.wav')
-        temp_file_path = temp_file.name
-        temp_file.close()
+    def find_speech(self, pcm: memoryview) -> List[Tuple[int, int]]:
+        """Return the byte ranges of pcm worth uploading, empty if there is no speech"""
+        if not config.VAD_ENABLED:
+            return [(0, len(pcm))]
         
-        with wave.open(temp_file_path, 'wb') as wav_file:
-            wav_file.setnchannels(config.CHANNELS)
-            wav_file.setsampwidth(self.pyaudio_instance.get_sample_size(pyaudio.paInt16))
-            wav_file.setframerate(config.SAMPLE_RATE)
-            wav_file.writeframes(b''.join(self.audio_data))
+        return find_speech_segments(
+            pcm, config.SAMPLE_RATE, config.CHANNELS,
+            frame_ms=config.VAD_FRAME_MS,
+            energy_margin_db=config.VAD_ENERGY_MARGIN_DB,
+            min_energy_dbfs=config.VAD_MIN_ENERGY_DBFS,
+            zcr_threshold=config.VAD_ZCR_THRESHOLD,
+            hangover_ms=config.VAD_HANGOVER_MS,
+            max_pause_ms=config.VAD_MAX_PAUSE_MS,
+            min_speech_ms=config.VAD_MIN_SPEECH_MS
+        )
+
+    def encode_audio(self, pcm_segments: Iterable[memoryview], encoder: AudioEncoder) -> io.BytesIO:
+        """Encode recorded audio data into an in-memory file"""
+        encoded = io.BytesIO()
+        encoder.encode(pcm_segments, encoded, config.CHANNELS, self.sample_width, config.SAMPLE_RATE)
+        return encoded
+
+    def save_audio_to_file(self, pcm_segments: Iterable[memoryview], encoder: AudioEncoder) -> str:
+        """Encode recorded audio data to a temporary file (debug upload path)"""
+        with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{encoder.extension}') as temp_file:
+            encoder.encode(pcm_segments, temp_file, config.CHANNELS, self.sample_width, config.SAMPLE_RATE)
         
-        return temp_file_path
+        return temp_file.name
+
+    def transcribe_audio(self, open_audio: Callable[[], BinaryIO], stats: Optional[SessionStats] = None,
+                         cancel_token: Optional[CancelToken] = None) -> str:
+        """Transcribe audio using OpenAI Whisper API
 
-    def transcribe_audio(self, audio_file_path: str) -> Optional[str]:
-        """Transcribe audio using OpenAI Whisper API"""
+        open_audio returns a fresh binary file of the encoded audio, so that a
+        hedged duplicate request can upload it independently. The request runs
+        on its own thread, so a cancel returns right away even while waiting
+        for the response; the request itself is aborted. Request errors are raised.
+        """
         try:
-            with open(audio_file_path, 'rb') as audio_file:
-                response = self.client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file
-                )
-                return response.text.strip()
+            result = hedged_call(partial(self.request_transcription, open_audio),
+                                 self.hedging_policy, cancel_token)
         except Exception as e:
-            print(f"❌ Transcription error: {e}")
-            return None
+            if cancel_token and cancel_token.cancelled and not isinstance(e, TranscriptionCancelled):
+                raise TranscriptionCancelled() from e
+            raise
+        
+        if stats and result.attempts > 1:
+            stats.add('hedged_requests')
+            stats.set('hedge_winner', 'duplicate' if result.winner else 'primary')
+        return result.value
 
-    def paste_transcription(self, text: str):
-        """Copy text to clipboard and simulate paste"""
+    def request_transcription(self, open_audio: Callable[[], BinaryIO], cancel_token: Optional[CancelToken] = None,
+                              priority: int = PRIORITY_INTERACTIVE) -> str:
+        """One transcription request; cancelling the token aborts it, even while waiting for the response
+
+        Each request's time minus the server's processing time (the
+        openai-processing-ms header) is fed to the encoder selector as upload time.
+        """
+        def send():
+            abort = (self.request_aborter.abort_on_cancel(cancel_token)
+                     if self.request_aborter and cancel_token else nullcontext())
+            with open_audio() as audio_file, abort:
+                upload_bytes = audio_file.seek(0, io.SEEK_END)
+                audio_file.seek(0)
+                start = time.perf_counter()
+                response = self.client.audio.transcriptions.with_raw_response.create(
+                    model=config.TRANSCRIPTION_MODEL,
+                    file=CancellableReader(audio_file, cancel_token) if cancel_token else audio_file
+                )
+            seconds = time.perf_counter() - start
+            try:
+                seconds -= float(response.headers['openai-processing-ms']) / 1000
+            except (KeyError, ValueError):
+                pass  # Without the header the whole request counts, which errs on the slow side
+            self.encoder_selector.observe_upload(upload_bytes, seconds)
+            return response
+        
+        if self.rate_limiter:
+            response = self.rate_limiter.call(send, priority, cancel_token)
+        else:
+            response = send()
+        return response.parse().text.strip()
+
+    def deliver_transcription(self, text: str, stats: SessionStats, cancel_token: Optional[CancelToken] = None):
+        """Send the text to this session's sink (pasted or typed at the cursor) and to any mirrors"""
+        if cancel_token and cancel_token.cancelled:
+            # Cancelled while waiting for earlier recordings to be delivered
+            print("🚫 Transcription cancelled, not pasting it")
+            return
+        metadata = {'stats': stats.as_dict()}
+        sink = select_sink(config.OUTPUT_SINK, text, self.output_sinks, config.TYPE_MAX_CHARS)
         try:
-            # Copy to clipboard
-            pyperclip.copy(text)
-            
-            # Small delay to ensure clipboard is ready
-            time.sleep(0.1)
-            
-            # Use platform-specific paste method
-            self.platform_handler.paste_text()
+            with stats.stage('output'):
+                try:
+                    sink.deliver(text, metadata)
+                except Exception as e:
+                    if sink.name != 'type':
+                        raise
+                    # E.g. characters the injector can't type: the clipboard still works
+                    print(f"⚠️  Typing failed ({e}), pasting instead")
+                    sink = self.output_sinks['paste']
+                    sink.deliver(text, metadata)
+            stats.set('output', sink.name)
             
             # Show success notification
             preview = text[:50] + '...' if len(text) > 50 else text
-            self.platform_handler.show_notification("Voice Transcriber", f"✅ Pasted: {preview}")
+            action = {'paste': 'Pasted', 'type': 'Typed'}.get(sink.name, 'Sent')
+            self.notifier.notify("Voice Transcriber", f"✅ {action}: {preview}")
                 
         except Exception as e:
-            print(f"❌ Error pasting text: {e}")
-            self.platform_handler.show_notification("Voice Transcriber", f"❌ Paste failed: {str(e)}")
+            print(f"❌ Error delivering text: {e}")
+            self.notifier.notify("Voice Transcriber", f"❌ Output failed: {str(e)}", replaceable=False)
+        
+        for mirror in self.mirror_sinks:
+            if mirror is sink:
+                continue
+            try:
+                mirror.deliver(text, metadata)
+            except Exception as e:
+                print(f"⚠️  Output to {mirror.name} failed: {e}")
 
     def cleanup(self):
         """Clean up resources"""
@@ -213,8 +903,22 @@ class VoiceTranscriber:
         if self.audio_stream:
             self.audio_stream.stop_stream()
             self.audio_stream.close()
+        if self.capture_process:
+            self.capture_process.stop()
+        self.notifier.close()
+        for sink in self.output_sinks.values():
+            sink.close()
         self.pyaudio_instance.terminate()
+        if self.segment_executor:
+            self.segment_executor.shutdown(wait=False)
         self.keyboard_listener.stop()
+        self.job_pipeline.close()
+        self.ordered_delivery.close()
+        if self.spool:
+            self.spool.close()
+        if self.transcription_cache:
+            self.transcription_cache.close()
+        self.http_client.close()
 
     def run(self):
         """Run the application"""
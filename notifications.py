@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Notification dispatch for the Voice Transcriber app
+Shows notifications from one background worker so the hotkey and processing threads never wait on them
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, NamedTuple
+
+
+class _Notification(NamedTuple):
+    created_at: float
+    title: str
+    message: str
+    replaceable: bool
+
+
+class NotificationDispatcher:
+    """Queue of pending notifications drained by a single worker thread
+
+    Status updates are replaceable: a newer message drops any replaceable
+    message still waiting, so a burst like "Processing..." then "Pasted..."
+    only shows the latter. Errors are never replaced. Messages that waited
+    longer than max_age are stale and dropped, as are the oldest ones when
+    more than max_pending pile up.
+    """
+
+    def __init__(self, show: Callable[[str, str], None], enabled: bool = True,
+                 max_age: float = 5.0, max_pending: int = 4):
+        self.show = show
+        self.enabled = enabled
+        self.max_age = max_age
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._pending: Deque[_Notification] = deque()
+        self._condition = threading.Condition()
+        self._running = True
+        self._worker = threading.Thread(target=self._run, name='notifications', daemon=True)
+        self._worker.start()
+
+    def notify(self, title: str, message: str, replaceable: bool = True) -> None:
+        """Queue a notification and return immediately"""
+        if not self.enabled:
+            return
+
+        with self._condition:
+            kept = deque(pending for pending in self._pending if not pending.replaceable)
+            self.dropped += len(self._pending) - len(kept)
+            kept.append(_Notification(time.monotonic(), title, message, replaceable))
+            while len(kept) > self.max_pending:
+                kept.popleft()
+                self.dropped += 1
+            self._pending = kept
+            self._condition.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while self._running and not self._pending:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                notification = self._pending.popleft()
+                if time.monotonic() - notification.created_at > self.max_age:
+                    self.dropped += 1
+                    continue
+
+            try:
+                self.show(notification.title, notification.message)
+            except Exception as e:
+                print(f"⚠️  Notification failed: {e}")
+
+    def close(self) -> None:
+        """Stop the worker, discarding anything still pending"""
+        with self._condition:
+            self._running = False
+            self._pending.clear()
+            self._condition.notify()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Output sinks for the Voice Transcriber app
+Decides where a finished transcription goes: pasted through the clipboard, typed straight into
+the focused window, written as JSON lines, or broadcast to local socket subscribers
+"""
+
+import json
+import os
+import socket
+import stat
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, TextIO
+
+from fileutils import make_private_dirs, open_private_append
+from platform_utils import PlatformHandler
+
+
+class OutputSink(ABC):
+    """Destination for finished transcriptions"""
+
+    name = 'abstract'
+
+    @abstractmethod
+    def deliver(self, text: str, metadata: Dict[str, Any]) -> None:
+        """Hand over one transcription; raises if it could not be delivered"""
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class ClipboardPasteSink(OutputSink):
+    """Copy to the clipboard and send the paste shortcut"""
+
+    name = 'paste'
+
+    def __init__(self, platform_handler: PlatformHandler, restore_after: Optional[float] = None):
+        self.platform_handler = platform_handler
+        self.restore_after = restore_after
+
+    def deliver(self, text: str, metadata: Dict[str, Any]) -> None:
+        # Returns once the clipboard is ready to be pasted
+        self.platform_handler.copy_text(text, restore_after=self.restore_after)
+        self.platform_handler.paste_text()
+
+
+class TypingSink(OutputSink):
+    """Type the text as key presses through the platform's persistent injector, leaving the clipboard alone"""
+
+    name = 'type'
+
+    def __init__(self, platform_handler: PlatformHandler):
+        self.platform_handler = platform_handler
+
+    @property
+    def available(self) -> bool:
+        return self.platform_handler.can_type()
+
+    def deliver(self, text: str, metadata: Dict[str, Any]) -> None:
+        self.platform_handler.type_text(text)
+
+
+def _record(text: str, metadata: Dict[str, Any]) -> str:
+    return json.dumps({'text': text, 'time': time.time(), **metadata}, ensure_ascii=False) + '\n'
+
+
+class JsonlSink(OutputSink):
+    """One JSON object per transcription, appended to a file readable by the user only, or on stdout"""
+
+    name = 'jsonl'
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._stream: TextIO = open_private_append(path) if path else sys.stdout
+        self._lock = threading.Lock()
+
+    def deliver(self, text: str, metadata: Dict[str, Any]) -> None:
+        with self._lock:
+            self._stream.write(_record(text, metadata))
+            self._stream.flush()
+
+    def close(self) -> None:
+        if self.path:
+            self._stream.close()
+
+
+class UnixSocketSink(OutputSink):
+    """Broadcasts each transcription as a JSON line to every client connected to a Unix socket
+
+    Subscribers just connect and read, e.g. `socat - UNIX-CONNECT:<path>`.
+    Clients that hang up or stop reading are dropped instead of holding up delivery.
+    The socket is connectable by the user only from the moment it exists.
+    """
+
+    name = 'socket'
+
+    def __init__(self, path: str, send_timeout: float = 0.5):
+        self.path = path
+        self.send_timeout = send_timeout
+        make_private_dirs(os.path.dirname(path))
+        self._remove_stale_socket(path)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        umask = os.umask(0o177)
+        try:
+            self._server.bind(path)
+        except OSError:
+            self._server.close()
+            raise
+        finally:
+            os.umask(umask)
+        self._server.listen()
+        self._clients: List[socket.socket] = []
+        self._lock = threading.Lock()
+        self._acceptor = threading.Thread(target=self._accept_loop, name='output-socket', daemon=True)
+        self._acceptor.start()
+
+    @staticmethod
+    def _remove_stale_socket(path: str) -> None:
+        """Unlink a socket left over from a previous run; refuse to touch anything else at path"""
+        try:
+            info = os.lstat(path)
+        except FileNotFoundError:
+            return
+        if not stat.S_ISSOCK(info.st_mode) or info.st_uid != os.getuid():
+            raise FileExistsError(f"{path} exists and is not a socket of this user, refusing to replace it")
+        os.unlink(path)
+
+    def _accept_loop(self) -> None:
+        while True:
+            try:
+                client, _ = self._server.accept()
+            except OSError:
+                return  # Server socket closed
+            client.settimeout(self.send_timeout)
+            with self._lock:
+                self._clients.append(client)
+
+    @property
+    def subscribers(self) -> int:
+        with self._lock:
+            return len(self._clients)
+
+    def deliver(self, text: str, metadata: Dict[str, Any]) -> None:
+        line = _record(text, metadata).encode('utf-8')
+        with self._lock:
+            for client in list(self._clients):
+                try:
+                    client.sendall(line)
+                except OSError:
+                    self._clients.remove(client)
+                    client.close()
+
+    def close(self) -> None:
+        self._server.close()
+        with self._lock:
+            for client in self._clients:
+                client.close()
+            self._clients.clear()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+def select_sink(mode: str, text: str, sinks: Dict[str, OutputSink], type_max_chars: int) -> OutputSink:
+    """Pick the sink for one session
+
+    'auto' types transcriptions of up to type_max_chars characters when typing
+    is available, since those land without touching the clipboard, and pastes
+    longer ones, which would take a while to type out.
+    """
+    if mode == 'auto':
+        typing = sinks.get('type')
+        if typing is not None and typing.available and len(text) <= type_max_chars:
+            return typing
+        return sinks['paste']
+    return sinks[mode]
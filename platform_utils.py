@@ -4,12 +4,108 @@ Cross-platform utilities for the Voice Transcriber app
 Handles platform-specific functionality for macOS and Linux
 """
 
+import json
 import os
 import platform
+import shutil
 import subprocess
+import threading
+import time
 from typing import Optional, Dict, Set
 from abc import ABC, abstractmethod
 
+import pyperclip
+
+from clipboard import X11ClipboardOwner
+from key_injection import KeyInjector, CommandInjector, create_key_injector
+from macos_helper import OsaHelper
+
+try:
+    from jeepney import DBusAddress, new_method_call
+    from jeepney.io.blocking import open_dbus_connection
+    from jeepney.wrappers import unwrap_msg
+except ImportError:
+    open_dbus_connection = None
+
+
+class PlatformCapabilities:
+    """External tools available to the app, resolved in-process once per process
+    
+    Paths are looked up with shutil.which instead of forking `which`. With a
+    cache_file the results are also stored on disk together with a fingerprint
+    of PATH and the modification times of its directories, so later launches
+    reuse them until a tool is installed or removed.
+    """
+    
+    TOOLS = ('notify-send', 'xdotool', 'ydotool', 'osascript', 'xclip', 'xsel', 'wl-copy')
+    
+    def __init__(self, cache_file: Optional[str] = None):
+        self.cache_file = cache_file
+        self._lock = threading.Lock()
+        fingerprint = self._fingerprint()
+        self.tools: Dict[str, Optional[str]] = self._load_cache(fingerprint)
+        if self.tools is None:
+            self.tools = {tool: shutil.which(tool) for tool in self.TOOLS}
+            self._save_cache(fingerprint)
+    
+    @staticmethod
+    def _fingerprint() -> Dict[str, object]:
+        path = os.environ.get('PATH', '')
+        mtimes = {}
+        for directory in path.split(os.pathsep):
+            try:
+                mtimes[directory] = os.stat(directory).st_mtime_ns
+            except OSError:
+                mtimes[directory] = None
+        return {'path': path, 'mtimes': mtimes}
+    
+    def _load_cache(self, fingerprint: Dict[str, object]) -> Optional[Dict[str, Optional[str]]]:
+        if not self.cache_file:
+            return None
+        try:
+            with open(self.cache_file) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if cached.get('fingerprint') != fingerprint or set(cached.get('tools', {})) != set(self.TOOLS):
+            return None
+        return cached['tools']
+    
+    def _save_cache(self, fingerprint: Dict[str, object]) -> None:
+        if not self.cache_file:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            with open(self.cache_file, 'w') as f:
+                json.dump({'fingerprint': fingerprint, 'tools': self.tools}, f)
+        except OSError:
+            pass  # The cache is only an optimisation
+    
+    def which(self, tool: str) -> Optional[str]:
+        """Path of a tool, or None if it isn't installed"""
+        with self._lock:
+            if tool not in self.tools:
+                self.tools[tool] = shutil.which(tool)
+            return self.tools[tool]
+    
+    def has(self, tool: str) -> bool:
+        return self.which(tool) is not None
+
+
+_capabilities: Optional[PlatformCapabilities] = None
+_platform_handler: Optional['PlatformHandler'] = None
+_singleton_lock = threading.Lock()
+_handler_lock = threading.Lock()  # Held while a handler starts, which itself takes _singleton_lock
+
+
+def get_capabilities(cache_file: Optional[str] = None) -> PlatformCapabilities:
+    """Process-wide capability probe; the first caller decides the cache file"""
+    global _capabilities
+    with _singleton_lock:
+        if _capabilities is None:
+            _capabilities = PlatformCapabilities(cache_file)
+        return _capabilities
+
 
 class PlatformHandler(ABC):
     """Abstract base class for platform-specific operations"""
@@ -24,8 +120,27 @@ class PlatformHandler(ABC):
         """Simulate paste keystroke (Cmd+V or Ctrl+V)"""
         pass
     
+    def copy_text(self, text: str, restore_after: Optional[float] = None) -> None:
+        """Put text on the clipboard, returning once a paste will see it
+        
+        restore_after asks for the previous clipboard text to come back after
+        that many seconds, where the platform supports it.
+        """
+        pyperclip.copy(text)
+        # pyperclip hands off to a separate tool; give it time to take the clipboard
+        time.sleep(0.1)
+    
+    def can_type(self) -> bool:
+        """Whether type_text sends key presses quickly and correctly enough to use instead of pasting"""
+        return False
+    
+    def type_text(self, text: str) -> None:
+        """Type text into the focused window without using the clipboard"""
+        raise NotImplementedError("typing is not supported on this platform")
+    
+    @staticmethod
     @abstractmethod
-    def get_shortcut_keys(self) -> Dict[str, str]:
+    def get_shortcut_keys() -> Dict[str, str]:
         """Get platform-specific keyboard shortcut mapping"""
         pass
 
@@ -33,8 +148,35 @@ class PlatformHandler(ABC):
 class MacOSHandler(PlatformHandler):
     """macOS-specific implementation"""
     
+    def __init__(self):
+        self.helper = self._start_helper()
+        self._restore_timer: Optional[threading.Timer] = None
+        self._typing_failed = False
+    
+    def _start_helper(self) -> Optional[OsaHelper]:
+        """Start the persistent osascript helper, or None to spawn osascript per call"""
+        try:
+            helper = OsaHelper()
+            helper.start()
+            return helper
+        except (OSError, RuntimeError):
+            return None
+    
+    def _send_to_helper(self, command: str, **fields: str) -> bool:
+        """Send a command to the helper; False means the caller should fall back"""
+        if not self.helper:
+            return False
+        try:
+            self.helper.send(command, **fields)
+            return True
+        except (OSError, RuntimeError):
+            self.helper = None
+            return False
+    
     def show_notification(self, title: str, message: str) -> None:
-        """Show native macOS notification using osascript"""
+        """Show native macOS notification through the osascript helper"""
+        if self._send_to_helper('notify', title=title, message=message):
+            return
         try:
             escaped_message = message.replace('"', '\\"').replace("'", "\\'")
             escaped_title = title.replace('"', '\\"').replace("'", "\\'")
@@ -42,14 +184,49 @@ class MacOSHandler(PlatformHandler):
         except Exception:
             pass  # Fail silently if notifications don't work
     
+    def copy_text(self, text: str, restore_after: Optional[float] = None) -> None:
+        """Set the pasteboard from the helper, which runs commands in order, so no settle delay is needed"""
+        if self._restore_timer:
+            self._restore_timer.cancel()
+        if not self._send_to_helper('copy', text=text):
+            super().copy_text(text)
+            return
+        if restore_after is not None:
+            self._restore_timer = threading.Timer(restore_after, self._send_to_helper, args=('restore',))
+            self._restore_timer.daemon = True
+            self._restore_timer.start()
+    
+    def can_type(self) -> bool:
+        return self.helper is not None and not self._typing_failed
+    
+    def type_text(self, text: str) -> None:
+        """Type through System Events in the helper, returning once it confirmed the keystrokes
+        
+        A failure (typically no Accessibility permission for System Events)
+        raises, so the caller can paste instead, and turns typing off.
+        """
+        if not self.helper:
+            raise RuntimeError("macOS helper is not running")
+        try:
+            self.helper.type(text)
+        except OSError:
+            self.helper = None
+            raise
+        except RuntimeError:
+            self._typing_failed = True
+            raise
+    
     def paste_text(self) -> None:
         """Use AppleScript to paste (Cmd+V)"""
+        if self._send_to_helper('paste'):
+            return
         try:
             os.system('osascript -e "tell application \\"System Events\\" to keystroke \\"v\\" using command down"')
         except Exception as e:
             print(f"❌ Error pasting on macOS: {e}")
     
-    def get_shortcut_keys(self) -> Dict[str, str]:
+    @staticmethod
+    def get_shortcut_keys() -> Dict[str, str]:
         """Return macOS shortcut mapping"""
         return {
             'modifier': 'cmd',
@@ -59,25 +236,106 @@ class MacOSHandler(PlatformHandler):
         }
 
 
+class DBusNotifier:
+    """Long-lived session bus client for org.freedesktop.Notifications
+    
+    Keeps one connection open and reuses the returned notification ID, so
+    successive states update a single notification bubble in place.
+    """
+    
+    def __init__(self, app_name: str = 'Voice Transcriber'):
+        self.app_name = app_name
+        self._address = DBusAddress(
+            '/org/freedesktop/Notifications',
+            bus_name='org.freedesktop.Notifications',
+            interface='org.freedesktop.Notifications'
+        )
+        self._connection = open_dbus_connection(bus='SESSION')
+        self._notification_id = 0
+    
+    def notify(self, title: str, message: str, timeout_ms: int = -1) -> None:
+        """Show or update the notification; raises if the bus call fails"""
+        call = new_method_call(self._address, 'Notify', 'susssasa{sv}i', (
+            self.app_name,
+            self._notification_id,  # replaces_id: 0 creates a new bubble
+            '',
+            title,
+            message,
+            [],
+            {'urgency': ('y', 1)},
+            timeout_ms
+        ))
+        reply = self._connection.send_and_get_reply(call, timeout=2)
+        self._notification_id = unwrap_msg(reply)[0]
+    
+    def close(self) -> None:
+        try:
+            self._connection.close()
+        except OSError:
+            pass
+
+
 class LinuxHandler(PlatformHandler):
     """Linux-specific implementation"""
     
     def __init__(self):
+        self.capabilities = get_capabilities()
         self.paste_tool = self._detect_paste_tool()
+        self.key_injector = self._create_key_injector()
+        self.clipboard_owner = self._start_clipboard_owner()
+        self.dbus_notifier = self._connect_dbus_notifier()
+    
+    def _start_clipboard_owner(self) -> Optional[X11ClipboardOwner]:
+        """Own the X11 clipboard in-process; Wayland sessions keep using wl-copy through pyperclip"""
+        if not os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'):
+            return None
+        try:
+            return X11ClipboardOwner()
+        except Exception:
+            return None  # python-xlib missing or no X server
+    
+    def _connect_dbus_notifier(self) -> Optional[DBusNotifier]:
+        """Connect to the notification service on the session bus, if there is one"""
+        if open_dbus_connection is None:
+            return None
+        try:
+            return DBusNotifier()
+        except Exception:
+            return None  # No session bus: fall back to notify-send
     
     def _detect_paste_tool(self) -> Optional[str]:
         """Detect available tools for key simulation on Linux"""
         tools = ['xdotool', 'ydotool']
         for tool in tools:
-            if subprocess.run(['which', tool], capture_output=True).returncode == 0:
+            if self.capabilities.has(tool):
                 return tool
         return None
     
+    def _create_key_injector(self) -> Optional[KeyInjector]:
+        """Native XTest or uinput injector if possible, xdotool or ydotool otherwise"""
+        available_tools = [tool for tool in ('xdotool', 'ydotool') if self.capabilities.has(tool)]
+        return create_key_injector(available_tools)
+    
     def show_notification(self, title: str, message: str) -> None:
-        """Show Linux notification using notify-send"""
+        """Show Linux notification over D-Bus, or using notify-send without a session bus"""
+        if self.dbus_notifier:
+            try:
+                self.dbus_notifier.notify(title, message)
+                return
+            except Exception:
+                # The connection may have dropped, reconnect once before giving up on D-Bus
+                self.dbus_notifier.close()
+                self.dbus_notifier = self._connect_dbus_notifier()
+                try:
+                    if self.dbus_notifier:
+                        self.dbus_notifier.notify(title, message)
+                        return
+                except Exception:
+                    self.dbus_notifier = None
+        
         try:
             # Check if notify-send is available
-            if subprocess.run(['which', 'notify-send'], capture_output=True).returncode == 0:
+            if self.capabilities.has('notify-send'):
                 subprocess.run([
                     'notify-send', 
                     '--app-name=Voice Transcriber',
@@ -91,24 +349,59 @@ class LinuxHandler(PlatformHandler):
         except Exception:
             print(f"🔔 {title}: {message}")  # Fallback to console
     
+    def copy_text(self, text: str, restore_after: Optional[float] = None) -> None:
+        """Take the X11 clipboard in-process, falling back to pyperclip"""
+        if self.clipboard_owner:
+            try:
+                if self.clipboard_owner.set_text(text, restore_after):
+                    return
+            except Exception as e:
+                print(f"⚠️  Clipboard owner failed ({e}), falling back to pyperclip")
+                self.clipboard_owner = None
+        super().copy_text(text)
+    
+    def can_type(self) -> bool:
+        # Only XTest: xdotool/ydotool type slower than a paste, and uinput may not match the layout
+        return self.key_injector is not None and self.key_injector.native_typing
+    
+    def type_text(self, text: str) -> None:
+        """Type with the key injector, whichever it is (OUTPUT_SINK = 'type' asks for it explicitly)"""
+        if self.key_injector is None:
+            raise RuntimeError("no key injector available")
+        self.key_injector.type_text(text)
+    
     def paste_text(self) -> None:
         """Simulate Ctrl+V keystroke on Linux"""
+        if self.key_injector is None:
+            print("❌ No paste tool available. Please install xdotool or ydotool")
+            print("   sudo apt install xdotool  # For X11")
+            print("   sudo apt install ydotool   # For Wayland")
+            return
+        
         try:
-            if self.paste_tool == 'xdotool':
-                # Use xdotool for X11
-                subprocess.run(['xdotool', 'key', 'ctrl+v'], check=True)
-            elif self.paste_tool == 'ydotool':
-                # Use ydotool for Wayland (requires ydotool daemon)
-                subprocess.run(['ydotool', 'key', 'ctrl+v'], check=True)
-            else:
-                print("❌ No paste tool available. Please install xdotool or ydotool")
-                print("   sudo apt install xdotool  # For X11")
-                print("   sudo apt install ydotool   # For Wayland")
+            self.key_injector.paste()
+            return
+        except Exception as e:
+            if isinstance(self.key_injector, CommandInjector) or not self.paste_tool:
+                print(f"❌ Error pasting on Linux: {e}")
+                print("💡 Make sure xdotool or ydotool is installed and you have the necessary permissions")
+                return
+            # The X connection or uinput device went away: keep going with the command-line tool
+            print(f"⚠️  {self.key_injector.name} key injection failed ({e}), falling back to {self.paste_tool}")
+            try:
+                self.key_injector.close()
+            except Exception:
+                pass
+            self.key_injector = CommandInjector(self.paste_tool)
+        
+        try:
+            self.key_injector.paste()
         except Exception as e:
             print(f"❌ Error pasting on Linux: {e}")
             print("💡 Make sure xdotool or ydotool is installed and you have the necessary permissions")
     
-    def get_shortcut_keys(self) -> Dict[str, str]:
+    @staticmethod
+    def get_shortcut_keys() -> Dict[str, str]:
         """Return Linux shortcut mapping"""
         return {
             'modifier': 'ctrl',
@@ -118,18 +411,36 @@ class LinuxHandler(PlatformHandler):
         }
 
 
-def get_platform_handler() -> PlatformHandler:
-    """Factory function to get the appropriate platform handler"""
+def _handler_class() -> type:
     system = platform.system().lower()
     
     if system == 'darwin':  # macOS
-        return MacOSHandler()
+        return MacOSHandler
     elif system == 'linux':
-        return LinuxHandler()
+        return LinuxHandler
     else:
         raise NotImplementedError(f"Platform '{system}' is not supported. Only macOS and Linux are supported.")
 
 
+def get_shortcut_keys() -> Dict[str, str]:
+    """Shortcut mapping of this platform, without starting its handler"""
+    return _handler_class().get_shortcut_keys()
+
+
+def get_platform_handler() -> PlatformHandler:
+    """Factory function to get the appropriate platform handler, shared by the whole process
+
+    Starting a handler is not free (helper process, clipboard thread, key
+    injector, D-Bus connection), so nothing creates one at import time.
+    """
+    global _platform_handler
+    # Built under the lock: a second handler would leak its helper process, thread or connection
+    with _handler_lock:
+        if _platform_handler is None:
+            _platform_handler = _handler_class()()
+        return _platform_handler
+
+
 def get_platform_info() -> Dict[str, str]:
     """Get platform information for display"""
     system = platform.system()
@@ -185,11 +496,8 @@ def check_linux_dependencies() -> Dict[str, bool]:
         'ydotool': False
     }
     
+    capabilities = get_capabilities()
     for tool in dependencies:
-        try:
-            result = subprocess.run(['which', tool], capture_output=True)
-            dependencies[tool] = result.returncode == 0
-        except:
-            dependencies[tool] = False
+        dependencies[tool] = capabilities.has(tool)
     
     return dependencies
\ No newline at end of file
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Connection pre-warming for the Voice Transcriber app
+Opens the HTTPS connection to the transcription API while the user is still speaking,
+so the upload after stop doesn't start with DNS, TCP and TLS setup
+"""
+
+import threading
+import time
+from typing import Optional
+
+import httpx
+
+from stats import SessionStats
+
+
+class ConnectionWarmer:
+    """Keeps a pooled connection to the API open for the length of a recording
+
+    A cheap HEAD request at record start makes the client's pool open the
+    connection; it is repeated every interval seconds while recording so the
+    connection doesn't hit the keep-alive expiry before the upload. The time
+    the first request took is recorded as the 'prewarm' stage, which is
+    roughly what the upload would otherwise have spent connecting.
+    """
+
+    def __init__(self, http_client: httpx.Client, url: str, interval: float = 20.0):
+        self.http_client = http_client
+        self.url = url
+        self.interval = interval
+        self._stop: Optional[threading.Event] = None
+        self._lock = threading.Lock()
+
+    def start_session(self, stats: SessionStats) -> None:
+        """Warm the connection in the background until stop_session"""
+        with self._lock:
+            if self._stop is not None:
+                self._stop.set()
+            stop = self._stop = threading.Event()
+        threading.Thread(target=self._run, args=(stats, stop), name='prewarm', daemon=True).start()
+
+    def stop_session(self) -> None:
+        with self._lock:
+            if self._stop is not None:
+                self._stop.set()
+                self._stop = None
+
+    def _ping(self) -> float:
+        """One HEAD request; any response at all means the connection is up"""
+        start = time.perf_counter()
+        self.http_client.head(self.url)
+        return (time.perf_counter() - start) * 1000
+
+    def _run(self, stats: SessionStats, stop: threading.Event) -> None:
+        try:
+            stats.add_stage_time('prewarm', self._ping())
+        except httpx.HTTPError as e:
+            stats.set('prewarm_error', type(e).__name__)
+            return
+        while not stop.wait(self.interval):
+            try:
+                self._ping()
+                stats.add('prewarm_pings')
+            except httpx.HTTPError:
+                return
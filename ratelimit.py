@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Client-side rate limiting for the Voice Transcriber app
+Paces transcription requests by the API's rate limit headers and adapts how many run at once,
+so bursts wait on our side instead of paying a round trip for a 429
+"""
+
+import heapq
+import itertools
+import random
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import openai
+
+from jobs import CancelToken, TranscriptionCancelled
+
+PRIORITY_INTERACTIVE = 0  # Hotkey recordings, someone is waiting for the text
+PRIORITY_BACKGROUND = 1  # Spool retries and other work nobody is watching
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_DURATION_UNITS = {'ms': 0.001, 's': 1.0, 'm': 60.0, 'h': 3600.0}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds in a reset header such as '1s', '6m0s' or '20ms'; None if unparseable"""
+    if not value:
+        return None
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+def retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Seconds the server asked us to wait before retrying, if it said"""
+    try:
+        if 'retry-after-ms' in headers:
+            return float(headers['retry-after-ms']) / 1000
+        if 'retry-after' in headers:
+            return float(headers['retry-after'])
+    except ValueError:
+        pass  # An HTTP date; the rate limit headers still tell us when to resume
+    return None
+
+
+class TokenBucket:
+    """Requests the API will still accept, refilled at the rate it allows
+
+    Unlimited until the first response tells us the limit. Each response
+    resets the level to the server's remaining count, so other clients
+    sharing the key are accounted for too.
+    """
+
+    def __init__(self):
+        self.capacity: Optional[float] = None
+        self.rate = 0.0  # Tokens per second
+        self.tokens = 0.0
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        if self.capacity is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a request may be sent, 0 if it may go now"""
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        if self.capacity is None:
+            return 0.0
+        self._refill(now)
+        if self.tokens >= 1.0:
+            return 0.0
+        return (1.0 - self.tokens) / self.rate if self.rate > 0 else 1.0
+
+    def take(self, now: float) -> None:
+        if self.capacity is not None:
+            self._refill(now)
+            self.tokens -= 1.0
+
+    def update(self, limit: Optional[float], remaining: Optional[float], reset: Optional[float], now: float) -> None:
+        """Sync with the x-ratelimit-*-requests headers of a response"""
+        if limit is None or remaining is None:
+            return
+        self.capacity = limit
+        # The reset header is when the bucket is full again; without it assume a per-minute limit
+        missing = limit - remaining
+        self.rate = missing / reset if reset and missing > 0 else limit / 60.0
+        self.tokens = remaining
+        self._updated = now
+
+    def block(self, seconds: float, now: float) -> None:
+        """Send nothing for the next seconds, e.g. after a 429"""
+        self._blocked_until = max(self._blocked_until, now + seconds)
+
+
+class AdaptiveRateLimiter:
+    """Token bucket plus an AIMD concurrency limit in front of the transcription API
+
+    The concurrency limit grows by increase per round of successful requests
+    (increase / limit per success) up to max_concurrency, and is multiplied
+    by decrease_factor on a 429 or 5xx. Only requests sent after the last
+    decrease can trigger another, so a burst of failures halves it once.
+    Waiting requests are served by priority, then in arrival order, so an
+    interactive request never waits behind queued background work.
+    """
+
+    def __init__(self, initial_concurrency: float = 2, min_concurrency: float = 1, max_concurrency: float = 4,
+                 increase: float = 1.0, decrease_factor: float = 0.5, max_retries: int = 2,
+                 retry_delay: float = 1.0, poll_interval: float = 0.1):
+        self.limit = float(initial_concurrency)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.poll_interval = poll_interval
+        self.bucket = TokenBucket()
+        self.in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+        self.server_errors = 0
+        self.decreases = 0
+        self.max_wait_ms = 0.0
+        self._last_decrease = 0.0
+        self._waiting: List[Tuple[int, int]] = []
+        self._tickets = itertools.count()
+        self._condition = threading.Condition()
+
+    def _acquire(self, priority: int, cancel_token: Optional[CancelToken]) -> float:
+        """Wait for our turn, a free slot and a token; returns the send time"""
+        start = time.monotonic()
+        with self._condition:
+            ticket = (priority, next(self._tickets))
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    if cancel_token is not None and cancel_token.cancelled:
+                        raise TranscriptionCancelled()
+                    wait = self.poll_interval
+                    if self._waiting[0] == ticket and self.in_flight < max(1, int(self.limit)):
+                        now = time.monotonic()
+                        bucket_wait = self.bucket.wait_time(now)
+                        if bucket_wait <= 0:
+                            self.bucket.take(now)
+                            self.in_flight += 1
+                            self.requests += 1
+                            self.max_wait_ms = max(self.max_wait_ms, (now - start) * 1000)
+                            return now
+                        wait = min(wait, bucket_wait)
+                    self._condition.wait(wait)
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._condition.notify_all()
+
+    def _release(self) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def _update_bucket(self, headers: Mapping[str, str]) -> None:
+        def number(name: str) -> Optional[float]:
+            try:
+                return float(headers[name])
+            except (KeyError, ValueError):
+                return None
+
+        with self._condition:
+            self.bucket.update(number('x-ratelimit-limit-requests'), number('x-ratelimit-remaining-requests'),
+                               parse_duration(headers.get('x-ratelimit-reset-requests')), time.monotonic())
+
+    def _on_success(self) -> None:
+        with self._condition:
+            self.limit = min(self.max_concurrency, self.limit + self.increase / self.limit)
+
+    def _on_overload(self, sent_at: float, wait: float) -> None:
+        with self._condition:
+            if sent_at >= self._last_decrease:
+                self.limit = max(self.min_concurrency, self.limit * self.decrease_factor)
+                self._last_decrease = time.monotonic()
+                self.decreases += 1
+            self.bucket.block(wait, time.monotonic())
+            self._condition.notify_all()
+
+    def _backoff(self, seconds: float, cancel_token: Optional[CancelToken]) -> None:
+        """Sleep before retrying this request only, waking early on cancel"""
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            if cancel_token is not None and cancel_token.cancelled:
+                raise TranscriptionCancelled()
+            time.sleep(min(self.poll_interval, max(0.0, deadline - time.monotonic())))
+
+    def call(self, request: Callable[[], Any], priority: int = PRIORITY_INTERACTIVE,
+             cancel_token: Optional[CancelToken] = None) -> Any:
+        """Run request once allowed, retrying failures up to max_retries times
+
+        429s and 5xx are retried and back off the concurrency limit. Connection
+        errors, timeouts, 408 and 409 are retried after an exponential backoff, but
+        don't count as overload. request must return a raw response with
+        headers (the SDK's with_raw_response) and raise the SDK's errors, and
+        is called again from scratch for every retry.
+        """
+        for attempt in range(self.max_retries + 1):
+            sent_at = self._acquire(priority, cancel_token)
+            response = None
+            backoff = None
+            try:
+                response = request()
+            except Exception as e:
+                last_attempt = attempt == self.max_retries or (cancel_token is not None and cancel_token.cancelled)
+                status = getattr(e, 'status_code', None)
+                if isinstance(e, openai.APIConnectionError) or status in (408, 409):
+                    # A failed request rather than overload (APITimeoutError is an APIConnectionError)
+                    if last_attempt:
+                        raise
+                    print(f"⏳ Request failed ({type(e).__name__}), retrying")
+                    backoff = self.retry_delay * 2 ** attempt * random.uniform(0.5, 1.0)
+                elif status == 429 or (status and status >= 500):
+                    headers = e.response.headers
+                    self._update_bucket(headers)
+                    with self._condition:
+                        if status == 429:
+                            self.throttled += 1
+                        else:
+                            self.server_errors += 1
+                    wait = retry_after(headers)
+                    self._on_overload(sent_at, wait if wait is not None else self.retry_delay * 2 ** attempt)
+                    if last_attempt:
+                        raise
+                    print(f"⏳ API returned {status}, retrying (concurrency limit now {int(self.limit)})")
+                else:
+                    raise
+            finally:
+                self._release()
+            if response is None:
+                if backoff is not None:
+                    self._backoff(backoff, cancel_token)
+                continue  # After a 429 or 5xx the bucket holds the next attempt back
+            self._update_bucket(response.headers)
+            self._on_success()
+            return response
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                'concurrency_limit': round(self.limit, 2),
+                'in_flight': self.in_flight,
+                'waiting': len(self._waiting),
+                'requests': self.requests,
+                'throttled': self.throttled,
+                'server_errors': self.server_errors,
+                'decreases': self.decreases,
+                'max_wait_ms': round(self.max_wait_ms, 1),
+                'remaining_requests': None if self.bucket.capacity is None else round(self.bucket.tokens, 1),
+            }
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Request aborting for the Voice Transcriber app
+Shuts down the connection under a transcription request once it is cancelled, so a cancelled
+recording or a losing hedged duplicate stops uploading and stops waiting for its response
+"""
+
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+import httpcore
+import httpx
+
+from jobs import CancelToken
+
+
+class _TrackedStream(httpcore.NetworkStream):
+    """Network stream that records which thread used it last"""
+
+    def __init__(self, stream: httpcore.NetworkStream, backend: 'AbortableBackend'):
+        self._stream = stream
+        self._backend = backend
+        self.owner: Optional[int] = None
+
+    def read(self, max_bytes: int, timeout: Optional[float] = None) -> bytes:
+        self._backend._using(self)
+        return self._stream.read(max_bytes, timeout)
+
+    def write(self, buffer: bytes, timeout: Optional[float] = None) -> None:
+        self._backend._using(self)
+        self._stream.write(buffer, timeout)
+
+    def close(self) -> None:
+        self._stream.close()
+
+    def start_tls(self, ssl_context: Any, server_hostname: Optional[str] = None,
+                  timeout: Optional[float] = None) -> httpcore.NetworkStream:
+        return _TrackedStream(self._stream.start_tls(ssl_context, server_hostname, timeout), self._backend)
+
+    def get_extra_info(self, info: str) -> Any:
+        return self._stream.get_extra_info(info)
+
+    def abort(self) -> None:
+        """Shut the socket down, which fails a read or write blocked on it in another thread"""
+        sock = self._stream.get_extra_info('socket')
+        if sock is not None:
+            try:
+                # The plain socket's shutdown, so an SSL socket's state isn't torn down under its reader
+                socket.socket.shutdown(sock, socket.SHUT_RDWR)
+            except OSError:
+                pass  # Already closed
+
+
+class AbortableBackend(httpcore.NetworkBackend):
+    """Network backend of the HTTP client that can abort requests on cancel
+
+    A request sent inside abort_on_cancel(token) has its connection shut
+    down once the token is cancelled, whether it is still uploading or
+    already waiting for the response. The request then fails with a
+    connection error, the server stops working on it and the connection
+    leaves the pool. Tokens are polled every poll_interval seconds by a
+    watcher thread that only runs while requests are being watched.
+    """
+
+    def __init__(self, backend: Optional[httpcore.NetworkBackend] = None, poll_interval: float = 0.1):
+        self._backend = backend or httpcore.SyncBackend()
+        self.poll_interval = poll_interval
+        self.aborted = 0
+        self._watched: Dict[int, CancelToken] = {}  # Thread -> token of the request it is sending
+        self._streams: Dict[int, _TrackedStream] = {}  # Thread -> stream that request is using
+        self._watcher: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def attach(self, transport: httpx.HTTPTransport) -> bool:
+        """Make transport's connection pool open its connections through this backend
+
+        httpx has no option for a pool's network backend, so this sets it on
+        the pool; returns False if this httpx version has none to set.
+        """
+        pool = getattr(transport, '_pool', None)
+        if not hasattr(pool, '_network_backend'):
+            return False
+        pool._network_backend = self
+        return True
+
+    def connect_tcp(self, host: str, port: int, timeout: Optional[float] = None, local_address: Optional[str] = None,
+                    socket_options: Optional[Any] = None) -> httpcore.NetworkStream:
+        return _TrackedStream(self._backend.connect_tcp(host, port, timeout, local_address, socket_options), self)
+
+    def connect_unix_socket(self, path: str, timeout: Optional[float] = None,
+                            socket_options: Optional[Any] = None) -> httpcore.NetworkStream:
+        return _TrackedStream(self._backend.connect_unix_socket(path, timeout, socket_options), self)
+
+    def sleep(self, seconds: float) -> None:
+        self._backend.sleep(seconds)
+
+    def _using(self, stream: _TrackedStream) -> None:
+        ident = threading.get_ident()
+        stream.owner = ident
+        with self._lock:
+            if ident in self._watched:
+                self._streams[ident] = stream
+
+    @contextmanager
+    def abort_on_cancel(self, token: CancelToken) -> Iterator[None]:
+        """Abort the request this thread sends inside the block once token is cancelled"""
+        ident = threading.get_ident()
+        with self._lock:
+            self._watched[ident] = token
+            self._streams.pop(ident, None)
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=self._watch_loop, name='request-abort', daemon=True)
+                self._watcher.start()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._watched.pop(ident, None)
+                self._streams.pop(ident, None)
+
+    def _watch_loop(self) -> None:
+        while True:
+            time.sleep(self.poll_interval)
+            with self._lock:
+                if not self._watched:
+                    self._watcher = None
+                    return
+                # A cancelled request that hasn't touched its connection yet is aborted on a later poll
+                cancelled = [(ident, self._streams[ident]) for ident, token in self._watched.items()
+                             if token.cancelled and ident in self._streams]
+                for ident, _ in cancelled:
+                    del self._watched[ident]
+                    del self._streams[ident]
+            for ident, stream in cancelled:
+                # Once the connection went back to the pool another request may be using it
+                if stream.owner == ident:
+                    stream.abort()
+                    self.aborted += 1
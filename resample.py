@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Sample rate and channel conversion for the Voice Transcriber app
+Converts audio captured at the device's native format to what Whisper gets, one chunk at a time
+"""
+
+from math import gcd
+
+import numpy as np
+
+
+def design_polyphase_filter(up: int, down: int, taps_per_phase: int) -> np.ndarray:
+    """Windowed-sinc low-pass filter split into `up` phases of taps_per_phase taps each"""
+    length = up * taps_per_phase
+    # Cut off at the lower of the two Nyquist frequencies, relative to the upsampled rate
+    cutoff = 0.5 / max(up, down)
+    n = np.arange(length) - (length - 1) / 2
+    taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length, 8.0)
+    taps *= up / taps.sum()  # Unity gain after zero-stuffing
+    # phases[p, k] is the tap applied to the k-th most recent input sample at phase p
+    return taps.reshape(taps_per_phase, up).T.astype(np.float32)
+
+
+class StreamingResampler:
+    """Polyphase resampler and channel mixer for interleaved 16-bit PCM
+
+    Keeps the filter history between chunks, so a stream can be converted
+    piece by piece as it is captured without clicks at chunk boundaries.
+    """
+
+    def __init__(self, input_rate: int, output_rate: int, input_channels: int = 1,
+                 output_channels: int = 1, taps_per_phase: int = 32):
+        divisor = gcd(input_rate, output_rate)
+        self.up = output_rate // divisor
+        self.down = input_rate // divisor
+        self.input_channels = input_channels
+        self.output_channels = output_channels
+        self.taps_per_phase = taps_per_phase
+        self.passthrough = self.up == self.down and input_channels == output_channels
+        self.phases = design_polyphase_filter(self.up, self.down, taps_per_phase) if self.up != self.down else None
+        self._tap_offsets = np.arange(taps_per_phase)
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget the history, e.g. when a new stream starts"""
+        self._history = np.zeros((self.taps_per_phase - 1, self.output_channels), dtype=np.float32)
+        self._next_time = 0  # Next output position, in upsampled samples from the chunk start
+
+    def _mix(self, samples: np.ndarray) -> np.ndarray:
+        frames = samples[:len(samples) // self.input_channels * self.input_channels].reshape(-1, self.input_channels)
+        if self.input_channels == self.output_channels:
+            return frames.astype(np.float32)
+        if self.output_channels == 1:
+            return frames.mean(axis=1, dtype=np.float32, keepdims=True)
+        # Keep the first channels, repeating the last one if the device has fewer
+        columns = np.minimum(np.arange(self.output_channels), self.input_channels - 1)
+        return frames[:, columns].astype(np.float32)
+
+    def process(self, chunk: bytes) -> bytes:
+        """Convert one chunk of interleaved 16-bit PCM"""
+        if self.passthrough:
+            return chunk
+
+        frames = self._mix(np.frombuffer(chunk, dtype='<i2'))
+        if self.phases is None:
+            output = frames
+        else:
+            signal = np.concatenate((self._history, frames))
+            input_count = len(frames)
+            output_count = max(0, -(-(input_count * self.up - self._next_time) // self.down))
+
+            times = self._next_time + self.down * np.arange(output_count)
+            # Index into `signal`, which starts with taps_per_phase - 1 history samples
+            newest = times // self.up + self.taps_per_phase - 1
+            windows = signal[newest[:, None] - self._tap_offsets[None, :]]
+            output = np.einsum('ok,okc->oc', self.phases[times % self.up], windows)
+
+            self._next_time += self.down * output_count - input_count * self.up
+            self._history = signal[len(signal) - (self.taps_per_phase - 1):]
+
+        return np.clip(np.rint(output), -32768, 32767).astype('<i2').tobytes()
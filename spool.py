@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Offline spool for the Voice Transcriber app
+Keeps recordings whose transcription failed for a retriable reason (network down, rate limited,
+server error) on disk, and retries them in the background until they go through
+"""
+
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+import openai
+
+from fileutils import make_private_dirs, open_private_append
+
+
+def append_history(history_file: str, text: str, recorded_at: float, **fields: Any) -> None:
+    """Append a transcription that was not pasted at the cursor to the history file, readable by the user only"""
+    try:
+        with open_private_append(history_file) as f:
+            f.write(json.dumps({'text': text, 'time': time.time(), 'recorded_at': recorded_at, **fields},
+                               ensure_ascii=False) + '\n')
+    except OSError as e:
+        print(f"⚠️  Could not write transcription history: {e}")
+
+
+def is_retriable_error(error: BaseException) -> bool:
+    """Whether a failed request may succeed later without changes on our side"""
+    if isinstance(error, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)):
+        return True  # APITimeoutError is an APIConnectionError
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409) or error.status_code >= 500
+    return False
+
+
+class TranscriptionSpool:
+    """Directory of audio files waiting to be transcribed, each with a JSON metadata file
+
+    A background thread retries due entries oldest first. After a failure an
+    entry waits a random time between zero and base_delay * 2**attempts,
+    capped at max_delay ("full jitter"), so a batch of spooled recordings
+    doesn't retry in lockstep. Entries that fail with a non-retriable error
+    stay on disk, marked as failed, until evicted. When the spool grows past
+    max_bytes the oldest entries are evicted.
+    """
+
+    def __init__(self, directory: str, transcribe: Callable[[str, Dict[str, Any]], str],
+                 on_result: Callable[[str, Dict[str, Any]], None], max_bytes: int = 200 << 20,
+                 base_delay: float = 5.0, max_delay: float = 600.0, history_file: Optional[str] = None):
+        self.directory = directory
+        self.transcribe = transcribe
+        self.on_result = on_result
+        self.max_bytes = max_bytes
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.history_file = history_file
+        self.evicted = 0
+        make_private_dirs(directory)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='spool-retrier', daemon=True)
+        self._thread.start()
+
+    def _meta_path(self, entry_id: str) -> str:
+        return os.path.join(self.directory, f'{entry_id}.json')
+
+    def add(self, audio: bytes, extension: str, metadata: Dict[str, Any]) -> str:
+        """Spool encoded audio; returns the entry id"""
+        entry_id = f'{time.time():.6f}-{uuid.uuid4().hex[:8]}'
+        audio_path = os.path.join(self.directory, f'{entry_id}.{extension}')
+        meta = {
+            **metadata,
+            'id': entry_id,
+            'audio': os.path.basename(audio_path),
+            'created_at': time.time(),
+            'attempts': 0,
+            'next_attempt_at': time.time() + self.base_delay,
+            'failed': False,
+        }
+        with self._lock:
+            with open(audio_path, 'wb') as f:
+                f.write(audio)
+            self._write_meta(meta)
+            self._evict()
+        self._wake.set()  # The retrier may be waiting without a deadline
+        return entry_id
+
+    def _write_meta(self, meta: Dict[str, Any]) -> None:
+        # Write and rename, so a crash never leaves half a metadata file behind
+        path = self._meta_path(meta['id'])
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(path + '.tmp', path)
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Metadata of every spooled entry, oldest first"""
+        entries = []
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), encoding='utf-8') as f:
+                    entries.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # Removed meanwhile, or unreadable
+        return entries
+
+    def _entry_size(self, meta: Dict[str, Any]) -> int:
+        size = 0
+        for path in (os.path.join(self.directory, meta['audio']), self._meta_path(meta['id'])):
+            try:
+                size += os.path.getsize(path)
+            except OSError:
+                pass
+        return size
+
+    def _remove(self, meta: Dict[str, Any]) -> None:
+        for path in (os.path.join(self.directory, meta['audio']), self._meta_path(meta['id'])):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    def _evict(self) -> None:
+        entries = self.entries()
+        total = sum(self._entry_size(meta) for meta in entries)
+        for meta in entries[:-1]:  # Never the entry just added
+            if total <= self.max_bytes:
+                break
+            total -= self._entry_size(meta)
+            self._remove(meta)
+            self.evicted += 1
+            print(f"⚠️  Spool is full, dropped the recording from {time.ctime(meta['created_at'])}")
+
+    @property
+    def pending(self) -> int:
+        return sum(1 for meta in self.entries() if not meta['failed'])
+
+    def wake(self) -> None:
+        """Retry everything now, e.g. when a live request just went through"""
+        with self._lock:
+            for meta in self.entries():
+                if not meta['failed'] and meta['next_attempt_at'] > time.time():
+                    meta['next_attempt_at'] = time.time()
+                    self._write_meta(meta)
+        self._wake.set()
+
+    def _run(self) -> None:
+        while self._running:
+            with self._lock:
+                waiting = [meta for meta in self.entries() if not meta['failed']]
+            due = [meta for meta in waiting if meta['next_attempt_at'] <= time.time()]
+            for meta in due:
+                if not self._running:
+                    return
+                self._retry(meta)
+
+            if due:
+                continue
+            next_at = min((meta['next_attempt_at'] for meta in waiting), default=None)
+            timeout = None if next_at is None else max(0.0, next_at - time.time())
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+    def _retry(self, meta: Dict[str, Any]) -> None:
+        audio_path = os.path.join(self.directory, meta['audio'])
+        if not os.path.exists(audio_path):
+            # Evicted meanwhile, deleted by the user, or a crash between the two unlinks of _remove:
+            # drop the metadata too, or this entry would stay due forever
+            with self._lock:
+                self._remove(meta)
+            return
+        try:
+            text = self.transcribe(audio_path, meta)
+        except Exception as e:
+            meta['attempts'] += 1
+            meta['last_error'] = f'{type(e).__name__}: {e}'
+            if is_retriable_error(e):
+                backoff = min(self.max_delay, self.base_delay * 2 ** meta['attempts'])
+                meta['next_attempt_at'] = time.time() + random.uniform(0, backoff)
+            else:
+                meta['failed'] = True
+                print(f"❌ Spooled recording {meta['id']} can't be transcribed: {e}")
+            with self._lock:
+                if os.path.exists(self._meta_path(meta['id'])):
+                    self._write_meta(meta)
+            return
+
+        with self._lock:
+            self._remove(meta)
+        if self.history_file:
+            append_history(self.history_file, text, meta.get('recorded_at', meta['created_at']),
+                           attempts=meta['attempts'] + 1)
+        try:
+            self.on_result(text, meta)
+        except Exception as e:
+            print(f"⚠️  Delivering a spooled transcription failed: {e}")
+
+    def close(self) -> None:
+        self._running = False
+        self._wake.set()
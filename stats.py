@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Per-session statistics for the Voice Transcriber app
+Collects stage timings and counters for each dictation
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+# PortAudio stream callback status flags (portaudio.h)
+PA_INPUT_UNDERFLOW = 0x01
+PA_INPUT_OVERFLOW = 0x02
+PA_PRIMING_OUTPUT = 0x10
+
+
+class SessionStats:
+    """Stage timings and values recorded for one recording session"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.stages: Dict[str, float] = {}  # Milliseconds spent per stage
+        self.values: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time a pipeline stage; repeated stages (e.g. per segment) add up"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage_time(name, (time.perf_counter() - start) * 1000)
+
+    def add_stage_time(self, name: str, ms: float) -> None:
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + ms
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self.values[key] = value
+
+    def add(self, key: str, amount: float = 1) -> None:
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Snapshot of everything recorded so far"""
+        with self._lock:
+            return {
+                'started_at': self.started_at,
+                'stages_ms': dict(self.stages),
+                **self.values
+            }
+
+    def summary(self) -> str:
+        """One-line human readable summary"""
+        with self._lock:
+            stages = ' '.join(f"{name}={ms:.0f}ms" for name, ms in self.stages.items())
+            values = ' '.join(f"{key}={value}" for key, value in self.values.items())
+        return ' | '.join(part for part in (stages, values) if part)
+
+
+class CaptureHealth:
+    """Input status flags and callback timing collected from the audio callback
+
+    Jitter is how far each callback interval strays from the chunk duration,
+    measured on the ADC timestamps PortAudio passes in time_info (or the
+    arrival time when the host API leaves those at zero).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.callbacks = 0
+            self.input_overflows = 0
+            self.input_underflows = 0
+            self.priming_outputs = 0
+            self._jitter_total_ms = 0.0
+            self._intervals = 0
+            self.max_gap_ms = 0.0
+            self._last_time: Optional[float] = None
+
+    def observe(self, status: int, time_info: Optional[Dict[str, float]], frame_count: int, sample_rate: int) -> None:
+        """Record one callback; cheap enough for the PortAudio thread"""
+        timestamp = (time_info or {}).get('input_buffer_adc_time') or time.monotonic()
+        with self._lock:
+            self.callbacks += 1
+            if status & PA_INPUT_OVERFLOW:
+                self.input_overflows += 1
+            if status & PA_INPUT_UNDERFLOW:
+                self.input_underflows += 1
+            if status & PA_PRIMING_OUTPUT:
+                self.priming_outputs += 1
+
+            if self._last_time is not None:
+                gap_ms = (timestamp - self._last_time) * 1000
+                self._jitter_total_ms += abs(gap_ms - frame_count * 1000 / sample_rate)
+                self._intervals += 1
+                self.max_gap_ms = max(self.max_gap_ms, gap_ms)
+            self._last_time = timestamp
+
+    def snapshot(self) -> Dict[str, float]:
+        """Counters since the last reset, named as they appear in session stats"""
+        with self._lock:
+            return {
+                'callbacks': self.callbacks,
+                'input_overflows': self.input_overflows,
+                'input_underflows': self.input_underflows,
+                'priming_outputs': self.priming_outputs,
+                'callback_jitter_ms': round(self._jitter_total_ms / self._intervals, 2) if self._intervals else 0.0,
+                'max_callback_gap_ms': round(self.max_gap_ms, 1),
+            }
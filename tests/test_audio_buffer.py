@@ -0,0 +1,96 @@
+import os
+
+
+from audio_buffer import BufferPool, MemoryViewReader, PCMBuffer, build_wav_header
+
+
+def pattern(size: int, seed: int = 0) -> bytes:
+    return bytes((seed + i) % 251 for i in range(size))
+
+
+def test_appends_grow_one_contiguous_buffer():
+    buffer = PCMBuffer(initial_capacity=16)
+    data = pattern(1000)
+    for start in range(0, len(data), 70):
+        buffer.append(data[start:start + 70])
+    assert len(buffer) == 1000
+    assert buffer.capacity >= 1000
+    assert bytes(buffer.view()) == data
+
+
+def test_views_handed_out_stay_valid_while_growing():
+    buffer = PCMBuffer(initial_capacity=8)
+    buffer.append(b'abcd')
+    view = buffer.view()
+    buffer.append(pattern(100))
+    assert bytes(view) == b'abcd'
+
+
+def test_pool_reuses_released_buffers_empty():
+    pool = BufferPool(max_buffers=1, initial_capacity=64)
+    buffer = pool.acquire()
+    buffer.append(pattern(100))
+    pool.release(buffer)
+    reused = pool.acquire()
+    assert reused is buffer
+    assert len(reused) == 0
+    assert pool.acquire() is not buffer  # The pool is empty again
+
+
+def test_pool_drops_oversized_and_surplus_buffers():
+    pool = BufferPool(max_buffers=1, initial_capacity=64, max_retained_capacity=128)
+    large = pool.acquire()
+    large.append(pattern(1000))
+    pool.release(large)
+    assert pool.acquire() is not large
+    first, second = pool.acquire(), pool.acquire()
+    pool.release(first)
+    pool.release(second)
+    assert pool.acquire() is first
+    assert pool.acquire() is not second
+
+
+def test_spills_past_the_threshold_and_reads_back(tmp_path):
+    buffer = PCMBuffer(initial_capacity=64, spill_threshold=256, spill_grow_bytes=1024, spill_dir=str(tmp_path))
+    data = pattern(5000)
+    for start in range(0, len(data), 100):
+        buffer.append(data[start:start + 100])
+    assert buffer.is_spilled
+    assert os.path.dirname(buffer.spill_path) == str(tmp_path)
+    # Raw PCM, grown in whole increments
+    assert os.path.getsize(buffer.spill_path) == 5 * 1024
+    assert bytes(buffer.view()) == data
+    assert buffer.capacity <= 256  # Memory stopped growing at the threshold
+
+
+def test_spilled_ranges_upload_as_a_wav_file(tmp_path):
+    buffer = PCMBuffer(initial_capacity=64, spill_threshold=256, spill_grow_bytes=1024, spill_dir=str(tmp_path))
+    buffer.append(pattern(2000))
+    view = buffer.view()
+    segments = [view[100:300], view[1500:1600]]
+    header = build_wav_header(300, 1, 2, 16000)
+    with MemoryViewReader([header, *segments], name='audio.wav') as reader:
+        assert reader.read() == header + pattern(2000)[100:300] + pattern(2000)[1500:1600]
+    # The reader's own views are gone, the caller's still work
+    assert bytes(segments[1]) == pattern(2000)[1500:1600]
+
+
+def test_pooled_buffer_drops_its_spill_file_and_is_reused_in_memory(tmp_path):
+    pool = BufferPool(max_buffers=1, initial_capacity=64, spill_threshold=256,
+                      spill_grow_bytes=1024, spill_dir=str(tmp_path))
+    buffer = pool.acquire()
+    buffer.append(pattern(1000))
+    spill_path = buffer.spill_path
+    pool.release(buffer)
+    assert not os.path.exists(spill_path)
+
+    reused = pool.acquire()
+    assert reused is buffer
+    reused.append(pattern(100, seed=7))
+    assert not reused.is_spilled
+    assert bytes(reused.view()) == pattern(100, seed=7)
+    reused.append(pattern(500, seed=7)[100:])
+    assert reused.is_spilled
+    assert bytes(reused.view()) == pattern(500, seed=7)
+    pool.release(reused)
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,92 @@
+import os
+import stat
+import time
+
+import pytest
+
+from cache import TranscriptionCache, cache_key
+
+AUDIO_FORMAT = {'rate': 16000, 'channels': 1, 'sample_width': 2}
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'cache' / 'transcriptions.sqlite3')
+
+
+def test_memory_tier_evicts_the_least_recently_used():
+    cache = TranscriptionCache(None, memory_entries=2)
+    cache.put('a', 'alpha', 100)
+    cache.put('b', 'beta', 100)
+    assert cache.get('a') == 'alpha'  # Now 'b' is the least recently used
+    cache.put('c', 'gamma', 100)
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == ('alpha', 'gamma')
+    snapshot = cache.snapshot()
+    assert (snapshot['memory_hits'], snapshot['misses'], snapshot['bytes_saved']) == (3, 1, 300)
+
+
+def test_expired_entries_are_misses():
+    cache = TranscriptionCache(None, ttl=0.05)
+    cache.put('a', 'alpha', 100)
+    assert cache.get('a') == 'alpha'
+    time.sleep(0.1)
+    assert cache.get('a') is None
+
+
+def test_entries_survive_reopening(db_path):
+    cache = TranscriptionCache(db_path)
+    cache.put('a', 'alpha', 100)
+    cache.close()
+
+    reopened = TranscriptionCache(db_path)
+    try:
+        assert reopened.get('a') == 'alpha'
+        assert reopened.get('a') == 'alpha'  # Promoted to memory by the first lookup
+        snapshot = reopened.snapshot()
+        assert (snapshot['disk_hits'], snapshot['memory_hits']) == (1, 1)
+    finally:
+        reopened.close()
+
+
+def test_disk_tier_keeps_the_most_recently_used(db_path):
+    cache = TranscriptionCache(db_path, disk_entries=2)
+    for key in 'abc':
+        cache.put(key, key.upper(), 100)
+        time.sleep(0.01)
+    cache.close()
+
+    reopened = TranscriptionCache(db_path, disk_entries=2)
+    try:
+        assert [reopened.get(key) for key in 'abc'] == [None, 'B', 'C']
+    finally:
+        reopened.close()
+
+
+def test_expired_entries_are_purged_on_open(db_path):
+    cache = TranscriptionCache(db_path)
+    cache.put('a', 'alpha', 100)
+    cache.close()
+    time.sleep(0.1)
+
+    reopened = TranscriptionCache(db_path, ttl=0.05)
+    try:
+        assert reopened.get('a') is None
+    finally:
+        reopened.close()
+
+
+def test_database_is_private(db_path):
+    TranscriptionCache(db_path).close()
+    assert stat.S_IMODE(os.stat(db_path).st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(os.path.dirname(db_path)).st_mode) == 0o700
+
+
+def test_key_covers_the_audio_format_and_model_but_not_segment_boundaries():
+    audio = memoryview(bytes(range(200)))
+    key = cache_key([audio], AUDIO_FORMAT, 'whisper-1')
+    assert cache_key([audio[:50], audio[50:]], AUDIO_FORMAT, 'whisper-1') == key
+    assert cache_key([audio], {**AUDIO_FORMAT, 'rate': 8000}, 'whisper-1') != key
+    assert cache_key([audio], AUDIO_FORMAT, 'gpt-4o-transcribe') != key
+    assert cache_key([audio], AUDIO_FORMAT, 'whisper-1', {'language': 'nl'}) != key
+    assert cache_key([audio[:199]], AUDIO_FORMAT, 'whisper-1') != key
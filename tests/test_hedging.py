@@ -0,0 +1,110 @@
+import itertools
+import threading
+import time
+
+import pytest
+
+from hedging import HedgingPolicy, hedged_call
+from jobs import CancelToken, TranscriptionCancelled
+
+
+def fast_policy(**kwargs) -> HedgingPolicy:
+    return HedgingPolicy(initial_delay=0.05, min_delay=0.01, **kwargs)
+
+
+def attempts(*behaviours):
+    """attempt callable running behaviours[i] for the i-th attempt, recording each attempt's token"""
+    counter = itertools.count()
+    tokens = []
+
+    def attempt(token: CancelToken):
+        tokens.append(token)
+        return behaviours[next(counter)](token)
+    return attempt, tokens
+
+
+def wait_for_cancel(token: CancelToken):
+    while not token.cancelled:
+        time.sleep(0.01)
+    raise TranscriptionCancelled()
+
+
+def test_fast_primary_is_not_hedged():
+    policy = fast_policy()
+    attempt, tokens = attempts(lambda token: 'primary')
+    result = hedged_call(attempt, policy, poll_interval=0.01)
+    assert (result.value, result.attempts, result.winner) == ('primary', 1, 0)
+    assert policy.snapshot()['hedges'] == 0
+
+
+def test_hedge_wins_and_cancels_the_primary():
+    policy = fast_policy()
+    attempt, tokens = attempts(wait_for_cancel, lambda token: 'duplicate')
+    result = hedged_call(attempt, policy, poll_interval=0.01)
+    assert (result.value, result.attempts, result.winner) == ('duplicate', 2, 1)
+    assert tokens[0].cancelled
+    assert policy.snapshot()['hedge_wins'] == 1
+
+
+def test_primary_still_wins_after_hedging():
+    policy = fast_policy()
+    release = threading.Event()
+
+    def primary(token):
+        release.wait(1)
+        return 'primary'
+
+    def duplicate(token):
+        release.set()
+        wait_for_cancel(token)
+
+    attempt, tokens = attempts(primary, duplicate)
+    result = hedged_call(attempt, policy, poll_interval=0.01)
+    assert (result.value, result.winner) == ('primary', 0)
+    assert tokens[1].cancelled
+    assert policy.snapshot()['hedge_wins'] == 0
+
+
+def test_a_failed_attempt_waits_for_the_other():
+    def primary(token):
+        time.sleep(0.2)
+        return 'primary'
+
+    def duplicate(token):
+        raise ConnectionError('duplicate')
+
+    attempt, _ = attempts(primary, duplicate)
+    result = hedged_call(attempt, fast_policy(), poll_interval=0.01)
+    assert (result.value, result.winner) == ('primary', 0)
+
+
+def test_all_attempts_failing_raises_the_last_error():
+    def primary(token):
+        time.sleep(0.2)
+        raise ConnectionError('primary')
+
+    def duplicate(token):
+        raise ConnectionError('duplicate')
+
+    attempt, _ = attempts(primary, duplicate)
+    with pytest.raises(ConnectionError, match='primary'):
+        hedged_call(attempt, fast_policy(), poll_interval=0.01)
+
+
+def test_no_duplicate_without_budget():
+    policy = fast_policy(budget_ratio=0.0)
+    assert policy.try_hedge()  # The one hedge a fresh policy starts with
+    attempt, tokens = attempts(lambda token: time.sleep(0.1) or 'primary')
+    result = hedged_call(attempt, policy, poll_interval=0.01)
+    assert (result.value, result.attempts) == ('primary', 1)
+
+
+def test_cancel_returns_without_waiting_for_the_attempts():
+    cancel_token = CancelToken()
+    attempt, tokens = attempts(wait_for_cancel)
+    threading.Timer(0.05, cancel_token.cancel).start()
+    start = time.monotonic()
+    with pytest.raises(TranscriptionCancelled):
+        hedged_call(attempt, None, cancel_token, poll_interval=0.01)
+    assert time.monotonic() - start < 1
+    assert tokens[0].cancelled
@@ -0,0 +1,99 @@
+import json
+import sys
+
+import pytest
+
+from macos_helper import STUB_COMMAND, OsaHelper
+
+# Reads commands but never answers them
+SILENT_COMMAND = [sys.executable, '-c', 'import sys\nfor line in sys.stdin: pass']
+
+
+@pytest.fixture
+def helper():
+    helper = OsaHelper(STUB_COMMAND, reply_timeout=5)
+    yield helper
+    helper.close()
+
+
+def recording_command(path) -> list:
+    """Stub that also writes every command it receives to path"""
+    script = (
+        'import json, sys\n'
+        f'log = open({str(path)!r}, "a")\n'
+        'for line in sys.stdin:\n'
+        '    log.write(line); log.flush()\n'
+        '    command = json.loads(line)\n'
+        '    print(json.dumps({"ok": True, **command}), flush=True)\n'
+    )
+    return [sys.executable, '-c', script]
+
+
+def kill(helper: OsaHelper) -> None:
+    helper.process.kill()
+    helper.process.wait()
+
+
+def test_send_reaches_the_helper_in_order(tmp_path):
+    log = tmp_path / 'commands.jsonl'
+    helper = OsaHelper(recording_command(log), reply_timeout=5)
+    try:
+        helper.notify('Voice Transcriber', 'Recording started')
+        helper.copy('Hello')
+        helper.paste()
+        helper.type('Hello')  # Confirmed once the helper got this far
+    finally:
+        helper.close()
+    commands = [json.loads(line)['cmd'] for line in log.read_text().splitlines()]
+    assert commands == ['notify', 'copy', 'paste', 'type']
+
+
+def test_request_waits_for_the_reply(helper):
+    helper.request('type', text='Hello')
+    assert helper._replies == {}
+
+
+def test_failed_command_raises(helper):
+    # The stub echoes the command's fields back, so this one is answered as failed
+    with pytest.raises(RuntimeError, match='boom'):
+        helper.request('type', text='Hello', ok=False, error='boom')
+
+
+def test_restarts_a_helper_that_died(helper):
+    helper.start()
+    first = helper.process
+    kill(helper)
+    helper.request('type', text='Hello')
+    assert helper.process is not first
+    assert helper.process.poll() is None
+
+
+def test_gives_up_after_max_restarts():
+    helper = OsaHelper(STUB_COMMAND, max_restarts=1, reply_timeout=5)
+    try:
+        helper.start()
+        kill(helper)
+        helper.request('type', text='Hello')  # First restart is allowed
+        kill(helper)
+        with pytest.raises(RuntimeError, match='giving up'):
+            helper.send('paste')
+    finally:
+        helper.close()
+
+
+def test_request_times_out_without_a_reply():
+    helper = OsaHelper(SILENT_COMMAND, reply_timeout=0.2)
+    try:
+        with pytest.raises(RuntimeError, match='did not confirm'):
+            helper.request('type', text='Hello')
+        assert helper._replies == {}
+    finally:
+        helper.close()
+
+
+def test_close_lets_the_helper_exit(helper):
+    helper.start()
+    process = helper.process
+    helper.close()
+    assert process.poll() is not None
+    assert helper.process is None
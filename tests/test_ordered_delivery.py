@@ -0,0 +1,90 @@
+import threading
+import time
+
+import pytest
+
+from jobs import OrderedDelivery
+
+
+class Recorder:
+    """Collects what the delivery thread runs, in order"""
+
+    def __init__(self):
+        self.delivered = []
+        self._condition = threading.Condition()
+
+    def action(self, name: str):
+        def run():
+            with self._condition:
+                self.delivered.append(name)
+                self._condition.notify_all()
+        return run
+
+    def wait_for(self, count: int, timeout: float = 2.0):
+        with self._condition:
+            assert self._condition.wait_for(lambda: len(self.delivered) >= count, timeout), self.delivered
+        return self.delivered
+
+
+@pytest.fixture
+def make_delivery():
+    deliveries = []
+
+    def make(hol_timeout=None):
+        delivery = OrderedDelivery(hol_timeout)
+        deliveries.append(delivery)
+        return delivery
+    yield make
+    for delivery in deliveries:
+        delivery.close()
+
+
+def test_results_are_delivered_in_recording_order(make_delivery):
+    delivery, recorder = make_delivery(), Recorder()
+    first, second, third = (delivery.next_sequence() for _ in range(3))
+    delivery.complete(third, recorder.action('third'))
+    delivery.complete(second, recorder.action('second'))
+    time.sleep(0.05)
+    assert recorder.delivered == []  # Still waiting for the first recording
+    delivery.complete(first, recorder.action('first'))
+    assert recorder.wait_for(3) == ['first', 'second', 'third']
+
+
+def test_a_job_without_output_does_not_block_later_ones(make_delivery):
+    delivery, recorder = make_delivery(), Recorder()
+    first, second = delivery.next_sequence(), delivery.next_sequence()
+    delivery.complete(second, recorder.action('second'))
+    delivery.complete(first, None)
+    assert recorder.wait_for(1) == ['second']
+
+
+def test_slow_head_of_line_is_skipped_and_delivered_late(make_delivery):
+    delivery, recorder = make_delivery(hol_timeout=0.1), Recorder()
+    first, second = delivery.next_sequence(), delivery.next_sequence()
+    delivery.complete(second, recorder.action('second'))
+    assert recorder.wait_for(1) == ['second']
+    delivery.complete(first, recorder.action('first'), late_action=recorder.action('first late'))
+    assert recorder.wait_for(2) == ['second', 'first late']
+    snapshot = delivery.snapshot()
+    assert (snapshot['delivered'], snapshot['skipped'], snapshot['late']) == (2, 1, 1)
+
+
+def test_skipped_job_without_late_action_is_dropped(make_delivery):
+    delivery, recorder = make_delivery(hol_timeout=0.1), Recorder()
+    first, second, third = (delivery.next_sequence() for _ in range(3))
+    delivery.complete(second, recorder.action('second'))
+    recorder.wait_for(1)
+    delivery.complete(first, recorder.action('first'))
+    delivery.complete(third, recorder.action('third'))
+    assert recorder.wait_for(2) == ['second', 'third']
+    time.sleep(0.05)
+    assert recorder.delivered == ['second', 'third']
+
+
+def test_head_of_line_is_not_skipped_while_nothing_waits_behind_it(make_delivery):
+    delivery, recorder = make_delivery(hol_timeout=0.05), Recorder()
+    first = delivery.next_sequence()
+    time.sleep(0.15)
+    delivery.complete(first, recorder.action('first'))
+    assert recorder.wait_for(1) == ['first']
+    assert delivery.snapshot()['skipped'] == 0
@@ -0,0 +1,139 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from jobs import CancelToken, TranscriptionCancelled
+from ratelimit import (PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, AdaptiveRateLimiter, TokenBucket,
+                       parse_duration, retry_after)
+
+REQUEST = httpx.Request('POST', 'https://api.openai.com/v1/audio/transcriptions')
+
+
+def response(headers=None):
+    return SimpleNamespace(headers=headers or {})
+
+
+def rate_limited(retry_after_ms: int = 50) -> openai.RateLimitError:
+    reply = httpx.Response(429, headers={'retry-after-ms': str(retry_after_ms)}, request=REQUEST)
+    return openai.RateLimitError('Rate limit reached', response=reply, body=None)
+
+
+def requests(*outcomes):
+    """request callable returning or raising outcomes in turn"""
+    outcomes = list(outcomes)
+    calls = []
+
+    def request():
+        calls.append(time.monotonic())
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    return request, calls
+
+
+def test_429_is_retried_after_retry_after_and_backs_off_concurrency():
+    limiter = AdaptiveRateLimiter(initial_concurrency=4, poll_interval=0.01)
+    ok = response()
+    request, calls = requests(rate_limited(100), ok)
+    assert limiter.call(request) is ok
+    assert len(calls) == 2
+    assert calls[1] - calls[0] >= 0.09
+    snapshot = limiter.snapshot()
+    assert (snapshot['throttled'], snapshot['decreases']) == (1, 1)
+    assert limiter.limit < 4
+
+
+def test_429_gives_up_after_max_retries():
+    limiter = AdaptiveRateLimiter(max_retries=2, poll_interval=0.01)
+    request, calls = requests(*[rate_limited(10)] * 3)
+    with pytest.raises(openai.RateLimitError):
+        limiter.call(request)
+    assert len(calls) == 3
+
+
+def test_connection_errors_are_retried_without_backing_off_concurrency():
+    limiter = AdaptiveRateLimiter(initial_concurrency=2, retry_delay=0.01, poll_interval=0.01)
+    ok = response()
+    request, calls = requests(openai.APIConnectionError(request=REQUEST), ok)
+    assert limiter.call(request) is ok
+    assert limiter.snapshot()['decreases'] == 0
+
+
+def test_other_errors_are_not_retried():
+    limiter = AdaptiveRateLimiter(poll_interval=0.01)
+    request, calls = requests(ValueError('bad request'))
+    with pytest.raises(ValueError):
+        limiter.call(request)
+    assert len(calls) == 1
+    assert limiter.in_flight == 0
+
+
+def test_interactive_requests_go_before_queued_background_work():
+    limiter = AdaptiveRateLimiter(initial_concurrency=1, max_concurrency=1, poll_interval=0.01)
+    release = threading.Event()
+    order = []
+
+    def blocking():
+        release.wait(2)
+        return response()
+
+    def recorded(name):
+        def request():
+            order.append(name)
+            return response()
+        return request
+
+    first = threading.Thread(target=limiter.call, args=(blocking,))
+    first.start()
+    waiters = []
+    for name, priority in [('background 1', PRIORITY_BACKGROUND), ('background 2', PRIORITY_BACKGROUND),
+                           ('interactive', PRIORITY_INTERACTIVE)]:
+        waiter = threading.Thread(target=limiter.call, args=(recorded(name), priority))
+        waiter.start()
+        waiters.append(waiter)
+        while limiter.snapshot()['waiting'] < len(waiters):
+            time.sleep(0.005)
+    release.set()
+    for thread in [first, *waiters]:
+        thread.join(2)
+    assert order == ['interactive', 'background 1', 'background 2']
+
+
+def test_cancel_while_waiting_for_a_slot():
+    limiter = AdaptiveRateLimiter(initial_concurrency=1, max_concurrency=1, poll_interval=0.01)
+    release = threading.Event()
+    holder = threading.Thread(target=limiter.call, args=(lambda: release.wait(2) and response(),))
+    holder.start()
+    while limiter.in_flight == 0:
+        time.sleep(0.005)
+    token = CancelToken()
+    threading.Timer(0.05, token.cancel).start()
+    with pytest.raises(TranscriptionCancelled):
+        limiter.call(response, cancel_token=token)
+    release.set()
+    holder.join(2)
+    assert limiter.snapshot()['waiting'] == 0
+
+
+def test_bucket_follows_the_rate_limit_headers():
+    bucket = TokenBucket()
+    assert bucket.wait_time(0.0) == 0.0  # Unlimited until the server says otherwise
+    bucket.update(limit=60, remaining=0, reset=parse_duration('1m0s'), now=0.0)
+    assert bucket.wait_time(0.0) == pytest.approx(1.0)
+    assert bucket.wait_time(1.0) == 0.0
+    bucket.block(5, now=1.0)
+    assert bucket.wait_time(2.0) == pytest.approx(4.0)
+
+
+def test_header_parsing():
+    assert parse_duration('6m0s') == 360.0
+    assert parse_duration('20ms') == pytest.approx(0.02)
+    assert parse_duration('soon') is None
+    assert retry_after({'retry-after-ms': '250'}) == 0.25
+    assert retry_after({'retry-after': '2'}) == 2.0
+    assert retry_after({'retry-after': 'Wed, 21 Oct 2015 07:28:00 GMT'}) is None
@@ -0,0 +1,114 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from jobs import CancelToken
+from request_abort import AbortableBackend
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, so connections go back to the pool
+
+    def do_GET(self):
+        if self.path == '/slow':
+            self.server.release.wait(5)
+        self.respond(b'ok')
+
+    def do_POST(self):
+        # Never reads the body, so a large upload blocks once the socket buffers are full
+        self.server.release.wait(5)
+        self.close_connection = True
+        self.respond(b'ok')
+
+    def respond(self, body: bytes):
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    server.release = threading.Event()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.release.set()
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def backend():
+    return AbortableBackend(poll_interval=0.02)
+
+
+@pytest.fixture
+def client(backend):
+    transport = httpx.HTTPTransport()
+    # Pins the private httpcore attribute attach() relies on
+    assert backend.attach(transport)
+    with httpx.Client(transport=transport, timeout=10) as client:
+        yield client
+
+
+def cancel_after(token: CancelToken, seconds: float):
+    threading.Timer(seconds, token.cancel).start()
+
+
+def test_abort_while_waiting_for_the_response(server, backend, client):
+    token = CancelToken()
+    cancel_after(token, 0.1)
+    start = time.monotonic()
+    with pytest.raises(httpx.TransportError), backend.abort_on_cancel(token):
+        client.get(f'{server}/slow')
+    assert time.monotonic() - start < 2
+    assert backend.aborted == 1
+
+
+def test_abort_while_uploading(server, backend, client):
+    token = CancelToken()
+    cancel_after(token, 0.2)
+    start = time.monotonic()
+    with pytest.raises(httpx.TransportError), backend.abort_on_cancel(token):
+        client.post(f'{server}/upload', content=bytes(64 << 20))
+    assert time.monotonic() - start < 2
+    assert backend.aborted == 1
+
+
+def test_pool_works_after_an_abort(server, backend, client):
+    token = CancelToken()
+    cancel_after(token, 0.1)
+    with pytest.raises(httpx.TransportError), backend.abort_on_cancel(token):
+        client.get(f'{server}/slow')
+    assert client.get(f'{server}/fast').text == 'ok'
+
+
+def test_cancel_after_the_request_leaves_the_pooled_connection_alone(server, backend, client):
+    token = CancelToken()
+    with backend.abort_on_cancel(token):
+        assert client.get(f'{server}/fast').text == 'ok'
+    token.cancel()
+    time.sleep(0.1)
+    # Reuses the pooled connection of the finished request
+    assert client.get(f'{server}/fast').text == 'ok'
+    assert backend.aborted == 0
+
+
+def test_request_on_another_thread_is_not_aborted(server, backend, client):
+    token = CancelToken()
+    token.cancel()
+    results = []
+    thread = threading.Thread(target=lambda: results.append(client.get(f'{server}/fast').text))
+    with backend.abort_on_cancel(token):
+        thread.start()
+        thread.join()
+    assert results == ['ok']
+    assert backend.aborted == 0
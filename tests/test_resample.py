@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from resample import StreamingResampler
+
+
+def tone(rate: int, seconds: float, channels: int, frequency: float = 440.0) -> np.ndarray:
+    t = np.arange(int(rate * seconds)) / rate
+    wave = (8000 * np.sin(2 * np.pi * frequency * t)).astype('<i2')
+    return np.repeat(wave[:, None], channels, axis=1)
+
+
+def convert_in_chunks(resampler: StreamingResampler, frames: np.ndarray, chunk_frames: int) -> np.ndarray:
+    output = b''.join(resampler.process(frames[start:start + chunk_frames].tobytes())
+                      for start in range(0, len(frames), chunk_frames))
+    return np.frombuffer(output, dtype='<i2')
+
+
+def dominant_frequency(samples: np.ndarray, rate: int) -> float:
+    spectrum = np.abs(np.fft.rfft(samples * np.hanning(len(samples))))
+    return np.fft.rfftfreq(len(samples), 1 / rate)[spectrum.argmax()]
+
+
+@pytest.mark.parametrize('input_rate', [44100, 48000])
+def test_stereo_device_audio_becomes_16k_mono(input_rate):
+    resampler = StreamingResampler(input_rate, 16000, input_channels=2, output_channels=1)
+    output = convert_in_chunks(resampler, tone(input_rate, 1.0, channels=2), chunk_frames=1024)
+    assert abs(len(output) - 16000) <= 1
+    assert dominant_frequency(output, 16000) == pytest.approx(440, abs=2)
+
+
+@pytest.mark.parametrize('input_rate', [44100, 48000])
+def test_chunk_boundaries_do_not_change_the_output(input_rate):
+    frames = tone(input_rate, 0.5, channels=2)
+    whole = convert_in_chunks(StreamingResampler(input_rate, 16000, 2, 1), frames, chunk_frames=len(frames))
+    chunked = convert_in_chunks(StreamingResampler(input_rate, 16000, 2, 1), frames, chunk_frames=333)
+    assert np.array_equal(whole, chunked)
+
+
+def test_matching_format_passes_through():
+    resampler = StreamingResampler(16000, 16000)
+    chunk = tone(16000, 0.1, channels=1).tobytes()
+    assert resampler.passthrough
+    assert resampler.process(chunk) is chunk
+
+
+def test_stereo_is_mixed_down_without_resampling():
+    resampler = StreamingResampler(16000, 16000, input_channels=2, output_channels=1)
+    frames = np.array([[100, 300], [-200, -400]], dtype='<i2')
+    assert np.frombuffer(resampler.process(frames.tobytes()), dtype='<i2').tolist() == [200, -300]
+
+
+def test_reset_forgets_the_previous_stream():
+    resampler = StreamingResampler(48000, 16000, 2, 1)
+    frames = tone(48000, 0.1, channels=2)
+    first = resampler.process(frames.tobytes())
+    resampler.process(tone(48000, 0.1, channels=2, frequency=1000).tobytes())
+    resampler.reset()
+    assert resampler.process(frames.tobytes()) == first
@@ -0,0 +1,80 @@
+import pytest
+
+from capture_process import SharedRingBuffer
+
+
+def pattern(size: int, seed: int = 0) -> bytes:
+    return bytes((seed + i) % 251 for i in range(size))
+
+
+@pytest.fixture
+def ring():
+    ring = SharedRingBuffer(capacity=100)
+    yield ring
+    ring.close()
+
+
+def read_all(ring: SharedRingBuffer, tail: int):
+    chunks = []
+    tail, dropped = ring.read(tail, lambda view: chunks.append(bytes(view)))
+    return b''.join(chunks), tail, dropped
+
+
+def test_reads_what_was_written_across_the_wrap(ring):
+    data = pattern(250)
+    tail = 0
+    received = b''
+    for start in range(0, len(data), 30):
+        ring.write(data[start:start + 30])
+        chunk, tail, dropped = read_all(ring, tail)
+        received += chunk
+        assert dropped == 0
+    assert received == data
+    assert ring.tail == ring.head == 250
+    assert ring.lag == 0
+
+
+def test_lapped_consumer_counts_the_overwritten_bytes(ring):
+    data = pattern(330)
+    for start in range(0, len(data), 40):
+        ring.write(data[start:start + 40])
+    chunk, tail, dropped = read_all(ring, 0)
+    assert dropped == 230
+    assert chunk == data[-100:]  # The newest capacity bytes survive
+    assert tail == 330
+
+
+def test_write_larger_than_capacity_keeps_the_newest_bytes(ring):
+    ring.write(pattern(50))
+    _, tail, _ = read_all(ring, 0)
+    ring.write(pattern(260, seed=3))
+    chunk, tail, dropped = read_all(ring, tail)
+    assert (chunk, dropped, tail) == (pattern(260, seed=3)[-100:], 160, 310)
+
+
+def test_bytes_overwritten_while_being_consumed_count_as_dropped(ring):
+    ring.write(pattern(80))
+    received = []
+
+    def slow_consumer(view):
+        if not received:
+            # The producer laps the consumer while it is still reading the first view
+            ring.write(pattern(60, seed=5))
+        received.append(bytes(view))
+
+    tail, dropped = ring.read(0, slow_consumer)
+    # 140 bytes written into a 100-byte ring: the oldest 40 were overwritten mid-read
+    assert dropped == 40
+    assert tail == 140
+
+
+def test_attached_ring_sees_the_owners_data(ring):
+    consumer = SharedRingBuffer(name=ring.name)
+    try:
+        assert consumer.capacity == 100
+        ring.write(b'hello')
+        chunk, tail, _ = read_all(consumer, 0)
+        assert chunk == b'hello'
+        assert ring.tail == tail == 5  # Published for the producer side
+    finally:
+        consumer.close()
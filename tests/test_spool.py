@@ -0,0 +1,130 @@
+import json
+import os
+import threading
+import time
+
+import httpx
+import openai
+import pytest
+
+from spool import TranscriptionSpool, is_retriable_error
+
+
+def connection_error() -> openai.APIConnectionError:
+    return openai.APIConnectionError(request=httpx.Request('POST', 'https://api.openai.com/v1/audio/transcriptions'))
+
+
+class Transcriber:
+    """Stand-in transcription: raises the queued errors first, then succeeds"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self, path, metadata):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        with open(path, 'rb') as f:
+            return f.read().decode()
+
+
+@pytest.fixture
+def make_spool(tmp_path):
+    spools = []
+
+    def make(transcribe, **kwargs):
+        results = []
+        delivered = threading.Event()
+
+        def on_result(text, metadata):
+            results.append(text)
+            delivered.set()
+        # A long base delay keeps the retrier idle until a test wakes it or retries by hand
+        kwargs.setdefault('base_delay', 1000.0)
+        spool = TranscriptionSpool(str(tmp_path / 'spool'), transcribe, on_result, **kwargs)
+        spool.results, spool.delivered = results, delivered
+        spools.append(spool)
+        return spool
+    yield make
+    for spool in spools:
+        spool.close()
+
+
+def test_wake_retries_and_delivers(make_spool, tmp_path):
+    spool = make_spool(Transcriber(), history_file=str(tmp_path / 'history.jsonl'))
+    spool.add(b'hello', 'wav', {'recorded_at': 1.0})
+    assert spool.pending == 1
+    spool.wake()
+    assert spool.delivered.wait(2)
+    assert spool.results == ['hello']
+    assert spool.entries() == []
+    history = json.loads((tmp_path / 'history.jsonl').read_text())
+    assert (history['text'], history['recorded_at'], history['attempts']) == ('hello', 1.0, 1)
+
+
+def test_backoff_doubles_up_to_the_cap(make_spool, monkeypatch):
+    spool = make_spool(Transcriber(*[connection_error()] * 4), base_delay=1000.0, max_delay=5000.0)
+    spool.add(b'hello', 'wav', {})
+    monkeypatch.setattr('spool.random.uniform', lambda low, high: high)  # Longest possible jittered wait
+    delays = []
+    for _ in range(4):
+        meta = spool.entries()[0]
+        before = time.time()
+        spool._retry(meta)
+        delays.append(spool.entries()[0]['next_attempt_at'] - before)
+    assert [round(delay, -1) for delay in delays] == [2000, 4000, 5000, 5000]
+    assert spool.entries()[0]['attempts'] == 4
+
+
+def test_jittered_backoff_stays_within_bounds(make_spool):
+    spool = make_spool(Transcriber(*[connection_error()] * 20), base_delay=1000.0, max_delay=5000.0)
+    spool.add(b'hello', 'wav', {})
+    for attempt in range(1, 21):
+        before = time.time()
+        spool._retry(spool.entries()[0])
+        delay = spool.entries()[0]['next_attempt_at'] - before
+        assert 0 <= delay <= min(5000.0, 1000.0 * 2 ** attempt) + 1
+
+
+def test_non_retriable_error_marks_the_entry_failed(make_spool):
+    transcriber = Transcriber(ValueError('bad audio'))
+    spool = make_spool(transcriber)
+    spool.add(b'hello', 'wav', {})
+    spool._retry(spool.entries()[0])
+    meta = spool.entries()[0]
+    assert meta['failed'] and 'bad audio' in meta['last_error']
+    assert spool.pending == 0
+    spool.wake()
+    time.sleep(0.1)
+    assert transcriber.calls == 1
+
+
+def test_oldest_entries_are_evicted_past_max_bytes(make_spool):
+    spool = make_spool(Transcriber(), max_bytes=1500)  # Room for two entries with their metadata
+    ids = [spool.add(bytes(400), 'wav', {}) for _ in range(3)]
+    assert [meta['id'] for meta in spool.entries()] == ids[1:]
+    assert spool.evicted == 1
+
+
+def test_newest_entry_is_kept_even_if_it_alone_is_too_big(make_spool):
+    spool = make_spool(Transcriber(), max_bytes=100)
+    spool.add(bytes(50), 'wav', {})
+    newest = spool.add(bytes(500), 'wav', {})
+    assert [meta['id'] for meta in spool.entries()] == [newest]
+
+
+def test_metadata_without_audio_is_dropped(make_spool):
+    transcriber = Transcriber()
+    spool = make_spool(transcriber)
+    spool.add(b'hello', 'wav', {})
+    meta = spool.entries()[0]
+    os.unlink(os.path.join(spool.directory, meta['audio']))
+    spool._retry(meta)
+    assert spool.entries() == []
+    assert transcriber.calls == 0
+
+
+def test_retriable_errors():
+    assert is_retriable_error(connection_error())
+    assert not is_retriable_error(ValueError())
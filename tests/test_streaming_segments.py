@@ -0,0 +1,78 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import pytest
+
+import config
+from audio_buffer import PCMBuffer
+from jobs import CancelToken, OrderedDelivery
+from stats import SessionStats
+
+# The app needs PortAudio and, on Linux, an X server for its hotkeys
+main = pytest.importorskip('main')
+
+
+class SlowSubmitExecutor(ThreadPoolExecutor):
+    """Takes a while to accept work, which widens any window between cutting a segment and queuing it"""
+
+    def __init__(self):
+        super().__init__(max_workers=2)
+        self.submitted = []
+
+    def submit(self, *args, **kwargs):
+        time.sleep(0.05)
+        future = super().submit(*args, **kwargs)
+        self.submitted.append(future)
+        return future
+
+
+def recording_transcriber(executor: ThreadPoolExecutor) -> 'main.VoiceTranscriber':
+    """A transcriber in the middle of a streamed recording, without audio devices or API client"""
+    transcriber = main.VoiceTranscriber.__new__(main.VoiceTranscriber)
+    frame_bytes = config.CHANNELS * 2
+    audio = PCMBuffer()
+    audio.append(bytes(int(config.STREAMING_MIN_SEGMENT_SECONDS + 1) * config.SAMPLE_RATE * frame_bytes))
+    transcriber.__dict__.update(
+        _capture_lock=threading.Lock(),
+        _jobs_lock=threading.Lock(),
+        _active_jobs={},
+        is_recording=True,
+        audio_buffer=audio,
+        sample_width=2,
+        session_id=1,
+        session_token=CancelToken(),
+        session_stats=SessionStats(),
+        _segment_futures=[],
+        _segment_start=0,
+        segment_executor=executor,
+        transcribe_pcm=lambda *args: 'segment',
+        ordered_delivery=OrderedDelivery(None),
+        pre_roll=None,
+        connection_warmer=None,
+        audio_stream=None,
+        capture_process=None,
+        capture_health=mock.Mock(snapshot=mock.Mock(return_value={})),
+        notifier=mock.Mock(),
+        job_pipeline=mock.Mock(queue_depth=0),
+    )
+    return transcriber
+
+
+@pytest.mark.parametrize('stop_delay', [0.0, 0.01, 0.03, 0.08])
+def test_stop_during_a_segment_cut_keeps_the_segment(stop_delay):
+    executor = SlowSubmitExecutor()
+    transcriber = recording_transcriber(executor)
+    cut = threading.Thread(target=transcriber._cut_segment, args=(0,))
+    cut.start()
+    time.sleep(stop_delay)
+    transcriber.stop_recording()
+    cut.join()
+    executor.shutdown()
+    transcriber.ordered_delivery.close()
+
+    job = transcriber.job_pipeline.submit.call_args.args[0]
+    assert list(job.segment_futures) == executor.submitted
+    # The tail starts where the last submitted segment ended, so no audio falls in between
+    assert job.tail_offset == (len(job.audio) if executor.submitted else 0)
@@ -0,0 +1,116 @@
+from typing import Optional
+
+import numpy as np
+import pytest
+
+from vad import EndpointDetector, find_speech_segments, frame_features, pcm_frame_features
+
+RATE = 16000
+BYTES_PER_SECOND = RATE * 2
+
+
+def signal(*parts) -> np.ndarray:
+    """Concatenate (kind, seconds) parts: 'tone' is a loud 300 Hz tone, 'silence' faint noise"""
+    rng = np.random.default_rng(0)
+    chunks = []
+    for kind, seconds in parts:
+        count = int(RATE * seconds)
+        if kind == 'tone':
+            chunks.append(8000 * np.sin(2 * np.pi * 300 * np.arange(count) / RATE))
+        else:
+            chunks.append(rng.normal(0, 20, count))
+    return np.concatenate(chunks).astype('<i2')
+
+
+def pcm(samples: np.ndarray) -> memoryview:
+    return memoryview(samples.tobytes())
+
+
+def seconds(byte_range):
+    return tuple(offset / BYTES_PER_SECOND for offset in byte_range)
+
+
+def test_silence_has_no_speech():
+    assert find_speech_segments(pcm(signal(('silence', 3))), RATE) == []
+
+
+def test_tone_bursts_are_found_with_hangover_around_them():
+    samples = signal(('silence', 1), ('tone', 1), ('silence', 2), ('tone', 1), ('silence', 1))
+    segments = [seconds(segment) for segment in find_speech_segments(pcm(samples), RATE, hangover_ms=300)]
+    assert len(segments) == 2
+    for (start, end), (tone_start, tone_end) in zip(segments, [(1, 2), (4, 5)]):
+        assert tone_start - 0.35 <= start <= tone_start
+        assert tone_end <= end <= tone_end + 0.35
+
+
+def test_short_pauses_stay_inside_a_segment():
+    samples = signal(('silence', 1), ('tone', 1), ('silence', 0.5), ('tone', 1), ('silence', 1))
+    segments = find_speech_segments(pcm(samples), RATE, hangover_ms=100, max_pause_ms=1000)
+    assert len(segments) == 1
+
+
+def test_speech_running_into_the_end_keeps_the_last_partial_frame():
+    samples = signal(('silence', 1), ('tone', 1.01))
+    segments = find_speech_segments(pcm(samples), RATE)
+    assert segments[-1][1] == len(samples) * 2
+
+
+def test_too_little_speech_is_dropped():
+    samples = signal(('silence', 1), ('tone', 0.06), ('silence', 1))
+    assert find_speech_segments(pcm(samples), RATE, min_speech_ms=200) == []
+
+
+def test_stereo_finds_the_same_speech_as_mono():
+    samples = signal(('silence', 1), ('tone', 1), ('silence', 1))
+    stereo = np.repeat(samples[:, None], 2, axis=1)
+    mono_segments = find_speech_segments(pcm(samples), RATE)
+    stereo_segments = find_speech_segments(pcm(stereo), RATE, channels=2)
+    assert [(start * 2, end * 2) for start, end in mono_segments] == stereo_segments
+
+
+def test_block_features_match_whole_recording_features():
+    samples = signal(('silence', 1), ('tone', 1), ('silence', 1))
+    frame_length = RATE * 30 // 1000
+    energy, zcr = frame_features(samples, frame_length)
+    block_energy, block_zcr = pcm_frame_features(pcm(samples), 1, frame_length, block_frames=7)
+    assert block_energy == pytest.approx(energy, abs=1e-4)
+    assert block_zcr == pytest.approx(zcr)
+
+
+def feed(detector: EndpointDetector, samples: np.ndarray, chunk_ms: int = 20) -> Optional[float]:
+    """Feed samples chunk by chunk; seconds fed when the detector reported the end, or None"""
+    chunk = RATE * chunk_ms // 1000
+    for start in range(0, len(samples), chunk):
+        if detector.process(samples[start:start + chunk].tobytes()):
+            return (start + chunk) / RATE
+    return None
+
+
+def test_endpoint_after_trailing_silence():
+    detector = EndpointDetector(RATE, trailing_silence_ms=1000)
+    ended_at = feed(detector, signal(('silence', 0.5), ('tone', 1), ('silence', 2)))
+    assert ended_at == pytest.approx(2.5, abs=0.05)
+    assert detector.ended
+
+
+def test_no_endpoint_without_enough_speech():
+    detector = EndpointDetector(RATE, trailing_silence_ms=500, min_speech_ms=300)
+    assert feed(detector, signal(('silence', 0.5), ('tone', 0.1), ('silence', 2))) is None
+    assert feed(EndpointDetector(RATE), signal(('silence', 3))) is None
+
+
+def test_pause_shorter_than_trailing_silence_keeps_listening():
+    detector = EndpointDetector(RATE, trailing_silence_ms=1000)
+    samples = signal(('tone', 1), ('silence', 0.6), ('tone', 1), ('silence', 0.6))
+    assert feed(detector, samples) is None
+
+
+def test_reset_listens_for_a_new_utterance():
+    detector = EndpointDetector(RATE, trailing_silence_ms=500)
+    feed(detector, signal(('tone', 1), ('silence', 1)))
+    assert detector.ended
+    noise_floor = detector.noise_floor_db
+    detector.reset(keep_noise_floor=True)
+    assert not detector.ended
+    assert detector.noise_floor_db == noise_floor
+    assert detector.process(signal(('silence', 0.02)).tobytes()) is False
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Voice activity detection for the Voice Transcriber app
+Finds the speech in a recording so silence is never uploaded
+"""
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Energy of full-scale 16-bit audio, used as the 0 dBFS reference
+_FULL_SCALE_ENERGY = 32768.0 ** 2
+
+
+def frame_features(samples: np.ndarray, frame_length: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Return per-frame energy (dBFS) and zero-crossing rate of mono int16 samples"""
+    frame_count = len(samples) // frame_length
+    frames = samples[:frame_count * frame_length].reshape(frame_count, frame_length).astype(np.float32)
+
+    energy = np.einsum('ij,ij->i', frames, frames) / frame_length
+    energy_db = 10.0 * np.log10(energy / _FULL_SCALE_ENERGY + 1e-10)
+
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame_length - 1)
+    return energy_db, zcr
+
+
+def _to_mono(pcm: memoryview, channels: int) -> np.ndarray:
+    samples = np.frombuffer(pcm, dtype='<i2')
+    if channels > 1:
+        samples = samples[:len(samples) // channels * channels].reshape(-1, channels).mean(axis=1)
+    return samples
+
+
+def pcm_frame_features(pcm: memoryview, channels: int, frame_length: int,
+                       block_frames: int = 1024) -> Tuple[np.ndarray, np.ndarray]:
+    """frame_features of 16-bit PCM, computed block_frames frames at a time
+
+    Only one block is ever converted to float, so memory stays flat however
+    long the recording (e.g. spilled to disk) is; the per-frame results are
+    a few bytes per frame.
+    """
+    frame_bytes = frame_length * channels * 2
+    frame_count = len(pcm) // frame_bytes
+    energy_db = np.empty(frame_count, dtype=np.float32)
+    zcr = np.empty(frame_count, dtype=np.float32)
+    for first in range(0, frame_count, block_frames):
+        last = min(frame_count, first + block_frames)
+        block = _to_mono(pcm[first * frame_bytes:last * frame_bytes], channels)
+        energy_db[first:last], zcr[first:last] = frame_features(block, frame_length)
+    return energy_db, zcr
+
+
+def find_speech_segments(pcm: memoryview, sample_rate: int, channels: int = 1, frame_ms: int = 30,
+                         energy_margin_db: float = 10.0, min_energy_dbfs: float = -50.0,
+                         max_noise_floor_dbfs: float = -35.0,
+                         zcr_threshold: float = 0.25, hangover_ms: int = 300,
+                         max_pause_ms: int = 1000, min_speech_ms: int = 200) -> List[Tuple[int, int]]:
+    """Locate speech in 16-bit PCM and return it as (start, end) byte ranges
+
+    Frames count as speech when they are loud enough above the estimated noise
+    floor, or slightly quieter but noisy (high zero-crossing rate, e.g. "s" or
+    "f" sounds). The decision is smoothed with a hangover on both sides, pauses
+    up to max_pause_ms stay inside a segment and longer ones are cut out.
+    An empty list means the recording contains no speech.
+    """
+    frame_length = max(1, sample_rate * frame_ms // 1000)
+    if len(pcm) < frame_length * channels * 2:
+        return []
+
+    energy_db, zcr = pcm_frame_features(pcm, channels, frame_length)
+
+    # Adapt to the background noise of this recording. The cap keeps a recording
+    # that is speech from start to end from being mistaken for loud noise.
+    noise_floor = min(np.percentile(energy_db, 10), max_noise_floor_dbfs)
+    threshold = max(noise_floor + energy_margin_db, min_energy_dbfs)
+    voiced = energy_db > threshold
+    unvoiced = (energy_db > threshold - energy_margin_db / 2) & (zcr > zcr_threshold)
+    speech = voiced | unvoiced
+
+    if np.count_nonzero(speech) * frame_ms < min_speech_ms:
+        return []
+
+    # Hangover smoothing: a frame is kept when speech is within hangover_ms on either side
+    hangover = hangover_ms // frame_ms
+    window = np.ones(2 * hangover + 1, dtype=np.int32)
+    smoothed = np.convolve(speech.astype(np.int32), window)[hangover:hangover + len(speech)] > 0
+
+    # Run boundaries of the smoothed mask
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], smoothed.astype(np.int8), [0]))))
+    starts, ends = edges[::2], edges[1::2]
+
+    # Merge segments separated by short pauses
+    max_pause = max_pause_ms // frame_ms
+    segments: List[Tuple[int, int]] = []
+    for start, end in zip(starts, ends):
+        if segments and start - segments[-1][1] <= max_pause:
+            segments[-1] = (segments[-1][0], end)
+        else:
+            segments.append((start, end))
+
+    # Byte ranges; speech running into the end also keeps the final partial frame
+    frame_bytes = frame_length * channels * 2
+    total_bytes = len(pcm) // (channels * 2) * (channels * 2)
+    return [(int(start) * frame_bytes, total_bytes if end == len(smoothed) else int(end) * frame_bytes)
+            for start, end in segments]
+
+
+class EndpointDetector:
+    """Incremental end-of-utterance detector fed one audio chunk at a time
+
+    Each chunk costs a single dot product, so it is cheap enough to run inside
+    the PortAudio callback. The noise floor follows quieter chunks immediately
+    and louder ones slowly, so steady background noise is not taken for speech.
+    """
+
+    def __init__(self, sample_rate: int, channels: int = 1, trailing_silence_ms: int = 1200,
+                 min_speech_ms: int = 300, energy_margin_db: float = 10.0,
+                 min_energy_dbfs: float = -50.0, max_noise_floor_dbfs: float = -35.0,
+                 noise_rise_rate: float = 0.01):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.trailing_silence_ms = trailing_silence_ms
+        self.min_speech_ms = min_speech_ms
+        self.energy_margin_db = energy_margin_db
+        self.min_energy_dbfs = min_energy_dbfs
+        self.max_noise_floor_dbfs = max_noise_floor_dbfs
+        self.noise_rise_rate = noise_rise_rate
+        self.reset()
+
+    def reset(self, keep_noise_floor: bool = False) -> None:
+        """Start listening for a new utterance"""
+        if not keep_noise_floor:
+            self.noise_floor_db: Optional[float] = None
+        self.speech_ms = 0.0
+        self.silence_ms = 0.0
+        self.ended = False
+
+    def process(self, chunk: bytes) -> bool:
+        """Feed one chunk of 16-bit PCM; returns True once the utterance has ended"""
+        if self.ended:
+            return True
+
+        samples = np.frombuffer(chunk, dtype='<i2').astype(np.float32)
+        if not len(samples):
+            return False
+        energy_db = 10.0 * np.log10(float(np.dot(samples, samples)) / len(samples) / _FULL_SCALE_ENERGY + 1e-10)
+        chunk_ms = 1000.0 * len(samples) / self.channels / self.sample_rate
+
+        if self.noise_floor_db is None or energy_db < self.noise_floor_db:
+            self.noise_floor_db = min(energy_db, self.max_noise_floor_dbfs)
+        else:
+            self.noise_floor_db = min(self.noise_floor_db + self.noise_rise_rate * (energy_db - self.noise_floor_db),
+                                      self.max_noise_floor_dbfs)
+
+        if energy_db > max(self.noise_floor_db + self.energy_margin_db, self.min_energy_dbfs):
+            self.speech_ms += chunk_ms
+            self.silence_ms = 0.0
+        else:
+            self.silence_ms += chunk_ms
+
+        self.ended = self.speech_ms >= self.min_speech_ms and self.silence_ms >= self.trailing_silence_ms
+        return self.ended